@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from finance_core.recurrence import make_series
+
+
+# Category names and descriptions as in the sample finance_data
+CATEGORIES = {
+    "expense": {
+        "other": ("Misc", "Gift", "Donation"),
+        "Food": ("Groceries", "Restaurant", "Food truck", "Coffee"),
+        "Transportation": ("Fuel", "Bus ticket", "Taxi", "Parking"),
+        "Housing": ("Rent", "Repairs", "Furniture"),
+        "Utilities": ("Electricity", "Water", "Internet", "Phone"),
+        "Entertainment": ("Cinema", "Concert", "Streaming", "Games"),
+        "Healthcare": ("Eye exam", "Pharmacy", "Dentist"),
+        "Education": ("Books", "Course", "Tuition")
+    },
+    "income": {
+        "other": ("Refund", "Gift"),
+        "Salary": ("Monthly salary", "Overtime"),
+        "Freelance": ("Client project", "Consulting"),
+        "Investments": ("Stock sale", "Fund payout"),
+        "Rental Income": ("Apartment rent", "Garage rent"),
+        "Dividends": ("Quarterly dividend",),
+        "Bonus": ("Year-end bonus", "Performance bonus"),
+        "Side Hustle": ("Market stall", "Tutoring")
+    }
+}
+
+SPENDING_LIMITS = {"Housing": 546.0, "Food": 5876.0, "Utilities": 598.0}
+
+# Distinct numbered variants per description, e.g. "Groceries 17"
+DESCRIPTION_VARIANTS = 200
+
+# Rows formatted per write, bounding memory for 1e7-record ledgers
+CHUNK = 100000
+
+RECORD_TEMPLATE = (
+    '  {{\n    "amount": {amount!r},\n    "category": {category},\n    "date": "{date}",\n'
+    '    "recurring": {recurring},\n    "description": {description},\n    "id": {id}\n  }}'
+)
+
+
+def _vocabulary(record_type):
+    # JSON-encoded category names, and per category its encoded descriptions
+    categories = list(CATEGORIES[record_type])
+    descriptions = [
+        [json.dumps(f"{word} {variant}") for word in CATEGORIES[record_type][category] for variant in range(DESCRIPTION_VARIANTS)]
+        for category in categories
+    ]
+    return categories, descriptions
+
+
+def _write_ledger(path, rng, size, first_id, first_day, days, record_type, recurring_share):
+    # Stream a record file in the exact layout JsonStore writes (json.dump
+    # with indent=2); returns the records flagged recurring
+    categories, descriptions = _vocabulary(record_type)
+    encoded = [json.dumps(category) for category in categories]
+    scale = 6.0 if record_type == "expense" else 7.0
+    recurring_records = []
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[")
+        for start in range(0, size, CHUNK):
+            n = min(CHUNK, size - start)
+            dates = (np.datetime64(first_day) + rng.integers(0, days, n)).astype(str).tolist()
+            amounts = np.round(rng.lognormal(scale - 2.0, 1.0, n) + 1.0, 2).tolist()
+            category_codes = rng.integers(0, len(categories), n).tolist()
+            picks = rng.random(n).tolist()
+            recurring = (rng.random(n) < recurring_share).tolist()
+            parts = []
+            for i in range(n):
+                code = category_codes[i]
+                options = descriptions[code]
+                record_id = first_id + start + i
+                parts.append(RECORD_TEMPLATE.format(
+                    amount=amounts[i],
+                    category=encoded[code],
+                    date=dates[i],
+                    recurring="true" if recurring[i] else "false",
+                    description=options[int(picks[i] * len(options))],
+                    id=record_id
+                ))
+                if recurring[i]:
+                    recurring_records.append({
+                        "amount": amounts[i],
+                        "category": categories[code],
+                        "date": dates[i],
+                        "description": json.loads(options[int(picks[i] * len(options))]),
+                        "recurring": True,
+                        "id": record_id
+                    })
+            file.write(("," if start else "") + "\n" + ",\n".join(parts))
+        file.write("\n]" if size else "]")
+    return recurring_records
+
+
+def generate(folder, size, seed=0, first_day="2015-01-01", years=10, income_share=0.35, recurring_share=0.002):
+    """Write a synthetic ledger of ``size`` records to ``folder`` as
+    expenses.json, income.json and categories.json.
+
+    The same ``size`` and ``seed`` always give the same files. Records are
+    spread uniformly over ``years`` years from ``first_day`` in random order,
+    like hand-entered data; ids are unique across both files.
+    """
+    os.makedirs(folder, exist_ok=True)
+    for name in ("journal.log", "rollup.json", "config.json"):
+        if os.path.exists(os.path.join(folder, name)):
+            os.remove(os.path.join(folder, name))
+
+    rng = np.random.default_rng(seed)
+    days = int(round(365.25 * years))
+    income_size = int(round(size * income_share))
+    expense_size = size - income_size
+    recurring = {
+        "expense": _write_ledger(os.path.join(folder, "expenses.json"), rng, expense_size, 1,
+                                 first_day, days, "expense", recurring_share),
+        "income": _write_ledger(os.path.join(folder, "income.json"), rng, income_size, expense_size + 1,
+                                first_day, days, "income", recurring_share)
+    }
+
+    frequencies = ("monthly", "weekly", "yearly")
+    categories = {
+        "income": list(CATEGORIES["income"]),
+        "expense": list(CATEGORIES["expense"]),
+        "spending_limits": dict(SPENDING_LIMITS),
+        "recurring": {
+            record_type: [make_series(record, frequencies[i % len(frequencies)]) for i, record in enumerate(records)]
+            for record_type, records in recurring.items()
+        }
+    }
+    with open(os.path.join(folder, "categories.json"), "w") as file:
+        json.dump(categories, file, indent=2)
+    return {"expense": expense_size, "income": income_size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic ledger in the finance_data JSON format.")
+    parser.add_argument("folder", help="folder to write expenses.json, income.json and categories.json to")
+    parser.add_argument("--size", type=float, default=1e5, help="total number of records, e.g. 1e6")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--years", type=int, default=10, help="years the records are spread over")
+    args = parser.parse_args(argv)
+    counts = generate(args.folder, int(args.size), seed=args.seed, years=args.years)
+    print(f"Wrote {counts['expense']} expense and {counts['income']} income records to {args.folder}")
+
+
+if __name__ == "__main__":
+    main()
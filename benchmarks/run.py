@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+from finance_core.engine import FinanceEngine
+from finance_core.sqlite_store import migrate_json_to_sqlite
+
+from .generate import generate
+
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+# Generated ledgers are kept here between runs, one folder per size and seed
+DEFAULT_DATA_ROOT = os.path.join(tempfile.gettempdir(), "finance_benchmarks")
+
+# Shortest a single timing may be; faster functions are called in a loop
+MIN_TIME = 0.05
+
+# Medians this much slower than the baseline count as regressions
+DEFAULT_THRESHOLD = 1.2
+
+# Fixed dates, so every run filters the same records. The generated
+# records span 2015-2024; the analysis range starts mid-month.
+VIEW_RANGE = (date(2020, 1, 1), date(2020, 12, 31))
+ANALYSIS_RANGE = (date(2019, 3, 15), date(2022, 9, 10))
+BUDGET_DAY = date(2021, 6, 15)
+
+# Rows in one page of a record view
+PAGE = 40
+
+
+def bench_populate_treeview(engine, context):
+    # What populate_treeview does: a filtered view sorted by a column, then
+    # the first page of rows
+    for record_type in ("expense", "income"):
+        view = engine.view(record_type, *VIEW_RANGE)
+        view.sort("amount", descending=True)
+        view.rows(0, PAGE)
+
+
+def bench_search_records(engine, context):
+    # A search box query over the whole ledger, then the first page
+    view = engine.view("expense", query="gro")
+    view.rows(0, PAGE)
+
+
+def bench_analyze_categories(engine, context):
+    engine.analyze_categories(*ANALYSIS_RANGE)
+
+
+def bench_income_vs_spending(engine, context):
+    engine.totals_by_month("income", *ANALYSIS_RANGE)
+    engine.totals_by_month("expense", *ANALYSIS_RANGE)
+
+
+def bench_monthly_by_category(engine, context):
+    engine.totals_by_month_and_category("income", *ANALYSIS_RANGE)
+    engine.totals_by_month_and_category("expense", *ANALYSIS_RANGE)
+
+
+def bench_remaining_budget(engine, context):
+    engine.budget_status(today=BUDGET_DAY)
+
+
+def bench_forecast(engine, context):
+    engine.forecast(24, today=BUDGET_DAY)
+
+
+def bench_projected_view(engine, context):
+    view = engine.view("expense", *VIEW_RANGE, include_projected=True)
+    view.rows(0, PAGE)
+
+
+def bench_download_records(engine, context):
+    engine.export(context["export_folder"], "CSV", *VIEW_RANGE)
+
+
+def bench_add_record(engine, context):
+    engine.add_record("expense", BUDGET_DAY, 12.5, "Food", "Benchmark")
+
+
+def bench_save_data(engine, context):
+    engine.save(background=False)
+
+
+# Name, function and the GUI method it stands in for. Benchmarks that change
+# the data come last.
+BENCHMARKS = [
+    ("populate_treeview", bench_populate_treeview, "FinanceTracker.populate_treeview"),
+    ("search_records", bench_search_records, "FinanceTracker.apply_search"),
+    ("analyze_categories", bench_analyze_categories, "FinanceTracker.analyze_categories"),
+    ("visualize_income_vs_spending", bench_income_vs_spending, "FinanceTracker.visualize_income_vs_spending"),
+    ("visualize_monthly_by_category", bench_monthly_by_category, "FinanceTracker.visualize_monthly_by_category"),
+    ("update_remaining_budget", bench_remaining_budget, "FinanceTracker.update_remaining_budget"),
+    ("forecast", bench_forecast, "FinanceTracker.visualize_forecast"),
+    ("projected_view", bench_projected_view, "FinanceTracker.populate_treeview with projected records"),
+    ("download_records", bench_download_records, "FinanceTracker.download_records"),
+    ("add_record", bench_add_record, "FinanceTracker.add_record"),
+    ("save_data", bench_save_data, "FinanceTracker.save_data")
+]
+
+
+def _timings(function, repeat):
+    # Seconds per call. Fast functions are looped until one timing takes
+    # MIN_TIME, as timeit does, so sub-millisecond results are not noise.
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME:
+            break
+        number *= 10
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return timings
+
+
+def _summary(name, size, backend, timings):
+    return {
+        "benchmark": name,
+        "size": size,
+        "backend": backend,
+        "repeat": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings)
+    }
+
+
+def prepare(data_root, size, seed, backend):
+    """Generate (or reuse) the ledger for ``size`` and return a working copy
+    of it for ``backend``; benchmarks write to the copy only."""
+    source = os.path.join(data_root, f"ledger-{size}-{seed}")
+    marker = os.path.join(source, "generated.json")
+    if not os.path.exists(marker):
+        generate(source, size, seed=seed)
+        with open(marker, "w") as file:
+            json.dump({"size": size, "seed": seed}, file)
+
+    folder = os.path.join(data_root, f"work-{size}-{seed}-{backend}")
+    shutil.rmtree(folder, ignore_errors=True)
+    os.makedirs(folder)
+    for name in ("expenses.json", "income.json", "categories.json"):
+        shutil.copy(os.path.join(source, name), folder)
+    config = {"backend": backend, "sqlite_file": "finance.db"}
+    if backend == "binary":
+        # The JSON store with memory-mapped binary partitions
+        config.update(backend="json", record_format="binary")
+    if backend == "sqlite":
+        migrate_json_to_sqlite(folder, os.path.join(folder, config["sqlite_file"]))
+
+    # First open writes the rollup, so the timed loads take the normal path
+    engine = FinanceEngine(folder, config)
+    engine.load()
+    engine.save(background=False)
+    engine.close()
+    return folder, config
+
+
+def run(sizes=DEFAULT_SIZES, backends=("json",), repeat=5, seed=0, data_root=DEFAULT_DATA_ROOT, only=None, log=print):
+    """Run every benchmark on every size and backend; returns result dicts."""
+    results = []
+    for size in sizes:
+        for backend in backends:
+            log(f"Preparing {size} records ({backend})...")
+            folder, config = prepare(data_root, size, seed, backend)
+            export_folder = os.path.join(folder, "export")
+            os.makedirs(export_folder)
+            context = {"export_folder": export_folder}
+
+            # Loads from disk are the one benchmark that needs a fresh engine
+            if only is None or "load_data" in only:
+                def load():
+                    engine = FinanceEngine(folder, config)
+                    engine.load()
+                    engine.close()
+                results.append(_summary("load_data", size, backend, _timings(load, repeat)))
+                log(f"  load_data: {results[-1]['median'] * 1000:.2f} ms")
+
+            engine = FinanceEngine(folder, config)
+            engine.load()
+            try:
+                for name, function, _ in BENCHMARKS:
+                    if only is not None and name not in only:
+                        continue
+                    timings = _timings(lambda: function(engine, context), repeat)
+                    results.append(_summary(name, size, backend, timings))
+                    log(f"  {name}: {results[-1]['median'] * 1000:.2f} ms")
+            finally:
+                engine.close()
+            shutil.rmtree(folder, ignore_errors=True)
+    return results
+
+
+def environment():
+    # Where the numbers came from, so result files can be told apart
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine()
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Pair each result with the baseline's and return
+    ``(benchmark, size, backend, baseline_median, median, ratio)`` rows for
+    those slower than ``threshold`` times the baseline."""
+    previous = {(entry["benchmark"], entry["size"], entry["backend"]): entry["median"] for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        key = (entry["benchmark"], entry["size"], entry["backend"])
+        if key not in previous or previous[key] <= 0:
+            continue
+        ratio = entry["median"] / previous[key]
+        if ratio > threshold:
+            regressions.append(key + (previous[key], entry["median"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the finance tracker's hot paths on synthetic ledgers.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES, help="ledger sizes, e.g. 1e3 1e6 1e7")
+    parser.add_argument("--backend", nargs="+", choices=("json", "binary", "sqlite"), default=["json"])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="run only these benchmarks")
+    parser.add_argument("--data-root", default=DEFAULT_DATA_ROOT, help="where generated ledgers are cached")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON file to write the results to")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown of the median that counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = run([int(size) for size in args.sizes], args.backend, args.repeat, args.seed, args.data_root, args.only)
+    covers = dict([("load_data", "FinanceTracker.load_data")] + [(name, target) for name, _, target in BENCHMARKS])
+    report = dict(environment(), seed=args.seed, benchmarks=covers, results=results)
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, size, backend, before, after, ratio in regressions:
+            print(f"Regression: {name} ({size}, {backend}) {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare} (commit {baseline.get('commit')})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
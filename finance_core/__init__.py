@@ -0,0 +1,30 @@
+import importlib
+
+# Names are resolved on first access, so importing a light submodule such as
+# finance_core.recurrence does not pull in NumPy
+_EXPORTS = {
+    "DateIndex": "date_index",
+    "day_number": "dates",
+    "to_day": "dates",
+    "Journal": "journal",
+    "apply_operation": "journal",
+    "Ledger": "ledger",
+    "LedgerView": "ledger",
+    "RECURRING": "ledger",
+    "SearchView": "ledger",
+    "ProjectedView": "recurrence",
+    "make_series": "recurrence",
+    "occurrences": "recurrence",
+    "project": "recurrence",
+    "TrigramIndex": "search",
+    "parse_query": "search",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{module}", __name__), name)
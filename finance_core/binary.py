@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from .date_index import DateIndex
+from .ledger import Ledger
+
+
+MAGIC = b"FTLEDGER"
+VERSION = 1
+
+# Header flags
+SORTED = 0x01
+
+# magic, version, flags, record count, next id, then the number of strings
+# and bytes of the category and description tables; padded to HEADER_SIZE
+HEADER = struct.Struct("<8sHHqqqqqq")
+HEADER_SIZE = 64
+
+# One fixed-width row per record. Categories and descriptions are indexes
+# into the file's string tables.
+RECORD = np.dtype([
+    ("date", "<M8[D]"),
+    ("amount", "<f8"),
+    ("id", "<i8"),
+    ("category", "<i4"),
+    ("description", "<i4"),
+    ("flags", "u1")
+], align=True)
+
+
+def _string_table(strings):
+    # (offsets, blob): string i is blob[offsets[i]:offsets[i + 1]]
+    encoded = [str(text).encode("utf-8") for text in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+    offsets[1:] = np.cumsum([len(text) for text in encoded])
+    return offsets, b"".join(encoded)
+
+
+def _read_strings(offsets, blob):
+    bounds = offsets.tolist()
+    if blob.isascii():
+        # Byte offsets are character offsets, so decode once and slice
+        text = blob.decode("ascii")
+        return [text[start:stop] for start, stop in zip(bounds, bounds[1:])]
+    return [blob[start:stop].decode("utf-8") for start, stop in zip(bounds, bounds[1:])]
+
+
+def ledger_bytes(ledger, positions=None):
+    """Encode the rows at ``positions`` (every row by default) as a binary
+    record file, oldest first. Only the strings those rows use are kept."""
+    if positions is None:
+        positions = ledger.index.array()
+    positions = np.asarray(positions, dtype=np.intp)
+    positions = positions[np.argsort(ledger.dates[positions], kind="stable")]
+
+    records = np.zeros(len(positions), dtype=RECORD)
+    records["date"] = ledger.dates[positions]
+    records["amount"] = ledger.amounts[positions]
+    records["id"] = ledger.ids[positions]
+    records["flags"] = ledger.flags[positions]
+    category_codes, records["category"] = np.unique(ledger.category_codes[positions], return_inverse=True)
+    description_codes, records["description"] = np.unique(ledger.description_codes[positions], return_inverse=True)
+    category_offsets, category_blob = _string_table([ledger.categories[code] for code in category_codes.tolist()])
+    description_offsets, description_blob = _string_table([ledger.descriptions[code] for code in description_codes.tolist()])
+
+    header = HEADER.pack(MAGIC, VERSION, SORTED, len(records), ledger.next_id,
+                         len(category_codes), len(category_blob), len(description_codes), len(description_blob))
+    return b"".join([
+        header.ljust(HEADER_SIZE, b"\0"), records.tobytes(),
+        category_offsets.tobytes(), description_offsets.tobytes(), category_blob, description_blob
+    ])
+
+
+def write_ledger(ledger, path, positions=None):
+    with open(path, "wb") as file:
+        file.write(ledger_bytes(ledger, positions))
+
+
+def open_ledger(path):
+    """Map a binary record file into a Ledger without copying its rows.
+
+    The Ledger's columns are views into a copy-on-write mapping, so pages
+    are only read when touched and changes never reach the file. The date
+    index uses the stored date order as is; it and the id lookup are only
+    turned into Python structures once the ledger is edited.
+    """
+    mapped = np.memmap(path, dtype=np.uint8, mode="c")
+    if len(mapped) < HEADER_SIZE:
+        raise ValueError(f"{path} is not a binary record file")
+    magic, version, flags, count, next_id, categories, category_bytes, descriptions, description_bytes = \
+        HEADER.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a binary record file")
+    if version != VERSION:
+        raise ValueError(f"{path} has unsupported format version {version}")
+
+    offset = HEADER_SIZE
+    records = mapped[offset:offset + count * RECORD.itemsize].view(RECORD)
+    offset += count * RECORD.itemsize
+    category_offsets = mapped[offset:offset + (categories + 1) * 8].view("<i8")
+    offset += (categories + 1) * 8
+    description_offsets = mapped[offset:offset + (descriptions + 1) * 8].view("<i8")
+    offset += (descriptions + 1) * 8
+    category_blob = mapped[offset:offset + category_bytes].tobytes()
+    offset += category_bytes
+    description_blob = mapped[offset:offset + description_bytes].tobytes()
+    if len(records) != count or offset + description_bytes > len(mapped):
+        raise ValueError(f"{path} is truncated")
+
+    ledger = Ledger(capacity=0)
+    ledger._dates = records["date"]
+    ledger._amounts = records["amount"]
+    ledger._ids = records["id"]
+    ledger._category_codes = records["category"]
+    ledger._description_codes = records["description"]
+    ledger._flags = records["flags"]
+    ledger.size = count
+    ledger.next_id = max(next_id, 1)
+    ledger.categories = _read_strings(category_offsets, category_blob)
+    ledger._category_lookup = dict(zip(ledger.categories, range(categories)))
+    ledger.descriptions = _read_strings(description_offsets, description_blob)
+    ledger._description_lookup = dict(zip(ledger.descriptions, range(descriptions)))
+    days = records["date"].view(np.int64)
+    ledger.index = DateIndex.in_order(days) if flags & SORTED else DateIndex.build(days)
+    return ledger
+
+
+def json_to_binary(json_path, binary_path):
+    """Convert an ``expenses.json``/``income.json`` style file; returns the
+    number of records."""
+    from .storage import load_ledger
+
+    ledger, _, _ = load_ledger(json_path)
+    write_ledger(ledger, binary_path)
+    return len(ledger)
+
+
+def binary_to_json(binary_path, json_path):
+    ledger = open_ledger(binary_path)
+    with open(json_path, "w") as file:
+        json.dump(ledger.records(ledger.index.array()), file, indent=2)
+    return len(ledger)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert record files between JSON and the binary format.")
+    parser.add_argument("direction", choices=("to-binary", "to-json"))
+    parser.add_argument("source")
+    parser.add_argument("target", nargs="?", help="defaults to the source with the other extension")
+    args = parser.parse_args(argv)
+
+    root, _ = os.path.splitext(args.source)
+    if args.direction == "to-binary":
+        target = args.target or root + ".bin"
+        count = json_to_binary(args.source, target)
+    else:
+        target = args.target or root + ".json"
+        count = binary_to_json(args.source, target)
+    print(f"Wrote {count} records to {target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+from datetime import date
+
+import numpy as np
+
+from .dates import to_day
+
+
+PERIODS = ("weekly", "monthly", "yearly")
+
+# Shares of a limit that raise an alert when spending first reaches them
+THRESHOLDS = (0.8, 1.0)
+
+
+def limit_of(entry):
+    """``(amount, period)`` of a ``spending_limits`` entry. Plain numbers,
+    as older files hold, are monthly limits."""
+    if isinstance(entry, dict):
+        return float(entry["limit"]), entry.get("period", "monthly")
+    return float(entry), "monthly"
+
+
+def make_limit(amount, period="monthly"):
+    # Monthly limits stay plain numbers so older files keep their meaning
+    if period not in PERIODS:
+        raise ValueError(f"Unknown budget period: {period}")
+    if period == "monthly":
+        return float(amount)
+    return {"limit": float(amount), "period": period}
+
+
+def period_bounds(day, period):
+    """First and last day (``datetime64[D]``) of the week (from Monday),
+    month or year containing ``day``."""
+    day = to_day(day)
+    if period == "weekly":
+        first = day - (day.astype(np.int64) + 3) % 7
+        return first, first + 6
+    unit = "M" if period == "monthly" else "Y"
+    first = day.astype(f"datetime64[{unit}]")
+    return first.astype("datetime64[D]"), (first + 1).astype("datetime64[D]") - 1
+
+
+class Budget:
+    """Expenses against each spending limit in the limit's current period.
+
+    Spending is read from the rollup's running totals, which every add, edit
+    and delete already updates: one month cell for a monthly limit, twelve
+    for a yearly one and seven cube days for a weekly one. Status therefore
+    costs O(number of limits) however large the ledger is.
+    """
+
+    def __init__(self, rollup, limits):
+        self.rollup = rollup
+        # The live categories["spending_limits"] dict
+        self.limits = limits
+
+    def spent(self, category, period, today=None):
+        first, last = period_bounds(today or date.today(), period)
+        return self.rollup.category_total("expense", category, first, last)
+
+    def status(self, today=None, projected=None):
+        """``(category, spent, limit, remaining, period)`` per limit.
+        ``projected(first, last)`` may return extra ``{category: total}``
+        for a period, such as projected recurring occurrences."""
+        today = today or date.today()
+        extra = {}
+        result = []
+        for category, entry in self.limits.items():
+            limit, period = limit_of(entry)
+            spent = self.spent(category, period, today)
+            if projected is not None:
+                if period not in extra:
+                    extra[period] = projected(*period_bounds(today, period))
+                spent += extra[period].get(category, 0)
+            result.append((category, spent, limit, limit - spent, period))
+        return result
+
+    def watch(self, categories=None, today=None):
+        # Spending now for the limited categories among ``categories`` (all
+        # of them by default), to hand to ``alerts`` after a change
+        today = today or date.today()
+        return {
+            category: self.spent(category, limit_of(entry)[1], today)
+            for category, entry in self.limits.items()
+            if categories is None or category in categories
+        }
+
+    def alerts(self, before, today=None):
+        """Alerts for the thresholds that spending crossed upwards since
+        ``before`` (from ``watch``), as dicts with the category, period,
+        spent, limit and threshold."""
+        today = today or date.today()
+        result = []
+        for category, previous in before.items():
+            entry = self.limits.get(category)
+            if entry is None:
+                continue
+            limit, period = limit_of(entry)
+            spent = self.spent(category, period, today)
+            # Only the highest threshold when one change crosses several
+            crossed = [threshold for threshold in THRESHOLDS if previous < threshold * limit <= spent]
+            if crossed:
+                result.append({"category": category, "period": period, "spent": spent,
+                               "limit": limit, "threshold": crossed[-1]})
+        return result
@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import sys
+
+from .budget import PERIODS
+from .cube import GRANULARITIES
+from .engine import FinanceEngine
+from .export import EXPORT_FORMATS
+from .metrics import configure
+from .recurrence import FREQUENCIES
+
+
+DEFAULT_DATA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "finance_data")
+
+COLUMNS = ("id", "date", "amount", "category", "description", "recurring")
+
+
+def _print_records(records, as_json):
+    if as_json:
+        json.dump(records, sys.stdout, indent=2)
+        print()
+        return
+    print("\t".join(COLUMNS))
+    for record in records:
+        recurring = "projected" if record.get("projected") else ("yes" if record["recurring"] else "no")
+        print(f"{record['id']}\t{record['date']}\t{record['amount']:.2f}\t{record['category']}\t{record['description']}\t{recurring}")
+
+
+def cmd_add(engine, args):
+    record_id = engine.add_record(args.type, args.date, args.amount, args.category, args.description,
+                                  args.recurring, args.frequency)
+    print(f"Added {args.type} record {record_id}")
+
+
+def cmd_delete(engine, args):
+    if engine.get_record(args.type, args.id) is None:
+        print(f"No {args.type} record with id {args.id}", file=sys.stderr)
+        return 1
+    engine.delete_record(args.type, args.id)
+    print(f"Deleted {args.type} record {args.id}")
+
+
+def cmd_list(engine, args):
+    view = engine.view(args.type, args.start, args.end, include_projected=args.projected, query=args.search)
+    _print_records(view.rows(0, len(view)), args.json)
+
+
+def cmd_analyze(engine, args):
+    result = engine.analyze_categories(args.start, args.end, include_projected=args.projected)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for record_type, label in (("expense", "Spending"), ("income", "Income")):
+        for rank in ("highest", "lowest"):
+            category, total = result[record_type][rank]
+            print(f"{rank.capitalize()} {label} Category: {category} with ${total:.2f}")
+
+
+def cmd_monthly(engine, args):
+    income = engine.totals_by_period("income", args.granularity, args.start, args.end, include_projected=args.projected)
+    spending = engine.totals_by_period("expense", args.granularity, args.start, args.end, include_projected=args.projected)
+    income = {period: sum(totals.values()) for period, totals in income.items()}
+    spending = {period: sum(totals.values()) for period, totals in spending.items()}
+    periods = sorted(set(income) | set(spending))
+    if args.json:
+        print(json.dumps({period: {"income": income.get(period, 0), "spending": spending.get(period, 0)} for period in periods}, indent=2))
+        return
+    print(f"{args.granularity}\tincome\tspending")
+    for period in periods:
+        print(f"{period}\t{income.get(period, 0):.2f}\t{spending.get(period, 0):.2f}")
+
+
+def cmd_budget(engine, args):
+    status = engine.budget_status(include_projected=args.projected)
+    if not status:
+        print("No spending limits set.")
+    for category, spent, limit, remaining, period in status:
+        if remaining < 0:
+            print(f"{category}: {spent:.2f}/{limit:.2f} {period} (Exceeded by {-remaining:.2f})")
+        else:
+            print(f"{category}: {spent:.2f}/{limit:.2f} {period} ({remaining:.2f} remaining)")
+
+
+def cmd_forecast(engine, args):
+    result = engine.forecast(args.months)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"Balance now: {result['opening_balance']:.2f}")
+    print("month\tincome\tspending\tbalance")
+    for row in zip(result["months"], result["income"], result["expense"], result["balance"]):
+        print("{}\t{:.2f}\t{:.2f}\t{:.2f}".format(*row))
+    if args.categories:
+        for record_type in ("income", "expense"):
+            for category, values in sorted(result["categories"][record_type].items()):
+                print(f"{record_type}\t{category}\t" + "\t".join(f"{value:.2f}" for value in values))
+
+
+def cmd_limit(engine, args):
+    if args.delete:
+        engine.delete_spending_limit(args.category)
+        print(f"Deleted the spending limit for {args.category}")
+        return
+    if args.amount is None:
+        raise ValueError("Give an amount, or --delete")
+    engine.set_spending_limit(args.category, args.amount, args.period)
+    print(f"Spending limit for {args.category} set to {args.amount:.2f} {args.period}")
+
+
+def cmd_serve(engine, args):
+    from .server import serve
+
+    print(f"Serving {args.data_folder} on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    serve(engine, args.host, args.port)
+
+
+def print_budget_alerts(alerts):
+    for alert in alerts:
+        print(f"Budget alert: {alert['category']} at {alert['spent'] / alert['limit']:.0%} of its "
+              f"{alert['period']} limit ({alert['spent']:.2f}/{alert['limit']:.2f})", file=sys.stderr)
+
+
+def cmd_export(engine, args):
+    for path in engine.export(args.output, args.format, args.start, args.end):
+        print(f"Exported {path}")
+
+
+def cmd_import(engine, args):
+    mapping = {
+        "date": args.date_column,
+        "amount": args.amount_column,
+        "description": args.description_column,
+        "category": args.category_column,
+        "debit": args.debit_column,
+        "credit": args.credit_column
+    }
+    counts = engine.import_file(args.path, args.type, mapping=mapping, date_format=args.date_format,
+                                delimiter=args.delimiter, decimal=args.decimal, thousands=args.thousands)
+    print(f"Imported {counts.get('expense', 0)} expense and {counts.get('income', 0)} income records")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m finance_tracker",
+                                     description="Work with the finance tracker data without the GUI.")
+    parser.add_argument("--data-folder", default=DEFAULT_DATA_FOLDER, help="folder holding the finance data")
+    parser.add_argument("--log-level", choices=("DEBUG", "INFO", "WARNING", "ERROR"), type=str.upper,
+                        help="logging threshold; DEBUG logs the time of every step (default from config.json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def with_range(command):
+        command.add_argument("--start", help="first date, YYYY-MM-DD")
+        command.add_argument("--end", help="last date, YYYY-MM-DD")
+        command.add_argument("--projected", action="store_true", help="include projected recurring occurrences")
+        command.add_argument("--json", action="store_true", help="print JSON")
+        return command
+
+    add = commands.add_parser("add", help="add a record")
+    add.add_argument("type", choices=("expense", "income"))
+    add.add_argument("--date", required=True, help="YYYY-MM-DD")
+    add.add_argument("--amount", required=True, type=float)
+    add.add_argument("--category", required=True)
+    add.add_argument("--description", default="")
+    add.add_argument("--recurring", action="store_true")
+    add.add_argument("--frequency", choices=FREQUENCIES, default="monthly")
+    add.set_defaults(handler=cmd_add)
+
+    delete = commands.add_parser("delete", help="delete a record by id")
+    delete.add_argument("type", choices=("expense", "income"))
+    delete.add_argument("id", type=int)
+    delete.set_defaults(handler=cmd_delete)
+
+    listing = with_range(commands.add_parser("list", help="list records in a date range, newest first"))
+    listing.add_argument("type", choices=("expense", "income"))
+    listing.add_argument("--search", help="only records whose description or category contains these words")
+    listing.set_defaults(handler=cmd_list)
+
+    with_range(commands.add_parser("analyze", help="highest and lowest categories")).set_defaults(handler=cmd_analyze)
+    monthly = with_range(commands.add_parser("monthly", help="income vs spending by month"))
+    monthly.add_argument("--granularity", choices=GRANULARITIES, default="month",
+                         help="total by day, week, month, quarter or year instead")
+    monthly.set_defaults(handler=cmd_monthly)
+
+    budget = commands.add_parser("budget", help="remaining budget in each limit's current week, month or year")
+    budget.add_argument("--projected", action="store_true", help="include projected recurring occurrences")
+    budget.set_defaults(handler=cmd_budget)
+
+    forecast = commands.add_parser("forecast", help="projected income, spending and balance for the coming months")
+    forecast.add_argument("--months", type=int, default=12, help="months to forecast after the current one")
+    forecast.add_argument("--categories", action="store_true", help="also print each category's forecast")
+    forecast.add_argument("--json", action="store_true", help="print JSON")
+    forecast.set_defaults(handler=cmd_forecast)
+
+    limit = commands.add_parser("limit", help="set or delete a category's spending limit")
+    limit.add_argument("category")
+    limit.add_argument("amount", type=float, nargs="?")
+    limit.add_argument("--period", choices=PERIODS, default="monthly")
+    limit.add_argument("--delete", action="store_true")
+    limit.set_defaults(handler=cmd_limit)
+
+    export = with_range(commands.add_parser("export", help="export records in a date range"))
+    export.add_argument("--format", choices=EXPORT_FORMATS, type=str.upper, default="CSV")
+    export.add_argument("--output", default=".", help="folder to write to")
+    export.set_defaults(handler=cmd_export)
+
+    server = commands.add_parser("serve", help="serve the data to GUI and script clients over HTTP/JSON")
+    server.add_argument("--host", default="127.0.0.1", help="address to listen on (default: this machine only)")
+    server.add_argument("--port", type=int, default=8765)
+    server.set_defaults(handler=cmd_serve)
+
+    statement = commands.add_parser("import", help="import a CSV or OFX/QFX bank statement")
+    statement.add_argument("path")
+    statement.add_argument("--type", choices=("expense", "income"),
+                           help="import every row as this type; by default money out is an expense")
+    statement.add_argument("--date-column", default="Date")
+    statement.add_argument("--amount-column", default="Amount")
+    statement.add_argument("--description-column", default="Description")
+    statement.add_argument("--category-column", help="column holding categories (default: Uncategorized)")
+    statement.add_argument("--debit-column", help="column of money out, instead of a signed amount")
+    statement.add_argument("--credit-column", help="column of money in, instead of a signed amount")
+    statement.add_argument("--date-format", default="%Y-%m-%d", help="strptime format of the dates")
+    statement.add_argument("--delimiter", default=",")
+    statement.add_argument("--decimal", default=".", help="decimal mark")
+    statement.add_argument("--thousands", default=",", help="thousands separator")
+    statement.set_defaults(handler=cmd_import)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    engine = FinanceEngine(args.data_folder)
+    configure(dict(engine.config, log_level=args.log_level or engine.config.get("log_level")), args.data_folder)
+    try:
+        errors = engine.load()
+        for error in errors:
+            print(error, file=sys.stderr)
+        engine.budget_listeners.append(print_budget_alerts)
+        return args.handler(engine, args) or 0
+    except (ValueError, KeyError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        engine.close()
@@ -0,0 +1,256 @@
+import http.client
+import json
+from urllib.parse import quote, urlencode, urlsplit
+
+from .export import export_views
+
+
+# Rows fetched per request when a view is paged or exported
+PAGE = 500
+
+# GET responses kept for revalidation
+CACHE_SIZE = 64
+
+
+class ServerError(RuntimeError):
+    """The ledger server failed to handle a request."""
+
+
+def _param(value):
+    return ("1" if value else "0") if isinstance(value, bool) else str(value)
+
+
+def _jsonable(columns):
+    # Import columns (NumPy arrays) as JSON lists; dates as "YYYY-MM-DD"
+    result = {}
+    for name, values in columns.items():
+        if getattr(values, "dtype", None) is not None and values.dtype.kind == "M":
+            values = values.astype("datetime64[D]").astype(str)
+        result[name] = values.tolist() if hasattr(values, "tolist") else [str(value) for value in values]
+    return result
+
+
+class RemoteView:
+    """A record view served by ``LedgerServer``, fetched a page at a time.
+
+    Offers what the record views and exports use: ``len``, ``sort`` and
+    ``rows``. The server keeps the sorted view, so paging costs one request
+    per page.
+    """
+
+    def __init__(self, engine, record_type, params):
+        self.engine = engine
+        self.path = f"/records/{record_type}"
+        self.params = dict(params, sort="date", descending=True)
+        self.total = None
+        self.page = (0, [])
+        self._fetch(0, 0)
+
+    def _fetch(self, start, count):
+        data = self.engine.request("GET", self.path, dict(self.params, offset=start, limit=count))
+        self.total = data["total"]
+        return data["records"]
+
+    def __len__(self):
+        return self.total
+
+    def sort(self, column, descending=True):
+        self.params.update(sort=column, descending=descending)
+        self.page = (0, [])
+
+    def rows(self, start, stop):
+        start = max(0, start)
+        stop = min(len(self), stop)
+        if stop <= start:
+            return []
+        first, rows = self.page
+        if not (first <= start and stop <= first + len(rows)):
+            # Fetch a little ahead, as scrolling usually continues
+            first = start
+            rows = self._fetch(start, max(stop - start, PAGE))
+            self.page = (first, rows)
+        return rows[start - first:stop - first]
+
+
+class RemoteEngine:
+    """A ``FinanceEngine`` stand-in for clients of ``LedgerServer``.
+
+    Offers the engine methods the GUI uses, each as one HTTP request over a
+    kept-alive connection. ``categories`` mirrors the server's and is
+    updated in place by every category or limit change. Budget alerts come
+    back with the write that raised them and go to ``budget_listeners``.
+    Not thread-safe; ``snapshot`` gives a worker its own connection.
+    """
+
+    def __init__(self, url, timeout=30):
+        self.url = url
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.connection = None
+        # GET path -> (ETag, body), revalidated with If-None-Match
+        self.cache = {}
+        self.categories = {}
+        self.budget_listeners = []
+        # The ledgers and store live in the server process
+        self.store = None
+        self.expenses = None
+        self.income = None
+
+    def request(self, method, path, params=None, body=None):
+        if params:
+            path += "?" + urlencode({name: _param(value) for name, value in params.items() if value is not None})
+        payload = None if body is None else json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        cached = self.cache.get(path) if method == "GET" else None
+        if cached is not None:
+            headers["If-None-Match"] = cached[0]
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle kept-alive connection; retry once
+                self.close()
+                if attempt:
+                    raise
+        if response.getheader("Connection", "").lower() == "close":
+            self.close()
+        if response.status == 304 and cached is not None:
+            data = cached[1]
+        elif response.status == 200 and response.getheader("ETag"):
+            self.cache[path] = (response.getheader("ETag"), data)
+            if len(self.cache) > CACHE_SIZE:
+                self.cache.pop(next(iter(self.cache)))
+
+        result = json.loads(data) if data else None
+        if response.status == 400:
+            raise ValueError(result["error"])
+        if response.status == 404:
+            raise KeyError(result["error"])
+        if response.status not in (200, 304):
+            raise ServerError(f"{method} {path}: {response.status} {result and result.get('error')}")
+        return result
+
+    def _write(self, method, path, body=None):
+        result = self.request(method, path, body=body if body is not None else {})
+        alerts = result.pop("alerts", None) if isinstance(result, dict) else None
+        if alerts:
+            for listener in self.budget_listeners:
+                listener(alerts)
+        return result
+
+    def _set_categories(self, categories):
+        # In place, as the GUI holds on to the dict
+        self.categories.clear()
+        self.categories.update(categories)
+
+    def load(self):
+        self._set_categories(self.request("GET", "/categories"))
+        return []
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def save(self, background=True):
+        self._write("POST", "/save")
+
+    def snapshot(self):
+        # The server answers from its current data, so a snapshot is a second
+        # connection rather than a copy
+        engine = RemoteEngine(self.url, self.timeout)
+        engine._set_categories(self.categories)
+        return engine
+
+    def copy_records(self):
+        return self
+
+    # Records -----------------------------------------------------------------
+
+    def add_record(self, record_type, date, amount, category, description="", recurring=False, frequency="monthly"):
+        return self._write("POST", f"/records/{record_type.lower()}", {
+            "date": str(date), "amount": float(amount), "category": category, "description": description,
+            "recurring": bool(recurring), "frequency": frequency
+        })["id"]
+
+    def edit_record(self, record_type, record_id, record, series=None):
+        body = {"record": record}
+        if series is not None:
+            body["series"] = series
+        self._write("PUT", f"/records/{record_type.lower()}/{record_id}", body)
+
+    def delete_record(self, record_type, record_id):
+        self._write("DELETE", f"/records/{record_type.lower()}/{record_id}")
+
+    def get_record(self, record_type, record_id):
+        try:
+            return self.request("GET", f"/records/{record_type.lower()}/{record_id}")
+        except KeyError:
+            return None
+
+    def import_columns(self, split):
+        if not split:
+            return {}
+        return self._write("POST", "/import", {record_type: _jsonable(columns) for record_type, columns in split.items()})
+
+    # Categories and spending limits -------------------------------------------
+
+    def save_categories(self):
+        self._set_categories(self._write("PUT", "/categories", self.categories))
+
+    def add_category(self, category_type, name):
+        self._set_categories(self._write("POST", f"/categories/{category_type.lower()}", {"name": name}))
+
+    def delete_category(self, category_type, index):
+        self._set_categories(self._write("DELETE", f"/categories/{category_type.lower()}/{index}"))
+
+    def set_spending_limit(self, category, limit, period="monthly"):
+        self._set_categories(self._write("PUT", "/limits/" + quote(category, safe=""), {"limit": float(limit), "period": period}))
+
+    def delete_spending_limit(self, category):
+        self._set_categories(self._write("DELETE", "/limits/" + quote(category, safe="")))
+
+    # Queries -------------------------------------------------------------------
+
+    def view(self, record_type, start_date=None, end_date=None, include_projected=False, query=None):
+        return RemoteView(self, record_type.lower(), {
+            "start": start_date, "end": end_date, "projected": include_projected, "search": query or None
+        })
+
+    def totals_by_period(self, record_type, granularity="month", start_date=None, end_date=None, include_projected=False):
+        return self.request("GET", f"/totals/{record_type.lower()}", {
+            "granularity": granularity, "start": start_date, "end": end_date, "projected": include_projected
+        })
+
+    def totals_by_category(self, record_type, start_date=None, end_date=None, include_projected=False):
+        return self.request("GET", f"/totals/{record_type.lower()}/categories", {
+            "start": start_date, "end": end_date, "projected": include_projected
+        })
+
+    def analyze_categories(self, start_date=None, end_date=None, include_projected=False):
+        result = self.request("GET", "/analysis", {"start": start_date, "end": end_date, "projected": include_projected})
+        return {
+            record_type: {name: tuple(pair) for name, pair in extremes.items()}
+            for record_type, extremes in result.items()
+        }
+
+    def budget_status(self, today=None, include_projected=False):
+        # The server's today decides the current periods
+        return [tuple(row) for row in self.request("GET", "/budget", {"projected": include_projected})]
+
+    def forecast(self, months=12, today=None):
+        # The server's today decides the first month forecast
+        return self.request("GET", "/forecast", {"months": months})
+
+    def export(self, output_folder, export_format, start_date=None, end_date=None, progress=None):
+        """Write the records in the range to ``output_folder``, paging them
+        from the server; see ``finance_core.export.export_views``."""
+        views = {record_type: self.view(record_type, start_date, end_date) for record_type in ("income", "expense")}
+        return export_views(views, output_folder, export_format, progress)
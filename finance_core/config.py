@@ -0,0 +1,53 @@
+import json
+import os
+
+
+CONFIG_NAME = "config.json"
+
+DEFAULT_CONFIG = {
+    # "json" for the snapshot files + journal, "sqlite" for a SQLite database
+    "backend": "json",
+    # SQLite database, relative to the data folder
+    "sqlite_file": "finance.db",
+    # JSON record files are split per "year" or per "month"; only used when
+    # a folder is first converted from the single-file layout
+    "partition": "year",
+    # Format of those files: "json", or "binary" for memory-mapped
+    # fixed-width records; folders in the other format are converted on load
+    "record_format": "json",
+    # Logging threshold; DEBUG logs every timing span
+    "log_level": "WARNING",
+    # Span timings and counters: a JSON file written on exit (relative to the
+    # data folder) and/or a Prometheus /metrics endpoint on this local port
+    "metrics_file": None,
+    "metrics_port": None,
+    # URL of a ledger server ("python -m finance_tracker serve") for the GUI
+    # to use instead of opening the data folder itself
+    "server": None
+}
+
+
+def load_config(data_folder):
+    config = dict(DEFAULT_CONFIG)
+    path = os.path.join(data_folder, CONFIG_NAME)
+    if os.path.exists(path):
+        with open(path, "r") as file:
+            config.update(json.load(file))
+    return config
+
+
+def save_config(data_folder, config):
+    with open(os.path.join(data_folder, CONFIG_NAME), "w") as file:
+        json.dump(config, file, indent=2)
+
+
+def open_store(data_folder, config=None):
+    # Build the storage backend selected in config.json
+    config = config or load_config(data_folder)
+    if config["backend"] == "sqlite":
+        from .sqlite_store import SQLiteStore
+        return SQLiteStore(os.path.join(data_folder, config["sqlite_file"]))
+    if config["backend"] == "json":
+        from .storage import JsonStore
+        return JsonStore(data_folder, config.get("partition", "year"), config.get("record_format", "json"))
+    raise ValueError(f"Unknown storage backend: {config['backend']}")
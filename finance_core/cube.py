@@ -0,0 +1,184 @@
+import numpy as np
+
+from .ledger import to_day
+
+
+GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+# Days added beyond the needed range whenever the day axis grows
+GROWTH = 366
+
+
+def _bucket_keys(days, granularity):
+    # Integer key per day (days as int64 since 1970-01-01); equal keys share
+    # a bucket and keys grow with the date
+    if granularity == "day":
+        return days
+    if granularity == "week":
+        # Weeks start on Monday; 1970-01-01 was a Thursday
+        return days - (days + 3) % 7
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if granularity == "month":
+        return months
+    if granularity == "quarter":
+        return months // 3
+    if granularity == "year":
+        return months // 12
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def _bucket_labels(keys, granularity):
+    # Labels for an int64 array of bucket keys
+    if granularity in ("day", "week"):
+        return keys.astype("datetime64[D]").astype(str).tolist()
+    if granularity == "month":
+        return keys.astype("datetime64[M]").astype(str).tolist()
+    if granularity == "quarter":
+        return [f"{1970 + key // 4}-Q{key % 4 + 1}" for key in keys.tolist()]
+    return [str(1970 + key) for key in keys.tolist()]
+
+
+def period_of(date, granularity):
+    """Label of the period containing ``date``."""
+    day = np.array([to_day(date).astype(np.int64)])
+    return _bucket_labels(_bucket_keys(day, granularity), granularity)[0]
+
+
+def period_start(label, granularity):
+    """First day of a period label ("2024-03", "2024-Q1", "2024", ...) as
+    ``datetime64[D]``, for plotting periods on a date axis."""
+    if granularity == "quarter":
+        year, quarter = label.split("-Q")
+        return np.datetime64(f"{year}-{(int(quarter) - 1) * 3 + 1:02d}", "M").astype("datetime64[D]")
+    return np.datetime64(label).astype("datetime64[D]")
+
+
+class TimeCube:
+    """Totals and counts per (day, category) for one record type.
+
+    Dense NumPy arrays with one row per day between the first and last
+    record (the day axis grows as needed) and one column per category.
+    Adding or removing a record updates one cell. Totals for any date range
+    at any of ``GRANULARITIES`` are reduced from the day rows with
+    ``np.add.reduceat``, without touching the ledger.
+    """
+
+    def __init__(self):
+        self.origin = 0
+        self.totals = np.zeros((0, 0))
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+        self.categories = []
+        self._columns = {}
+
+    def copy(self):
+        cube = TimeCube()
+        cube.origin = self.origin
+        cube.totals = self.totals.copy()
+        cube.counts = self.counts.copy()
+        cube.categories = list(self.categories)
+        cube._columns = dict(self._columns)
+        return cube
+
+    def _column(self, category):
+        column = self._columns.get(category)
+        if column is None:
+            column = self._columns[category] = len(self.categories)
+            self.categories.append(category)
+        return column
+
+    def _fit(self, first_day, last_day):
+        # Grow the arrays to cover [first_day, last_day] and every column
+        rows, columns = self.totals.shape
+        width = len(self.categories)
+        if rows == 0:
+            origin, stop = first_day, last_day + 1
+        else:
+            origin = min(self.origin, first_day)
+            stop = max(self.origin + rows, last_day + 1)
+            if origin < self.origin:
+                origin -= GROWTH
+            if stop > self.origin + rows:
+                stop += GROWTH
+        if rows and origin == self.origin and stop == self.origin + rows and width == columns:
+            return
+        totals = np.zeros((stop - origin, width))
+        counts = np.zeros((stop - origin, width), dtype=np.int64)
+        offset = self.origin - origin
+        totals[offset:offset + rows, :columns] = self.totals
+        counts[offset:offset + rows, :columns] = self.counts
+        self.origin, self.totals, self.counts = origin, totals, counts
+
+    def add(self, date, category, amount, count=1):
+        day = int(to_day(date).astype(np.int64))
+        column = self._column(category)
+        self._fit(day, day)
+        self.totals[day - self.origin, column] += amount
+        self.counts[day - self.origin, column] += count
+
+    def remove(self, date, category, amount):
+        self.add(date, category, -amount, -1)
+
+    def add_many(self, days, categories, totals, counts):
+        """Add pre-aggregated cells: parallel sequences of dates, category
+        names, totals and counts."""
+        days = np.asarray(days, dtype="datetime64[D]").astype(np.int64)
+        if not len(days):
+            return
+        columns = np.array([self._column(category) for category in categories], dtype=np.int64)
+        self._fit(int(days.min()), int(days.max()))
+        rows = days - self.origin
+        np.add.at(self.totals, (rows, columns), np.asarray(totals, dtype=np.float64))
+        np.add.at(self.counts, (rows, columns), np.asarray(counts, dtype=np.int64))
+
+    def totals_by_period(self, granularity="month", start_date=None, end_date=None):
+        """``{period: {category: total}}`` for the populated cells inside the
+        inclusive range, oldest period first. Periods are labelled
+        "YYYY-MM-DD" (day, and week by its Monday), "YYYY-MM", "YYYY-Qn" and
+        "YYYY"; the range is applied by day, so edge periods can be partial."""
+        rows = len(self.totals)
+        first = 0 if start_date is None else max(int(to_day(start_date).astype(np.int64)) - self.origin, 0)
+        stop = rows if end_date is None else min(int(to_day(end_date).astype(np.int64)) - self.origin + 1, rows)
+        if first >= stop:
+            return {}
+
+        keys = _bucket_keys(np.arange(self.origin + first, self.origin + stop, dtype=np.int64), granularity)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        totals = np.add.reduceat(self.totals[first:stop], starts, axis=0)
+        counts = np.add.reduceat(self.counts[first:stop], starts, axis=0)
+
+        labels = _bucket_labels(keys[starts], granularity)
+        buckets, columns = np.nonzero(counts)
+        result = {}
+        for bucket, column, total in zip(buckets.tolist(), columns.tolist(), totals[buckets, columns].tolist()):
+            result.setdefault(labels[bucket], {})[self.categories[column]] = total
+        return result
+
+    def category_total(self, category, start_date, end_date):
+        """Total of one category over an inclusive date range."""
+        column = self._columns.get(category)
+        if column is None:
+            return 0.0
+        first = max(int(to_day(start_date).astype(np.int64)) - self.origin, 0)
+        stop = min(int(to_day(end_date).astype(np.int64)) - self.origin + 1, len(self.totals))
+        if first >= stop:
+            return 0.0
+        return float(self.totals[first:stop, column].sum())
+
+    # Persistence -----------------------------------------------------------
+
+    def to_json(self):
+        # Populated cells only, as parallel lists
+        rows, columns = np.nonzero(self.counts)
+        return {
+            "day": (rows + self.origin).tolist(),
+            "category": [self.categories[column] for column in columns.tolist()],
+            "total": self.totals[rows, columns].tolist(),
+            "count": self.counts[rows, columns].tolist()
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        cube = cls()
+        cube.add_many(np.asarray(data["day"], dtype=np.int64).astype("datetime64[D]"),
+                      data["category"], data["total"], data["count"])
+        return cube
@@ -0,0 +1,107 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+
+class DateIndex:
+    """Ledger positions kept sorted by day ordinal.
+
+    ``keys`` and ``positions`` are parallel sequences ordered by date, so a
+    range lookup is two bisections plus a slice. Rows sharing a day keep
+    their insertion order. An index built in one go holds NumPy arrays (or,
+    for rows already in date order, a ``range``), which cost nothing to copy
+    or map from disk; they become lists on the first insert or remove.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.positions = []
+        # positions as an array, cached until the next change
+        self._array = None
+
+    @classmethod
+    def build(cls, days):
+        # days: int64 day ordinals where days[i] belongs to ledger position i
+        index = cls()
+        order = np.argsort(days, kind="stable")
+        index.keys = days[order]
+        index.positions = order
+        return index
+
+    @classmethod
+    def in_order(cls, days):
+        # Rows already sorted by date; days may be a view of a mapped file
+        index = cls()
+        index.keys = days
+        index.positions = range(len(days))
+        return index
+
+    def copy(self):
+        # Arrays and ranges are never changed in place, so they are shared
+        index = DateIndex()
+        index.keys = list(self.keys) if isinstance(self.keys, list) else self.keys
+        index.positions = list(self.positions) if isinstance(self.positions, list) else self.positions
+        index._array = self._array
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _editable(self):
+        if not isinstance(self.keys, list):
+            self.keys = self.keys.tolist()
+        if not isinstance(self.positions, list):
+            self.positions = list(self.positions) if isinstance(self.positions, range) else self.positions.tolist()
+
+    def insert(self, day, position):
+        self._editable()
+        slot = bisect_right(self.keys, day)
+        self.keys.insert(slot, day)
+        self.positions.insert(slot, position)
+        self._array = None
+
+    def _locate(self, day, position):
+        lo = bisect_left(self.keys, day)
+        hi = bisect_right(self.keys, day, lo)
+        return self.positions.index(position, lo, hi)
+
+    def remove(self, day, position):
+        self._editable()
+        slot = self._locate(day, position)
+        del self.keys[slot]
+        del self.positions[slot]
+        self._array = None
+
+    def move(self, day, old_position, new_position):
+        # Repoint an entry after its row moved inside the ledger
+        self._editable()
+        self.positions[self._locate(day, old_position)] = new_position
+        self._array = None
+
+    def array(self):
+        # All positions in date order as an intp array
+        if self._array is None:
+            self._array = self.between(0, len(self.positions))
+        return self._array
+
+    def between(self, lo, hi):
+        # Positions of index slots lo..hi as an intp array
+        positions = self.positions[lo:hi]
+        if isinstance(positions, range):
+            return np.arange(positions.start, positions.stop, dtype=np.intp)
+        return np.asarray(positions, dtype=np.intp)
+
+    def bounds(self, start_day=None, end_day=None):
+        keys = self.keys
+        if not isinstance(keys, list):
+            lo = 0 if start_day is None else int(np.searchsorted(keys, start_day, side="left"))
+            hi = len(keys) if end_day is None else int(np.searchsorted(keys, end_day, side="right"))
+            return lo, max(lo, hi)
+        lo = 0 if start_day is None else bisect_left(keys, start_day)
+        hi = len(keys) if end_day is None else bisect_right(keys, end_day, lo)
+        return lo, hi
+
+    def range(self, start_day=None, end_day=None, newest_first=True):
+        lo, hi = self.bounds(start_day, end_day)
+        positions = self.between(lo, hi)
+        return positions[::-1] if newest_first else positions
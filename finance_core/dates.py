@@ -0,0 +1,70 @@
+import re
+from datetime import date
+
+import numpy as np
+
+
+# The two spellings records are stored with: ISO, and the day-first form
+# the date pickers produce
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+DAY_FIRST_DATE = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+
+
+def parse_date(text):
+    """Parse "YYYY-MM-DD" or "DD/MM/YYYY" into ``datetime64[D]``.
+
+    Slash dates are always read day first, so "05/06/2024" is 5 June.
+    Anything else is rejected rather than guessed at, as are slash dates
+    that only make sense month first ("10/22/2024").
+    """
+    text = text.strip()
+    if ISO_DATE.fullmatch(text):
+        try:
+            return np.datetime64(text, "D")
+        except ValueError:
+            raise ValueError(f"Invalid date {text!r}") from None
+    match = DAY_FIRST_DATE.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Unrecognised date {text!r}; expected YYYY-MM-DD or DD/MM/YYYY")
+    day, month, year = (int(part) for part in match.groups())
+    if month > 12 and day <= 12:
+        raise ValueError(f"Ambiguous date {text!r}: looks month first; expected DD/MM/YYYY")
+    try:
+        return np.datetime64(f"{year:04d}-{month:02d}-{day:02d}", "D")
+    except ValueError:
+        raise ValueError(f"Invalid date {text!r}") from None
+
+
+def to_day(value):
+    # Accept date/datetime objects, numpy datetimes and date strings
+    if isinstance(value, np.datetime64):
+        return value.astype("datetime64[D]")
+    if hasattr(value, "isoformat"):
+        return np.datetime64(value.isoformat()[:10], "D")
+    if not isinstance(value, str):
+        # Numbers and the like are not dates, even where NumPy would take them
+        raise ValueError(f"Unrecognised date {value!r}; expected YYYY-MM-DD or DD/MM/YYYY")
+    return parse_date(value)
+
+
+def day_number(value):
+    # Integer day ordinal (days since 1970-01-01) used as the date index key
+    return int(to_day(value).astype(np.int64))
+
+
+def to_days(values):
+    """Convert a column of dates to ``datetime64[D]``, parsing each distinct
+    string once. Accepts what ``to_day`` does and raises ValueError like
+    ``parse_date`` for anything else."""
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return values.astype("datetime64[D]")
+    distinct = set(values)
+    if all(ISO_DATE.fullmatch(value) if isinstance(value, str) else isinstance(value, (date, np.datetime64))
+           for value in distinct):
+        # Canonical column: NumPy parses it in one pass
+        try:
+            return np.asarray(values, dtype="datetime64[D]")
+        except ValueError:
+            pass
+    days = {value: to_day(value) for value in distinct}
+    return np.array([days[value] for value in values], dtype="datetime64[D]")
@@ -0,0 +1,52 @@
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of a series sorted by x.
+
+    Keeps the first and last points and, from each of ``threshold - 2``
+    equal buckets in between, the point forming the largest triangle with
+    the previously kept point and the next bucket's average. Peaks and
+    troughs survive, unlike with plain striding. Returns ``(x, y)`` arrays of
+    at most ``threshold`` points; shorter series are returned unchanged.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold < 3 or n <= threshold:
+        return x, y
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Averages of each bucket's successor (the last point for the last
+    # bucket), from running sums rather than one mean per bucket
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    next_starts = np.append(starts[1:], n - 1)
+    next_ends = np.append(ends[1:], n)
+    sizes = next_ends - next_starts
+    next_x = (x_sums[next_ends] - x_sums[next_starts]) / sizes
+    next_y = (y_sums[next_ends] - y_sums[next_starts]) / sizes
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        start, end = starts[bucket], ends[bucket]
+        kept_x, kept_y = x[kept], y[kept]
+        # Twice the triangle area; the constant factor does not matter
+        areas = np.abs((kept_x - next_x[bucket]) * (y[start:end] - kept_y) - (kept_x - x[start:end]) * (next_y[bucket] - kept_y))
+        kept = start + int(areas.argmax())
+        selected[bucket + 1] = kept
+    return x[selected], y[selected]
+
+
+def visible(x, y, low, high, threshold):
+    """The part of a sorted series between ``low`` and ``high``, plus one
+    point either side so lines run to the edges, downsampled to
+    ``threshold`` points."""
+    first = max(int(np.searchsorted(x, low, side="left")) - 1, 0)
+    last = min(int(np.searchsorted(x, high, side="right")) + 1, len(x))
+    return lttb(x[first:last], y[first:last], threshold)
@@ -0,0 +1,363 @@
+import copy
+import os
+import threading
+
+from .budget import Budget, make_limit
+from .config import load_config, open_store
+from .cube import GRANULARITIES, period_of
+from .dates import to_day
+from .export import export_views
+from .forecast import cash_flow
+from .importer import read_statement, split_by_type, to_operation
+from .ledger import Ledger
+from .metrics import span
+from .recurrence import TEMPLATE_FIELDS, ProjectedView, project
+from .search import parse_query, record_matches
+from .storage import DEFAULT_CATEGORIES
+
+
+def _budget_categories(operation):
+    # Expense categories whose spending an operation can raise
+    if operation["op"] == "import":
+        columns = operation["records"].get("expense")
+        return set() if columns is None else set(columns["category"])
+    if operation["op"] in ("add", "edit") and operation["type"] == "expense":
+        return {operation["record"]["category"]}
+    return set()
+
+
+def _type(record_type):
+    # "Expense"/"expense" -> "expense"
+    record_type = record_type.lower()
+    if record_type not in ("expense", "income"):
+        raise ValueError(f"Unknown record type: {record_type}")
+    return record_type
+
+
+class FinanceEngine:
+    """Ledgers, categories, budgets and analyses, without any GUI.
+
+    The Tk app and the command line are both clients of this class. Record
+    types are "expense" and "income" (any capitalisation); dates are
+    "YYYY-MM-DD" or "DD/MM/YYYY" strings or date objects, and are stored as
+    "YYYY-MM-DD"; ``None`` leaves a range open.
+    """
+
+    def __init__(self, data_folder, config=None):
+        self.data_folder = data_folder
+        os.makedirs(data_folder, exist_ok=True)
+
+        # Storage backend (JSON files + journal, or SQLite) from config.json
+        self.config = config or load_config(data_folder)
+        self.store = open_store(data_folder, self.config)
+
+        self.expenses = Ledger()
+        self.income = Ledger()
+        self.categories = copy.deepcopy(DEFAULT_CATEGORIES)
+        self.rollup = None
+
+        # Called with a list of alert dicts (see Budget.alerts) whenever a
+        # change takes spending past 80% or 100% of a limit
+        self.budget_listeners = []
+
+        # Held while the in-memory ledgers change, and by copy_records
+        self.lock = threading.RLock()
+        # True for a snapshot whose ledgers are still this engine's
+        self.shared = False
+
+    def load(self):
+        """Open the store and return a list of error messages. The JSON store
+        reads record partitions lazily; queries read the ones they reach."""
+        with span("load", type(self.store).__name__) as timing:
+            self.expenses, self.income, self.categories, errors = self.store.load()
+            # Month x category totals maintained by the store on every change
+            self.rollup = self.store.rollup
+            timing.count("records_scanned", len(self.expenses) + len(self.income))
+        return errors
+
+    def ledger(self, record_type):
+        return self.expenses if _type(record_type) == "expense" else self.income
+
+    def ledgers(self):
+        return {"expense": self.expenses, "income": self.income}
+
+    def commit(self, operation):
+        # Apply an add/edit/delete and persist it through the storage
+        # backend, then report any budget threshold it crossed
+        budget = self.budget()
+        before = budget.watch(_budget_categories(operation))
+        with self.lock:
+            self.store.commit(operation, self.ledgers(), self.categories)
+        alerts = budget.alerts(before) if before else []
+        if alerts:
+            for listener in self.budget_listeners:
+                listener(alerts)
+
+    def save(self, background=True):
+        # With background=True this times the copy; the write is "save.write"
+        with span("save"), self.lock:
+            self.store.save(self.ledgers(), self.categories, background=background)
+
+    def close(self):
+        self.store.close()
+
+    def snapshot(self):
+        """A read-only copy for queries on a worker thread while this engine
+        keeps changing. Only the categories and the rollup, which aggregate
+        queries read, are copied here. The ledgers stay shared until the
+        worker calls ``copy_records``; reading records before that raises.
+        Series older than their template fields get them filled in from
+        their records here, on the calling thread."""
+        snapshot = copy.copy(self)
+        snapshot.categories = copy.deepcopy(self.categories)
+        recurring = snapshot.categories["recurring"]
+        for record_type in ("expense", "income"):
+            filled = []
+            for series in recurring[record_type]:
+                if "amount" not in series:
+                    record = self.get_record(record_type, series["id"])
+                    if record is None:
+                        continue
+                    series.update({key: record[key] for key in TEMPLATE_FIELDS})
+                filled.append(series)
+            recurring[record_type] = filled
+        snapshot.rollup = self.rollup.copy()
+        snapshot.shared = True
+        return snapshot
+
+    def copy_records(self):
+        # Give a snapshot its own in-memory ledgers, copied under the lock so
+        # no change lands halfway through. SQLite ledgers are shared, as
+        # every query is its own statement.
+        with self.lock:
+            if isinstance(self.expenses, Ledger):
+                self.expenses = self.expenses.copy()
+                self.income = self.income.copy()
+        self.shared = False
+        return self
+
+    def _check_records(self):
+        if self.shared:
+            raise RuntimeError("A snapshot reads records only after copy_records()")
+
+    def _require(self, ledger, record_type, start_date=None, end_date=None):
+        # Read partitions into a ledger under the lock (see copy_records)
+        self._check_records()
+        with self.lock:
+            self.store.require(ledger, record_type, start_date, end_date)
+
+    # Records ---------------------------------------------------------------
+
+    def add_record(self, record_type, date, amount, category, description="", recurring=False, frequency="monthly"):
+        """Add a record and return its id."""
+        record = {
+            "amount": float(amount),
+            "category": category,
+            "date": str(to_day(date)),
+            "description": description,
+            "recurring": bool(recurring)
+        }
+        operation = {"op": "add", "type": _type(record_type), "record": record}
+        if recurring:
+            operation["series"] = {"frequency": frequency}
+        self.commit(operation)
+        return record["id"]
+
+    def edit_record(self, record_type, record_id, record, series=None):
+        record = dict(record, date=str(to_day(record["date"])))
+        operation = {"op": "edit", "type": _type(record_type), "id": record_id, "record": record}
+        if series is not None:
+            operation["series"] = series
+        self.commit(operation)
+
+    def delete_record(self, record_type, record_id):
+        self.commit({"op": "delete", "type": _type(record_type), "id": record_id})
+
+    def import_columns(self, split):
+        """Add ``{"expense": columns, "income": columns}`` (see
+        ``finance_core.importer``) as one journal operation, so the whole
+        statement lands in a single transaction, then save once. Returns the
+        number of records added per type."""
+        if not split:
+            return {}
+        counts = {record_type: len(columns["date"]) for record_type, columns in split.items()}
+        with span("import") as timing:
+            self.commit(to_operation(split))
+            timing.count("records_scanned", sum(counts.values()))
+        self.save()
+        return counts
+
+    def import_file(self, path, record_type=None, **options):
+        """Import a CSV or OFX/QFX bank statement; ``options`` go to
+        ``finance_core.importer.read_csv``. Without a ``record_type`` money
+        out becomes expenses and money in income."""
+        record_type = _type(record_type) if record_type else None
+        return self.import_columns(split_by_type(read_statement(path, **options), record_type))
+
+    def get_record(self, record_type, record_id):
+        # The stored record with this id, or None
+        self._check_records()
+        ledger = self.ledger(record_type)
+        with self.lock:
+            self.store.require_id(ledger, _type(record_type), record_id)
+        position = ledger.position_of(record_id)
+        return None if position is None else ledger[position]
+
+    # Categories and spending limits ---------------------------------------
+
+    def save_categories(self):
+        self.store.save_categories(self.categories)
+
+    def add_category(self, category_type, name):
+        self.categories[_type(category_type)].append(name)
+        self.save_categories()
+
+    def delete_category(self, category_type, index):
+        del self.categories[_type(category_type)][index]
+        self.save_categories()
+
+    def set_spending_limit(self, category, limit, period="monthly"):
+        # period is "weekly", "monthly" or "yearly"
+        self.categories["spending_limits"][category] = make_limit(limit, period)
+        self.save_categories()
+
+    def delete_spending_limit(self, category):
+        del self.categories["spending_limits"][category]
+        self.save_categories()
+
+    # Queries ---------------------------------------------------------------
+
+    def projected(self, record_type, start_date=None, end_date=None):
+        # Projected occurrences of the recurring records inside the range
+        record_type = _type(record_type)
+        series_list = self.categories["recurring"][record_type]
+        ledger = self.ledger(record_type)
+        for series in series_list:
+            if "amount" not in series:
+                # Older series read their record, dated on the series' start
+                self._require(ledger, record_type, series["start"], series["start"])
+        return list(project(series_list, ledger, start_date, end_date))
+
+    def view(self, record_type, start_date=None, end_date=None, include_projected=False, query=None):
+        """Rows of the inclusive date range, newest first. ``query`` keeps
+        the rows whose description or category contains every term, e.g.
+        "fuel" or "car* rental" (a trailing ``*`` matches word starts)."""
+        record_type = _type(record_type)
+        with span("filter", record_type) as timing:
+            ledger = self.ledger(record_type)
+            self._require(ledger, record_type, start_date, end_date)
+            # Projecting may read more partitions, so it goes before the view
+            projected = self.projected(record_type, start_date, end_date) if include_projected else []
+            terms = parse_query(query)
+            if terms:
+                projected = [record for record in projected if record_matches(record, terms)]
+            view = ledger.view(start_date, end_date, query=query)
+            if projected:
+                view = ProjectedView(view, projected)
+            timing.count("records_scanned", len(view))
+        return view
+
+    def records_between(self, record_type, start_date=None, end_date=None):
+        # Stored records inside the range, newest first
+        ledger = self.ledger(record_type)
+        self._require(ledger, _type(record_type), start_date, end_date)
+        return ledger.records_between(start_date, end_date)
+
+    def _add_projected(self, totals, record_type, start_date, end_date, key):
+        # Fold projected occurrences into a totals dict, grouped by key(record)
+        for record in self.projected(record_type, start_date, end_date):
+            group = key(record)
+            totals[group] = totals.get(group, 0) + record["amount"]
+        return totals
+
+    def totals_by_category(self, record_type, start_date=None, end_date=None, month=None, include_projected=False):
+        record_type = _type(record_type)
+        with span("aggregate", "by category"):
+            totals = self.rollup.totals_by_category(record_type, start_date, end_date, month=month)
+            if include_projected and month is None:
+                self._add_projected(totals, record_type, start_date, end_date, lambda record: record["category"])
+        return totals
+
+    def totals_by_month(self, record_type, start_date=None, end_date=None, include_projected=False):
+        record_type = _type(record_type)
+        with span("aggregate", "by month"):
+            totals = self.rollup.totals_by_month(record_type, start_date, end_date)
+            if include_projected:
+                self._add_projected(totals, record_type, start_date, end_date, lambda record: record["date"][:7])
+                totals = dict(sorted(totals.items()))
+        return totals
+
+    def totals_by_period(self, record_type, granularity="month", start_date=None, end_date=None, include_projected=False):
+        """``{period: {category: total}}`` at one of ``GRANULARITIES`` ("day",
+        "week", "month", "quarter", "year"), read from the rollup's day x
+        category cube without scanning the ledger."""
+        record_type = _type(record_type)
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        with span("aggregate", f"by {granularity} and category"):
+            result = self.rollup.totals_by_period(record_type, granularity, start_date, end_date)
+            if include_projected:
+                for record in self.projected(record_type, start_date, end_date):
+                    totals = result.setdefault(period_of(record["date"], granularity), {})
+                    totals[record["category"]] = totals.get(record["category"], 0) + record["amount"]
+                result = dict(sorted(result.items()))
+        return result
+
+    def totals_by_month_and_category(self, record_type, start_date=None, end_date=None, include_projected=False):
+        return self.totals_by_period(record_type, "month", start_date, end_date, include_projected)
+
+    def analyze_categories(self, start_date=None, end_date=None, include_projected=False):
+        """Highest and lowest category per record type, as
+        ``{"expense": {"highest": (category, total), "lowest": ...}, "income": ...}``."""
+        result = {}
+        for record_type in ("expense", "income"):
+            totals = self.totals_by_category(record_type, start_date, end_date, include_projected=include_projected)
+            highest = max(totals, key=totals.get, default=None)
+            lowest = min(totals, key=totals.get, default=None)
+            result[record_type] = {
+                "highest": (highest, totals.get(highest, 0)),
+                "lowest": (lowest, totals.get(lowest, 0))
+            }
+        return result
+
+    def budget(self):
+        return Budget(self.rollup, self.categories["spending_limits"])
+
+    def budget_status(self, today=None, include_projected=False):
+        """``(category, spent, limit, remaining, period)`` for every spending
+        limit, using the expenses in the limit's current week, month or year."""
+        projected = self._projected_by_category if include_projected else None
+        with span("aggregate", "budget"):
+            return self.budget().status(today, projected)
+
+    def _projected_by_category(self, start_date, end_date):
+        # Projected expenses per category, for Budget.status
+        return self._add_projected({}, "expense", start_date, end_date, lambda record: record["category"])
+
+    def forecast(self, months=12, today=None):
+        """Income, spending per category and balance projected for the
+        ``months`` months after the current one, from the month totals and
+        the recurring series; see ``finance_core.forecast.cash_flow``."""
+        recurring = {}
+        for record_type in ("expense", "income"):
+            ledger = self.ledger(record_type)
+            pairs = recurring[record_type] = []
+            for series in self.categories["recurring"][record_type]:
+                if "amount" in series:
+                    # The series' copy of its record, which no partition has to be read for
+                    pairs.append((series, dict(series, date=series["start"])))
+                    continue
+                self._require(ledger, record_type, series["start"], series["start"])
+                position = ledger.position_of(series["id"])
+                if position is not None:
+                    pairs.append((series, ledger[position]))
+        with span("aggregate", "forecast"):
+            return cash_flow(self.rollup, recurring, months, today)
+
+    # Export ----------------------------------------------------------------
+
+    def export(self, output_folder, export_format, start_date=None, end_date=None, progress=None):
+        """Stream the records in the range to ``output_folder`` and return the
+        paths written; see ``finance_core.export.export_views``."""
+        views = {record_type: self.view(record_type, start_date, end_date) for record_type in ("income", "expense")}
+        return export_views(views, output_folder, export_format, progress)
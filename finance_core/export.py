@@ -0,0 +1,168 @@
+import csv
+import importlib.util
+import json
+import os
+
+from .metrics import span
+
+
+# Rows fetched from a record view per step; bounds the memory of an export
+EXPORT_CHUNK = 10000
+
+FIELDS = ("amount", "category", "date", "recurring", "description", "id")
+
+EXPORT_FORMATS = ("CSV", "NDJSON", "JSON", "XLSX", "PARQUET")
+
+# Optional package each format needs
+REQUIREMENTS = {"XLSX": "openpyxl", "PARQUET": "pyarrow"}
+
+# Output file per record type, or one file for both
+FILE_NAMES = {
+    "CSV": {"income": "income_records.csv", "expense": "expense_records.csv"},
+    "NDJSON": {"income": "income_records.ndjson", "expense": "expense_records.ndjson"},
+    "PARQUET": {"income": "income_records.parquet", "expense": "expense_records.parquet"},
+    "JSON": "records.json",
+    "XLSX": "records.xlsx"
+}
+
+
+def available_formats():
+    return [export_format for export_format in EXPORT_FORMATS
+            if export_format not in REQUIREMENTS or importlib.util.find_spec(REQUIREMENTS[export_format]) is not None]
+
+
+def iter_chunks(view, chunk=EXPORT_CHUNK):
+    """Yield a record view's rows in lists of at most ``chunk`` records."""
+    for start in range(0, len(view), chunk):
+        yield view.rows(start, start + chunk)
+
+
+class _Progress:
+    # Turns rows written into a 0..1 fraction for the caller's callback
+    def __init__(self, callback, total):
+        self.callback = callback or (lambda fraction, message: None)
+        self.total = max(total, 1)
+        self.done = 0
+
+    def advance(self, rows, message):
+        self.done += rows
+        self.callback(min(self.done / self.total, 1.0), message)
+
+
+def _write_csv(path, view, progress):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        for rows in iter_chunks(view):
+            writer.writerows(rows)
+            progress.advance(len(rows), f"Writing {os.path.basename(path)}")
+
+
+def _write_ndjson(path, view, progress):
+    with open(path, "w", encoding="utf-8") as file:
+        for rows in iter_chunks(view):
+            file.write("".join(json.dumps(row) + "\n" for row in rows))
+            progress.advance(len(rows), f"Writing {os.path.basename(path)}")
+
+
+def _write_parquet(path, view, progress):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("amount", pa.float64()),
+        ("category", pa.string()),
+        ("date", pa.date32()),
+        ("recurring", pa.bool_()),
+        ("description", pa.string()),
+        ("id", pa.int64())
+    ])
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in iter_chunks(view):
+            columns = {name: [row[name] for row in rows] for name in FIELDS}
+            columns["category"] = [str(value) for value in columns["category"]]
+            columns["description"] = [str(value) for value in columns["description"]]
+            columns["date"] = pa.array(columns["date"], pa.string()).cast(pa.date32())
+            writer.write_table(pa.table(columns, schema=schema))
+            progress.advance(len(rows), f"Writing {os.path.basename(path)}")
+
+
+def _write_json(path, views, progress):
+    # {"income": [...], "expenses": [...]}, streamed one chunk at a time
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("{")
+        for index, (key, view) in enumerate((("income", views["income"]), ("expenses", views["expense"]))):
+            file.write(f'{"," if index else ""}\n  "{key}": [')
+            first = True
+            for rows in iter_chunks(view):
+                for row in rows:
+                    file.write(("" if first else ",") + "\n    " + json.dumps(row))
+                    first = False
+                progress.advance(len(rows), "Writing records.json")
+            file.write("\n  ]" if not first else "]")
+        file.write("\n}\n")
+
+
+def _write_xlsx(path, views, progress):
+    # Write-only workbooks stream rows to disk instead of keeping every cell
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for sheet_name, record_type in (("Income", "income"), ("Expenses", "expense")):
+        view = views[record_type]
+        if not len(view):
+            continue
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.append(FIELDS)
+        for rows in iter_chunks(view):
+            for row in rows:
+                sheet.append([row[name] for name in FIELDS])
+            progress.advance(len(rows), f"Writing {sheet_name} sheet")
+    workbook.save(path)
+
+
+def export_views(views, output_folder, export_format, progress=None):
+    """Write ``{"income": view, "expense": view}`` in ``export_format`` to
+    ``output_folder`` and return the paths written.
+
+    Rows are pulled from the views ``EXPORT_CHUNK`` at a time and written as
+    they arrive, so memory stays bounded however many rows are exported.
+    ``progress`` is called with ``(fraction, message)`` after every chunk.
+    """
+    export_format = export_format.upper()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    requirement = REQUIREMENTS.get(export_format)
+    if requirement and importlib.util.find_spec(requirement) is None:
+        raise ValueError(f"{export_format} export needs the {requirement} package")
+
+    total = sum(len(view) for view in views.values())
+    progress = _Progress(progress, total)
+    with span("export", export_format) as timing:
+        written = _export(views, output_folder, export_format, progress)
+        timing.count("records_scanned", total)
+        timing.count("bytes_written", sum(os.path.getsize(path) for path in written))
+    return written
+
+
+def _export(views, output_folder, export_format, progress):
+    file_names = FILE_NAMES[export_format]
+    if isinstance(file_names, str):
+        if not any(len(view) for view in views.values()) and export_format == "XLSX":
+            return []
+        path = os.path.join(output_folder, file_names)
+        if export_format == "JSON":
+            _write_json(path, views, progress)
+        else:
+            _write_xlsx(path, views, progress)
+        return [path]
+
+    writer = {"CSV": _write_csv, "NDJSON": _write_ndjson, "PARQUET": _write_parquet}[export_format]
+    written = []
+    for record_type in ("income", "expense"):
+        if not len(views[record_type]):
+            continue
+        path = os.path.join(output_folder, file_names[record_type])
+        writer(path, views[record_type], progress)
+        written.append(path)
+    return written
@@ -0,0 +1,187 @@
+from datetime import date
+
+import numpy as np
+
+from .dates import to_day, to_days
+
+
+# Months of (deseasonalised) history averaged into each category's level
+WINDOW = 12
+
+# Seasonal profiles need at least this many years of history; shorter
+# histories are forecast flat
+SEASONAL_YEARS = 2
+
+# Far enough past any real date to stand for "no end"
+NO_END = np.iinfo(np.int64).max // 4
+
+
+def month_number(value):
+    # Months since 1970-01; month_number(x) % 12 is the calendar month - 1
+    return int(to_day(value).astype("datetime64[M]").astype(np.int64))
+
+
+def _label_number(label):
+    # "YYYY-MM" (or an ISO date) -> month number, without a datetime parse
+    return (int(label[:4]) - 1970) * 12 + int(label[5:7]) - 1
+
+
+def monthly_matrix(months, categories, first, stop):
+    """Rollup month cells (``{"YYYY-MM": {category: [total, ...]}}``) as a
+    dense (month, category) array of totals covering ``[first, stop)``."""
+    columns = {category: column for column, category in enumerate(categories)}
+    table = np.zeros((stop - first, len(categories)))
+    for label, cells in months.items():
+        row = _label_number(label) - first
+        if 0 <= row < len(table):
+            for category, cell in cells.items():
+                table[row, columns[category]] += cell[0]
+    return table
+
+
+def moving_average(values, window=WINDOW):
+    """Trailing mean over up to ``window`` rows of a (month, category)
+    array; NaN entries are left out of the mean."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    return np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+
+def seasonal_profile(history, calendar_months):
+    """(12, category) ratio of each calendar month's mean to the category's
+    average month; 1 for categories with no spending at all."""
+    sums = np.zeros((12, history.shape[1]))
+    np.add.at(sums, calendar_months, history)
+    counts = np.bincount(calendar_months, minlength=12)[:, None]
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    average = means.mean(axis=0)
+    return np.divide(means, average, out=np.ones_like(means), where=average > 0)
+
+
+def baseline(history, first, future, window=WINDOW):
+    """Expected amount per category in each of the ``future`` month numbers:
+    the moving average of the deseasonalised history (months from ``first``
+    on), times the seasonal profile of the month forecast."""
+    if not len(history):
+        return np.zeros((len(future), history.shape[1]))
+    calendar_months = (first + np.arange(len(history))) % 12
+    if len(history) >= 12 * SEASONAL_YEARS:
+        profile = seasonal_profile(history, calendar_months)
+    else:
+        profile = np.ones((12, history.shape[1]))
+    factors = profile[calendar_months]
+    # A calendar month that never had spending says nothing about the level
+    adjusted = np.divide(history, factors, out=np.full(history.shape, np.nan), where=factors > 0)
+    level = moving_average(adjusted, window)[-1]
+    return level * profile[np.asarray(future) % 12]
+
+
+def occurrence_counts(series_list, first, stop):
+    """(series, month) number of occurrences of each series in the months
+    ``[first, stop)``, counting those ``recurrence.project`` yields (every
+    one after the first, which is a stored record, unless the series is
+    stand-alone). All series are counted at once, without listing their
+    dates."""
+    months = np.arange(first, stop, dtype=np.int64)
+    starts = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    ends = (months + 1).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) - 1
+    if not series_list:
+        return np.zeros((0, len(months)), dtype=np.int64)
+
+    anchors = to_days([series["start"] for series in series_list]).astype(np.int64)
+    last = np.array([to_day(series["end"]).astype(np.int64) if series.get("end") else NO_END
+                     for series in series_list], dtype=np.int64)
+    intervals = np.array([series.get("interval", 1) for series in series_list], dtype=np.int64)
+    frequencies = np.array([series["frequency"] for series in series_list])
+    anchor_months = anchors.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    anchor_days = anchors - anchor_months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + 1
+    day_of_month = np.array([series.get("day_of_month") or 0 for series in series_list], dtype=np.int64)
+    day_of_month = np.where(day_of_month == 0, anchor_days, day_of_month)
+    # First day that can be projected
+    earliest = anchors + np.array([series["id"] is not None for series in series_list], dtype=np.int64)
+
+    # Daily and weekly: multiples of the step from the anchor inside each
+    # month, clipped to the first projected day and the series' end
+    step = intervals * np.where(frequencies == "weekly", 7, 1)
+    lo = np.maximum(starts[None, :], earliest[:, None])
+    hi = np.minimum(ends[None, :], last[:, None])
+    spaced = (hi - anchors[:, None]) // step[:, None] - (lo - 1 - anchors[:, None]) // step[:, None]
+    spaced = np.where(lo <= hi, spaced, 0)
+
+    # Monthly and yearly: at most one occurrence in a month, on its day of
+    # the month (or the month's last day)
+    step = intervals * np.where(frequencies == "yearly", 12, 1)
+    offsets = months[None, :] - anchor_months[:, None]
+    lengths = ends - starts + 1
+    days = starts + np.where(day_of_month[:, None] == -1, lengths, np.minimum(day_of_month[:, None], lengths)) - 1
+    dated = (offsets >= 0) & (offsets % step[:, None] == 0) & (days >= earliest[:, None]) & (days <= last[:, None])
+
+    by_day = np.isin(frequencies, ("daily", "weekly"))[:, None]
+    return np.where(by_day, spaced, dated.astype(np.int64))
+
+
+def cash_flow(rollup, recurring, months=12, today=None, window=WINDOW):
+    """Forecast of income, spending per category and balance for the
+    ``months`` months after the current one.
+
+    ``recurring`` maps each record type to ``(series, record)`` pairs, the
+    record being the series' first occurrence (stored, unless the series is
+    stand-alone). Each month's forecast
+    is the category's baseline (see ``baseline``) from the month totals up
+    to last month, with recurring records left out, plus the records already
+    stored for that month and the recurring occurrences due in it. The
+    balance starts from everything recorded up to the end of this month,
+    recurring occurrences included. Returns a dict of JSON-ready lists.
+    """
+    months = int(months)
+    if months < 1:
+        raise ValueError("Forecast at least one month ahead")
+    current = month_number(today or date.today())
+    future = current + 1 + np.arange(months)
+    stop = current + 1 + months
+
+    result = {
+        "months": future.astype("datetime64[M]").astype(str).tolist(),
+        "opening_balance": 0.0,
+        "categories": {}
+    }
+    for record_type, sign in (("income", 1), ("expense", -1)):
+        cells = rollup.cells.get(record_type, {})
+        pairs = recurring.get(record_type, [])
+        categories = sorted({category for totals in cells.values() for category in totals}
+                            | {record["category"] for _, record in pairs})
+        columns = {category: column for column, category in enumerate(categories)}
+        first = min([current] + [_label_number(label) for label in cells])
+
+        amounts = np.array([record["amount"] for _, record in pairs], dtype=np.float64)
+        series_columns = np.array([columns[record["category"]] for _, record in pairs], dtype=np.intp)
+        record_months = to_days([record["date"] for _, record in pairs]).astype("datetime64[M]").astype(np.int64)
+        stored = np.array([series["id"] is not None for series, _ in pairs], dtype=bool)
+
+        table = monthly_matrix(cells, categories, first, stop)
+        history = table[:current - first].copy()
+        # Recurring records are forecast from their series instead
+        past = stored & (record_months < current)
+        np.add.at(history, (record_months[past] - first, series_columns[past]), -amounts[past])
+
+        series_first = min([current] + [_label_number(series["start"]) for series, _ in pairs])
+        counts = occurrence_counts([series for series, _ in pairs], series_first, stop)
+        due = np.zeros((len(categories), stop - series_first))
+        np.add.at(due, series_columns, counts * amounts[:, None])
+        due = due.T
+
+        forecast = baseline(history, first, future, window) + table[current + 1 - first:] + due[current + 1 - series_first:]
+        result["opening_balance"] += sign * float(table[:current + 1 - first].sum() + due[:current + 1 - series_first].sum())
+        result[record_type] = forecast.sum(axis=1).tolist()
+        result["categories"][record_type] = {
+            category: forecast[:, column].tolist() for column, category in enumerate(categories)
+            if forecast[:, column].any()
+        }
+
+    net = np.array(result["income"]) - np.array(result["expense"])
+    result["net"] = net.tolist()
+    result["balance"] = (result["opening_balance"] + np.cumsum(net)).tolist()
+    return result
@@ -0,0 +1,166 @@
+import csv
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+
+# Statement columns used when no mapping is given
+DEFAULT_MAPPING = {
+    "date": "Date",
+    "amount": "Amount",
+    "description": "Description",
+    # Optional: a category column, or separate debit/credit columns in place
+    # of a signed amount
+    "category": None,
+    "debit": None,
+    "credit": None
+}
+
+DEFAULT_CATEGORY = "Uncategorized"
+
+_OFX_TRANSACTION = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>))", re.S | re.I)
+_OFX_FIELD = re.compile(r"<(DTPOSTED|TRNAMT|NAME|MEMO)>([^<\r\n]*)", re.I)
+
+
+def parse_dates(values, date_format="%Y-%m-%d"):
+    """Parse date strings into a ``datetime64[D]`` array.
+
+    Statements repeat the same few hundred dates, so each distinct string is
+    parsed once and the results are scattered back with ``np.unique``.
+    """
+    values = np.asarray(values, dtype=str)
+    if not len(values):
+        return np.empty(0, dtype="datetime64[D]")
+    unique, inverse = np.unique(np.char.strip(values), return_inverse=True)
+    if date_format in ("%Y-%m-%d", "iso"):
+        parsed = unique.astype("datetime64[D]")
+    else:
+        parsed = np.array([datetime.strptime(value, date_format).date() for value in unique], dtype="datetime64[D]")
+    return parsed[inverse]
+
+
+def parse_amounts(values, decimal=".", thousands=","):
+    """Parse amount strings such as "1,234.50", "-12.00" or "(12.00)"."""
+    values = np.char.strip(np.asarray(values, dtype=str))
+    if not len(values):
+        return np.empty(0, dtype=np.float64)
+    if thousands:
+        values = np.char.replace(values, thousands, "")
+    if decimal != ".":
+        values = np.char.replace(values, decimal, ".")
+    for symbol in ("$", "€", "£", " "):
+        values = np.char.replace(values, symbol, "")
+    # Accounting style negatives
+    negative = np.char.startswith(values, "(")
+    values = np.char.strip(values, "()")
+    values = np.where(values == "", "0", values)
+    amounts = values.astype(np.float64)
+    amounts[negative] *= -1
+    return amounts
+
+
+def read_csv(path, mapping=None, date_format="%Y-%m-%d", delimiter=",", decimal=".", thousands=",", encoding="utf-8-sig"):
+    """Read a bank statement CSV into columns.
+
+    Returns ``{"date", "amount", "description", "category"}`` as NumPy
+    arrays; amounts are signed, money out negative. ``mapping`` names the
+    statement's columns (see ``DEFAULT_MAPPING``).
+    """
+    mapping = dict(DEFAULT_MAPPING, **(mapping or {}))
+    with open(path, "r", newline="", encoding=encoding) as file:
+        reader = csv.reader(file, delimiter=delimiter)
+        header = [name.strip() for name in next(reader)]
+        rows = [row for row in reader if any(cell.strip() for cell in row)]
+
+    def column(name):
+        if name not in header:
+            raise ValueError(f"Column {name!r} not found in {os.path.basename(path)}; columns are {header}")
+        index = header.index(name)
+        return [row[index] if index < len(row) else "" for row in rows]
+
+    if mapping["debit"] or mapping["credit"]:
+        amounts = np.zeros(len(rows))
+        if mapping["credit"]:
+            amounts += parse_amounts(column(mapping["credit"]), decimal, thousands)
+        if mapping["debit"]:
+            amounts -= np.abs(parse_amounts(column(mapping["debit"]), decimal, thousands))
+    else:
+        amounts = parse_amounts(column(mapping["amount"]), decimal, thousands)
+
+    descriptions = np.array(column(mapping["description"]) if mapping["description"] else [""] * len(rows), dtype=object)
+    categories = np.array(column(mapping["category"]) if mapping["category"] else [DEFAULT_CATEGORY] * len(rows), dtype=object)
+    categories[categories == ""] = DEFAULT_CATEGORY
+    return {
+        "date": parse_dates(column(mapping["date"]), date_format),
+        "amount": amounts,
+        "description": descriptions,
+        "category": categories
+    }
+
+
+def read_ofx(path, encoding="latin-1"):
+    """Read the transactions of an OFX/QFX statement (SGML or XML) into the
+    same columns as ``read_csv``."""
+    with open(path, "r", encoding=encoding) as file:
+        text = file.read()
+    dates, amounts, descriptions = [], [], []
+    for block in _OFX_TRANSACTION.findall(text):
+        fields = {name.upper(): value.strip() for name, value in _OFX_FIELD.findall(block)}
+        dates.append(fields.get("DTPOSTED", "")[:8])
+        amounts.append(fields.get("TRNAMT", "0"))
+        name, memo = fields.get("NAME", ""), fields.get("MEMO", "")
+        descriptions.append(f"{name} - {memo}" if name and memo and memo != name else name or memo)
+    return {
+        "date": parse_dates(dates, "%Y%m%d"),
+        "amount": parse_amounts(amounts, thousands=""),
+        "description": np.array(descriptions, dtype=object),
+        "category": np.array([DEFAULT_CATEGORY] * len(dates), dtype=object)
+    }
+
+
+def read_statement(path, **options):
+    # OFX/QFX by extension, everything else as CSV
+    if os.path.splitext(path)[1].lower() in (".ofx", ".qfx"):
+        return read_ofx(path)
+    return read_csv(path, **options)
+
+
+def split_by_type(columns, record_type=None):
+    """``{"expense": columns, "income": columns}`` with positive amounts.
+
+    Without a ``record_type`` the sign decides: money out is an expense.
+    """
+    amounts = columns["amount"]
+    if record_type is not None:
+        masks = {record_type.lower(): np.ones(len(amounts), dtype=bool)}
+    else:
+        masks = {"expense": amounts < 0, "income": amounts > 0}
+    split = {}
+    for key, mask in masks.items():
+        if mask.any():
+            split[key] = {
+                "date": columns["date"][mask],
+                "amount": np.abs(amounts[mask]),
+                "description": columns["description"][mask],
+                "category": columns["category"][mask]
+            }
+    return split
+
+
+def to_operation(split):
+    # One journal "import" operation for the output of split_by_type, with
+    # the columns as JSON lists
+    return {
+        "op": "import",
+        "records": {
+            record_type: {
+                "date": columns["date"].astype(str).tolist(),
+                "amount": columns["amount"].tolist(),
+                "category": [str(value) for value in columns["category"]],
+                "description": [str(value) for value in columns["description"]]
+            }
+            for record_type, columns in split.items()
+        }
+    }
@@ -0,0 +1,115 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that has been cancelled or superseded."""
+
+
+class Job:
+    """Handle passed to the job function as its first argument.
+
+    Long-running work should call ``progress`` now and then; it reports how
+    far along the job is and raises ``JobCancelled`` once the job has been
+    superseded, so stale work stops early instead of running to the end.
+    """
+
+    def __init__(self, key, on_done=None, on_error=None, on_progress=None):
+        self.key = key
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.future = None
+        self._cancelled = threading.Event()
+        # Latest (fraction, message) from the worker, and the last one shown
+        self._progress = None
+        self._reported = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled(self.key)
+
+    def progress(self, fraction, message=""):
+        self.check()
+        self._progress = (fraction, message)
+
+
+class JobScheduler:
+    """Runs work on a ``concurrent.futures`` executor and hands the results
+    back on the UI thread.
+
+    Each job has a key naming what it produces ("analysis", "export", ...);
+    submitting a new job for a key cancels the one still pending for it.
+    ``poll`` must be called from the UI thread (the Tk app schedules it with
+    ``master.after``): it reports progress and runs the callbacks of
+    finished jobs strictly in submission order, skipping cancelled ones.
+
+    The default executor uses threads, since the jobs read the in-memory
+    ledgers; functions must work on snapshots of state the UI may change.
+    """
+
+    def __init__(self, executor=None, max_workers=2):
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="finance-job")
+        self.jobs = deque()
+        self.latest = {}
+
+    def submit(self, key, function, *args, on_done=None, on_error=None, on_progress=None):
+        """Run ``function(job, *args)`` in the background and return the Job."""
+        previous = self.latest.get(key)
+        if previous is not None:
+            previous.cancel()
+        job = Job(key, on_done, on_error, on_progress)
+        job.future = self.executor.submit(function, job, *args)
+        self.jobs.append(job)
+        self.latest[key] = job
+        return job
+
+    def cancel(self, key):
+        job = self.latest.pop(key, None)
+        if job is not None:
+            job.cancel()
+
+    def pending(self):
+        return bool(self.jobs)
+
+    def poll(self):
+        for job in self.jobs:
+            if job.on_progress is not None and not job.cancelled and job._progress != job._reported:
+                job._reported = job._progress
+                job.on_progress(*job._progress)
+
+        # Deliver from the front only, so results arrive in submission order
+        while self.jobs and (self.jobs[0].cancelled or self.jobs[0].future.done()):
+            job = self.jobs.popleft()
+            if self.latest.get(job.key) is job:
+                del self.latest[job.key]
+            if job.cancelled:
+                continue
+            try:
+                result = job.future.result()
+            except JobCancelled:
+                continue
+            except Exception as e:
+                if job.on_error is None:
+                    raise
+                job.on_error(e)
+                continue
+            if job.on_done is not None:
+                job.on_done(result)
+
+    def shutdown(self):
+        for job in self.jobs:
+            job.cancel()
+        self.jobs.clear()
+        self.latest.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
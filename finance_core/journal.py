@@ -0,0 +1,308 @@
+import json
+import os
+import threading
+
+from .ledger import Ledger
+from .metrics import span
+from .recurrence import TEMPLATE_FIELDS, make_series
+
+
+JOURNAL_NAME = "journal.log"
+COMPACTING_SUFFIX = ".compacting"
+PENDING_NAME = "compaction.pending"
+
+# Number of journalled operations after which a compaction is started
+COMPACT_THRESHOLD = 500
+
+
+def _recurring_slot(recurring, record_id):
+    # Index of a record's recurrence series; the list only holds recurring
+    # records, so this never scans the ledger
+    for slot, series in enumerate(recurring):
+        if series.get("id") == record_id:
+            return slot
+    return None
+
+
+def _position(ledger, operation):
+    # Journals written before records had ids refer to positions
+    if "id" not in operation:
+        return operation["position"]
+    position = ledger.position_of(operation["id"])
+    if position is None:
+        raise KeyError(f"No record with id {operation['id']}")
+    return position
+
+
+def apply_operation(ledgers, categories, operation, rollup=None):
+    """Apply one journal operation to the in-memory state.
+
+    ``ledgers`` maps "expense"/"income" to Ledger objects. The same function
+    runs for live edits and when replaying the journal on startup, so both
+    paths keep ``categories["recurring"]`` and the optional ``Rollup`` in
+    sync the same way. Edits and deletes name their record by ``id``; an
+    added record without one is given the next id free in both ledgers,
+    written back into the operation so the journal replays it identically.
+    Recurring records get one recurrence series each, with the frequency
+    options taken from the operation's optional ``"series"`` dict. An
+    "import" carries many records per type as parallel column lists and
+    appends each type in one batch, adding any categories not yet known.
+    """
+    kind = operation["op"]
+    if kind == "categories":
+        replacement = dict(operation["categories"])
+        categories.clear()
+        categories.update(replacement)
+        return
+
+    if kind == "import":
+        for record_type, columns in operation["records"].items():
+            if columns.get("id") is None:
+                first = max(other.next_id for other in ledgers.values())
+                columns["id"] = list(range(first, first + len(columns["date"])))
+            batch = Ledger.from_columns(columns)
+            ledgers[record_type].append_batch(batch)
+            if rollup is not None:
+                rollup.add_batch(record_type, batch)
+            known = categories[record_type]
+            known.extend(category for category in batch.categories if category not in known)
+        return
+
+    record_type = operation["type"]
+    ledger = ledgers[record_type]
+    recurring = categories["recurring"][record_type]
+
+    if kind == "add":
+        record = operation["record"]
+        if not record.get("id"):
+            record["id"] = max(other.next_id for other in ledgers.values())
+        ledger.append(record)
+        if rollup is not None:
+            rollup.add(record_type, record)
+        if record["recurring"]:
+            recurring.append(make_series(record, **operation.get("series", {})))
+
+    elif kind == "edit":
+        position = _position(ledger, operation)
+        old_record = ledger[position]
+        new_record = dict(operation["record"], id=old_record["id"])
+        ledger.update(position, new_record)
+        if rollup is not None:
+            rollup.remove(record_type, old_record)
+            rollup.add(record_type, new_record)
+
+        slot = _recurring_slot(recurring, old_record["id"])
+        if new_record["recurring"]:
+            options = operation.get("series")
+            if slot is None or options is not None:
+                series = make_series(new_record, **(options or {}))
+            else:
+                # Same rule, restarted from the edited record's date and
+                # repeating its new amount, category and description
+                fresh = make_series(new_record)
+                series = dict(recurring[slot], **{key: fresh[key] for key in ("start",) + TEMPLATE_FIELDS})
+            if slot is None:
+                recurring.append(series)
+            else:
+                recurring[slot] = series
+        elif slot is not None:
+            del recurring[slot]
+
+    elif kind == "delete":
+        position = _position(ledger, operation)
+        record = ledger[position]
+        ledger.remove(position)
+        if rollup is not None:
+            rollup.remove(record_type, record)
+        slot = _recurring_slot(recurring, record["id"])
+        if slot is not None:
+            del recurring[slot]
+
+    else:
+        raise ValueError(f"Unknown journal operation: {kind}")
+
+
+def _fsync_directory(path):
+    # Make renames durable; not every platform can open a directory
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    """Append-only, newline-delimited log of ledger operations.
+
+    Each operation is written as one JSON line and fsync'd before
+    ``record`` returns, so an edit costs one small append regardless of
+    ledger size. The snapshot files are only rewritten by ``compact``, which
+    rotates the log, writes the snapshots to temporary files and then moves
+    them into place. A ``compaction.pending`` marker makes that last step
+    roll forward after a crash, so a snapshot is never left half written.
+    """
+
+    def __init__(self, data_folder):
+        self.data_folder = data_folder
+        self.path = os.path.join(data_folder, JOURNAL_NAME)
+        self.compacting_path = self.path + COMPACTING_SUFFIX
+        self.pending_path = os.path.join(data_folder, PENDING_NAME)
+
+        self.seq = 0
+        self.pending = 0
+        self._file = None
+        self._lock = threading.Lock()
+        self._compaction = None
+
+    def _read(self, path):
+        # Parse complete lines; a torn final line from a crash is dropped
+        operations = []
+        if not os.path.exists(path):
+            return operations
+        with open(path, "rb") as file:
+            data = file.read()
+        good = 0
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break
+            try:
+                operations.append(json.loads(line))
+            except ValueError:
+                break
+            good += len(line)
+        if good != len(data):
+            with open(path, "r+b") as file:
+                file.truncate(good)
+        return operations
+
+    def _finish_compaction(self):
+        # Roll an interrupted compaction forward using its marker
+        with open(self.pending_path, "r") as file:
+            temp_files = json.load(file)
+        for temp_path, final_path in temp_files.items():
+            if final_path is None:
+                # The marker names a snapshot left without data by itself
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            elif os.path.exists(temp_path):
+                os.replace(temp_path, final_path)
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+        os.remove(self.pending_path)
+        _fsync_directory(self.data_folder)
+
+    def replay(self):
+        """Recover from any interrupted compaction and return the journalled
+        operations, oldest first, that are not yet in the snapshots."""
+        if os.path.exists(self.pending_path):
+            self._finish_compaction()
+
+        operations = []
+        for operation in self._read(self.compacting_path) + self._read(self.path):
+            # Sequence numbers drop operations duplicated by a crash while
+            # merging an old segment back into the journal
+            if operation["seq"] > self.seq:
+                operations.append(operation)
+                self.seq = operation["seq"]
+
+        if os.path.exists(self.compacting_path):
+            # A compaction died before touching the snapshots; fold its
+            # segment back into the live journal
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                for operation in operations:
+                    file.write(json.dumps(operation, separators=(",", ":")) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+            os.remove(self.compacting_path)
+            _fsync_directory(self.data_folder)
+
+        self.pending = len(operations)
+        return operations
+
+    def record(self, operation):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self.seq += 1
+            operation = dict(operation, seq=self.seq)
+            self._file.write(json.dumps(operation, separators=(",", ":")) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.pending += 1
+
+    def compacting(self):
+        return self._compaction is not None and self._compaction.is_alive()
+
+    def compact(self, snapshots, background=True):
+        """Fold the journal into the snapshot files.
+
+        ``snapshots`` maps each snapshot path to a callable returning its
+        JSON data, bytes to write as they are, or None to remove the file;
+        the callables must work on copies of the state, as they run on the
+        compaction thread. Returns False when a compaction is already in
+        progress.
+        """
+        with self._lock:
+            # A segment left by a failed compaction stays put until the next
+            # replay folds it back in, so its operations are never lost
+            if self.compacting() or os.path.exists(self.compacting_path):
+                return False
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self.path):
+                os.replace(self.path, self.compacting_path)
+            self.pending = 0
+
+        def write_snapshots():
+            temp_files = {}
+            with span("save.write") as timing:
+                for path, produce in snapshots.items():
+                    temp_path = path + ".tmp"
+                    data = produce()
+                    if data is None:
+                        temp_files[path] = None
+                        continue
+                    with open(temp_path, "wb" if isinstance(data, bytes) else "w") as file:
+                        if isinstance(data, bytes):
+                            file.write(data)
+                        else:
+                            json.dump(data, file, indent=2)
+                        file.flush()
+                        os.fsync(file.fileno())
+                        timing.count("bytes_written", file.tell())
+                    temp_files[temp_path] = path
+
+            # Commit point: once the marker exists the snapshots are complete
+            with open(self.pending_path + ".tmp", "w") as file:
+                json.dump(temp_files, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(self.pending_path + ".tmp", self.pending_path)
+            _fsync_directory(self.data_folder)
+            self._finish_compaction()
+
+        if background:
+            self._compaction = threading.Thread(target=write_snapshots, name="journal-compaction")
+            self._compaction.start()
+        else:
+            write_snapshots()
+        return True
+
+    def wait(self):
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def close(self):
+        self.wait()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
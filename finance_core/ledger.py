@@ -0,0 +1,681 @@
+import zlib
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from .date_index import DateIndex
+from .dates import day_number, to_day, to_days
+from .search import TrigramIndex, parse_query, term_matches
+
+
+# Bits stored in Ledger.flags
+RECURRING = 0x01
+
+# Backing arrays of a Ledger, one per column
+COLUMNS = ("_dates", "_amounts", "_category_codes", "_description_codes", "_flags", "_ids")
+
+
+class LedgerView:
+    """Rows of a date-range query, read straight from the date index.
+
+    Nothing is materialized up front: in date order, row ``i`` maps to a
+    slot of the index slice, so opening a range of any size costs two
+    bisections. Sorting by another column builds the position order once.
+    When the ledger changes, which can move every slot (reading in an older
+    partition does), the view finds its rows again on the next access.
+    """
+
+    def __init__(self, ledger, start_date=None, end_date=None):
+        self.ledger = ledger
+        self.start_date = start_date
+        self.end_date = end_date
+        self.column = "date"
+        self.descending = True
+        # Explicit row order, only when sorted by a column other than date
+        self.positions = None
+        self._bind()
+
+    def _bind(self):
+        self.generation = self.ledger.generation
+        self.lo, self.hi = self.ledger.index.bounds(
+            None if self.start_date is None else day_number(self.start_date),
+            None if self.end_date is None else day_number(self.end_date)
+        )
+
+    def refresh(self):
+        # Re-bound and re-sort if the ledger changed; True when it had
+        if self.generation == self.ledger.generation:
+            return False
+        self._bind()
+        self.sort(self.column, self.descending)
+        return True
+
+    def __len__(self):
+        self.refresh()
+        return self.hi - self.lo
+
+    def sort(self, column, descending=True):
+        self.refresh()
+        self.column = column
+        self.descending = descending
+        if column == "date":
+            self.positions = None
+            return
+        positions = self.ledger.index.between(self.lo, self.hi)
+        order = np.argsort(self.ledger.sort_keys(column, positions), kind="stable")
+        self.positions = positions[order[::-1] if descending else order]
+
+    def position_slice(self, start, stop):
+        self.refresh()
+        start = max(0, start)
+        stop = min(len(self), stop)
+        if stop <= start:
+            return np.empty(0, dtype=np.intp)
+        if self.positions is not None:
+            return self.positions[start:stop]
+        index = self.ledger.index
+        if self.descending:
+            return index.between(self.hi - stop, self.hi - start)[::-1]
+        return index.between(self.lo + start, self.lo + stop)
+
+    def rows(self, start, stop):
+        return self.ledger.records(self.position_slice(start, stop))
+
+    def count_before(self, date, descending=True):
+        # Rows in date order ahead of a new row dated ``date``, which goes
+        # after the existing rows of that day
+        self.refresh()
+        day = day_number(date)
+        keys = self.ledger.index.keys
+        if descending:
+            return self.hi - bisect_left(keys, day, self.lo, self.hi)
+        return bisect_right(keys, day, self.lo, self.hi) - self.lo
+
+    def counts_before(self, dates, descending=True):
+        # count_before for each of several dates
+        return [self.count_before(date, descending) for date in dates]
+
+
+class SearchView(LedgerView):
+    """Rows of a date range that match a search, as a ``LedgerView``.
+
+    ``matches`` holds the matching positions in date order, so paging and
+    ``count_before`` work on that array instead of the date index.
+    """
+
+    def __init__(self, ledger, query, start_date=None, end_date=None):
+        self.query = query
+        super().__init__(ledger, start_date, end_date)
+
+    def _bind(self):
+        self.generation = self.ledger.generation
+        self.matches = self.ledger.search(self.query, self.start_date, self.end_date)
+        self.days = self.ledger.dates[self.matches].astype(np.int64)
+        self.lo, self.hi = 0, len(self.matches)
+
+    def sort(self, column, descending=True):
+        self.refresh()
+        self.column = column
+        self.descending = descending
+        if column == "date":
+            self.positions = None
+            return
+        order = np.argsort(self.ledger.sort_keys(column, self.matches), kind="stable")
+        self.positions = self.matches[order[::-1] if descending else order]
+
+    def position_slice(self, start, stop):
+        self.refresh()
+        start = max(0, start)
+        stop = min(len(self), stop)
+        if stop <= start:
+            return np.empty(0, dtype=np.intp)
+        if self.positions is not None:
+            return self.positions[start:stop]
+        if self.descending:
+            return self.matches[len(self) - stop:len(self) - start][::-1]
+        return self.matches[start:stop]
+
+    def count_before(self, date, descending=True):
+        self.refresh()
+        day = day_number(date)
+        if descending:
+            return len(self) - int(np.searchsorted(self.days, day, side="left"))
+        return int(np.searchsorted(self.days, day, side="right"))
+
+
+class Ledger:
+    """Columnar store for one record type (income or expenses).
+
+    Every record is split over parallel NumPy columns: dates as
+    ``datetime64[D]``, amounts as ``float64``, categories and descriptions as
+    integer codes into interned pools, a ``uint8`` flag bitmask and an
+    ``int64`` record id. Rows are addressed by position; ``remove`` moves the
+    last row into the gap so deletes stay O(1). A ``DateIndex`` over the
+    dates and a dict from record id to position (built on the first lookup)
+    are kept in step with every append, update and remove, so range queries
+    cost O(log n + k) and id lookups O(1).
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._dates = np.empty(capacity, dtype="datetime64[D]")
+        self._amounts = np.empty(capacity, dtype=np.float64)
+        self._category_codes = np.empty(capacity, dtype=np.int32)
+        self._description_codes = np.empty(capacity, dtype=np.int32)
+        self._flags = np.zeros(capacity, dtype=np.uint8)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+
+        # Record id -> position, built on the first lookup
+        self._positions = None
+        self.next_id = 1
+        # Number of records that had no id when loaded
+        self.assigned_ids = 0
+
+        # Dictionary encoding for categories and interned descriptions
+        self.categories = []
+        self._category_lookup = {}
+        self.descriptions = []
+        self._description_lookup = {}
+
+        self.index = DateIndex()
+        # Bumped by every change, so open views know their slots may be stale
+        self.generation = 0
+        # Trigram index over the description pool, built on the first search
+        self._search_index = None
+        # Partitions of a partitioned store not read into this ledger yet:
+        # key -> (first day, last day, lowest id, highest id)
+        self.on_disk = {}
+
+    @classmethod
+    def from_records(cls, records):
+        # Typed, column-at-a-time conversion; raises KeyError/TypeError/
+        # ValueError for records that do not match the schema
+        return cls.from_columns({
+            "date": [record["date"] for record in records],
+            "amount": [record["amount"] for record in records],
+            "category": [record["category"] for record in records],
+            "description": [record["description"] for record in records],
+            "recurring": [record["recurring"] for record in records],
+            "id": [record.get("id") or 0 for record in records]
+        })
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Build a ledger from parallel sequences keyed "date", "amount",
+        "category" and "description", plus optional "recurring" and "id".
+
+        Missing (0) and duplicated ids are replaced by fresh ones.
+        """
+        n = len(columns["date"])
+        ledger = cls(capacity=max(n, 1024))
+        if not n:
+            return ledger
+
+        amounts = np.asarray(columns["amount"], dtype=np.float64)
+        if np.isnan(amounts).any():
+            raise ValueError("Record amounts must be numbers")
+        ledger._amounts[:n] = amounts
+        ledger._dates[:n] = to_days(columns["date"])
+
+        category_lookup = ledger._category_lookup
+        ledger._category_codes[:n] = [category_lookup.setdefault(category, len(category_lookup)) for category in columns["category"]]
+        ledger.categories = list(category_lookup)
+
+        description_lookup = ledger._description_lookup
+        ledger._description_codes[:n] = [description_lookup.setdefault(description, len(description_lookup)) for description in columns["description"]]
+        ledger.descriptions = list(description_lookup)
+
+        if columns.get("recurring") is not None:
+            recurring = np.asarray(columns["recurring"], dtype=bool)
+            ledger._flags[:n] = recurring * np.uint8(RECURRING)
+
+        # Files written before records had ids get them assigned here, as do
+        # duplicated ids; ids are positive integers
+        ids = np.zeros(n, dtype=np.int64)
+        if columns.get("id") is not None:
+            ids[:] = np.asarray(columns["id"], dtype=np.int64)
+        _, first_seen = np.unique(ids, return_index=True)
+        duplicate = np.ones(n, dtype=bool)
+        duplicate[first_seen] = False
+        missing = (ids <= 0) | duplicate
+        next_id = int(ids.max()) + 1 if n else 1
+        ids[missing] = np.arange(next_id, next_id + int(missing.sum()))
+        ledger._ids[:n] = ids
+        ledger.assigned_ids = int(missing.sum())
+
+        ledger.size = n
+        ledger._rebuild_ids()
+        ledger.index = DateIndex.build(ledger.dates.astype(np.int64))
+        return ledger
+
+    def _rebuild_ids(self):
+        self._positions = None
+        self.next_id = int(self.ids.max()) + 1 if self.size else 1
+
+    def _id_positions(self):
+        if self._positions is None:
+            self._positions = dict(zip(self.ids.tolist(), range(self.size)))
+        return self._positions
+
+    def reassign_ids(self, positions, first_id):
+        # Give the rows new ids first_id, first_id + 1, ... (used to make ids
+        # unique across ledgers after a migration)
+        self._ids[positions] = np.arange(first_id, first_id + len(positions))
+        self._rebuild_ids()
+
+    def copy(self):
+        ledger = Ledger(capacity=max(self.size, 1))
+        for name in COLUMNS:
+            getattr(ledger, name)[:self.size] = getattr(self, name)[:self.size]
+        ledger.size = self.size
+        ledger._positions = None if self._positions is None else dict(self._positions)
+        ledger.next_id = self.next_id
+        ledger.categories = list(self.categories)
+        ledger._category_lookup = dict(self._category_lookup)
+        ledger.descriptions = list(self.descriptions)
+        ledger._description_lookup = dict(self._description_lookup)
+        ledger.index = self.index.copy()
+        ledger.on_disk = dict(self.on_disk)
+        return ledger
+
+    # Column views trimmed to the live rows
+    @property
+    def dates(self):
+        return self._dates[:self.size]
+
+    @property
+    def amounts(self):
+        return self._amounts[:self.size]
+
+    @property
+    def category_codes(self):
+        return self._category_codes[:self.size]
+
+    @property
+    def description_codes(self):
+        return self._description_codes[:self.size]
+
+    @property
+    def flags(self):
+        return self._flags[:self.size]
+
+    @property
+    def ids(self):
+        return self._ids[:self.size]
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for position in range(self.size):
+            yield self.record(position)
+
+    def __getitem__(self, position):
+        return self.record(position)
+
+    def encode_category(self, category):
+        code = self._category_lookup.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self._category_lookup[category] = code
+        return code
+
+    def intern_description(self, description):
+        code = self._description_lookup.get(description)
+        if code is None:
+            code = len(self.descriptions)
+            self.descriptions.append(description)
+            self._description_lookup[description] = code
+            if self._search_index is not None:
+                self._search_index.add(description)
+        return code
+
+    def detach(self):
+        # Copy columns that are views of a mapped file (see binary.open_ledger)
+        # into memory of their own, so the file can be replaced
+        for name in COLUMNS:
+            column = getattr(self, name)
+            if not column.flags.owndata:
+                setattr(self, name, column.copy())
+        if isinstance(self.index.keys, np.ndarray) and not self.index.keys.flags.owndata:
+            self.index.keys = self.index.keys.copy()
+
+    def _reserve(self, capacity):
+        if capacity <= len(self._dates):
+            return
+        capacity = max(capacity, 2 * len(self._dates))
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def _write(self, position, record):
+        self._dates[position] = to_day(record["date"])
+        self._amounts[position] = float(record["amount"])
+        self._category_codes[position] = self.encode_category(record["category"])
+        self._description_codes[position] = self.intern_description(record["description"])
+        self._flags[position] = RECURRING if record["recurring"] else 0
+
+    def _day(self, position):
+        return int(self._dates[position].astype(np.int64))
+
+    def position_of(self, record_id):
+        # Storage position of a record id, or None
+        return self._id_positions().get(record_id)
+
+    def append(self, record):
+        # Uses record["id"] when present, otherwise the next free id
+        record_id = record.get("id") or self.next_id
+        if record_id in self._id_positions():
+            raise ValueError(f"Duplicate record id: {record_id}")
+        self._reserve(self.size + 1)
+        position = self.size
+        self._write(position, record)
+        self._ids[position] = record_id
+        self._positions[record_id] = position
+        self.next_id = max(self.next_id, record_id + 1)
+        self.size += 1
+        self.index.insert(self._day(position), position)
+        self.generation += 1
+        return position
+
+    def append_batch(self, batch):
+        """Append every row of another Ledger in one vectorized step.
+
+        The batch's ids must not be in use here. The date index is rebuilt
+        once, which beats one sorted insert per row for large batches.
+        """
+        n = len(batch)
+        if not n:
+            return
+        if not self.size and not self.categories and not self.descriptions:
+            self._adopt(batch)
+            return
+        if np.isin(batch.ids, self.ids).any():
+            raise ValueError("Batch record ids are already in use")
+        category_codes = np.array([self.encode_category(category) for category in batch.categories], dtype=np.int32)
+        description_codes = np.array([self.intern_description(description) for description in batch.descriptions], dtype=np.int32)
+
+        self._reserve(self.size + n)
+        rows = slice(self.size, self.size + n)
+        self._dates[rows] = batch.dates
+        self._amounts[rows] = batch.amounts
+        self._category_codes[rows] = category_codes[batch.category_codes]
+        self._description_codes[rows] = description_codes[batch.description_codes]
+        self._flags[rows] = batch.flags
+        self._ids[rows] = batch.ids
+        self.size += n
+        next_id = self.next_id
+        self._rebuild_ids()
+        self.next_id = max(self.next_id, next_id)
+        self.index = DateIndex.build(self.dates.astype(np.int64))
+        self.generation += 1
+
+    def _adopt(self, batch):
+        # An empty ledger takes over the batch's columns and date index
+        # instead of copying them; the batch must not be changed afterwards
+        for name in COLUMNS:
+            setattr(self, name, getattr(batch, name))
+        self.size = batch.size
+        self.categories = list(batch.categories)
+        self._category_lookup = dict(batch._category_lookup)
+        self.descriptions = list(batch.descriptions)
+        self._description_lookup = dict(batch._description_lookup)
+        self._positions = None
+        self._search_index = None
+        self.index = batch.index.copy()
+        self.next_id = max(self.next_id, batch.next_id)
+        self.generation += 1
+
+    def update(self, position, record):
+        old_day = self._day(position)
+        self._write(position, record)
+        new_day = self._day(position)
+        if new_day != old_day:
+            self.index.remove(old_day, position)
+            self.index.insert(new_day, position)
+        self.generation += 1
+
+    def remove(self, position):
+        # Move the last row into the freed slot; returns the old position of
+        # the moved row, or None when the removed row was the last one
+        last = self.size - 1
+        moved = None
+        self.index.remove(self._day(position), position)
+        del self._id_positions()[int(self._ids[position])]
+        if position != last:
+            self.index.move(self._day(last), last, position)
+            self._positions[int(self._ids[last])] = position
+            for name in COLUMNS:
+                column = getattr(self, name)
+                column[position] = column[last]
+            moved = last
+        self.size = last
+        self.generation += 1
+        return moved
+
+    def record(self, position):
+        return {
+            "amount": float(self._amounts[position]),
+            "category": self.categories[self._category_codes[position]],
+            "date": str(self._dates[position]),
+            "recurring": bool(self._flags[position] & RECURRING),
+            "description": self.descriptions[self._description_codes[position]],
+            "id": int(self._ids[position])
+        }
+
+    def records(self, positions=None):
+        if positions is None:
+            positions = np.arange(self.size)
+        dates = self.dates[positions].astype(str).tolist()
+        amounts = self.amounts[positions].tolist()
+        category_codes = self.category_codes[positions].tolist()
+        description_codes = self.description_codes[positions].tolist()
+        recurring = (self.flags[positions] & RECURRING).astype(bool).tolist()
+        ids = self.ids[positions].tolist()
+        return [
+            {
+                "amount": amounts[i],
+                "category": self.categories[category_codes[i]],
+                "date": dates[i],
+                "recurring": recurring[i],
+                "description": self.descriptions[description_codes[i]],
+                "id": ids[i]
+            }
+            for i in range(len(dates))
+        ]
+
+    def to_records(self):
+        return self.records()
+
+    def select(self, start_date=None, end_date=None, category=None):
+        # Positions of the rows inside the inclusive date range (and category),
+        # newest first
+        positions = self.index.range(
+            None if start_date is None else day_number(start_date),
+            None if end_date is None else day_number(end_date)
+        )
+        if category is not None:
+            code = self._category_lookup.get(category)
+            if code is None:
+                return np.empty(0, dtype=np.intp)
+            positions = positions[self.category_codes[positions] == code]
+        return positions
+
+    def find(self, date, amount, category, description):
+        # First row matching all displayed fields, or None
+        category_code = self._category_lookup.get(category)
+        description_code = self._description_lookup.get(description)
+        if category_code is None or description_code is None:
+            return None
+        mask = ((self.dates == to_day(date)) &
+                (self.amounts == float(amount)) &
+                (self.category_codes == category_code) &
+                (self.description_codes == description_code))
+        hits = np.flatnonzero(mask)
+        return int(hits[0]) if len(hits) else None
+
+    def search_index(self):
+        if self._search_index is None:
+            self._search_index = TrigramIndex.build(self.descriptions)
+        return self._search_index
+
+    def search(self, query, start_date=None, end_date=None):
+        """Positions of the rows in the inclusive date range whose description
+        or category matches ``query`` (see ``parse_query``), in date order.
+
+        Terms are matched against the interned pools, each distinct
+        description once, and the rows are then picked by a lookup through
+        their code columns.
+        """
+        lo, hi = self.index.bounds(
+            None if start_date is None else day_number(start_date),
+            None if end_date is None else day_number(end_date)
+        )
+        index = self.search_index()
+        matches = np.ones(self.size, dtype=bool)
+        for term, prefix in parse_query(query):
+            descriptions = np.zeros(len(self.descriptions), dtype=bool)
+            descriptions[index.match(term, prefix)] = True
+            categories = np.array([term_matches(str(category).lower(), term, prefix) for category in self.categories], dtype=bool)
+            if categories.any():
+                matches &= descriptions[self.description_codes] | categories[self.category_codes]
+            else:
+                matches &= descriptions[self.description_codes]
+        positions = self.index.array()[lo:hi]
+        return positions[matches[positions]]
+
+    def view(self, start_date=None, end_date=None, query=None):
+        # Lazily fetched rows of the inclusive date range, newest first; with
+        # a search query, only the rows matching it
+        if parse_query(query):
+            return SearchView(self, query, start_date, end_date)
+        return LedgerView(self, start_date, end_date)
+
+    def sort_keys(self, column, positions):
+        # Sortable key array for one column of the given rows
+        if column == "date":
+            return self.dates[positions]
+        if column == "amount":
+            return self.amounts[positions]
+        if column == "recurring":
+            return self.flags[positions] & RECURRING
+        if column == "category":
+            pool, codes = self.categories, self.category_codes[positions]
+        elif column == "description":
+            pool, codes = self.descriptions, self.description_codes[positions]
+        else:
+            raise ValueError(f"Unknown column: {column}")
+        rank = np.empty(len(pool), dtype=np.intp)
+        rank[sorted(range(len(pool)), key=lambda code: str(pool[code]))] = np.arange(len(pool))
+        return rank[codes]
+
+    def records_between(self, start_date=None, end_date=None):
+        # Records inside the inclusive date range, newest first
+        return self.records(self.select(start_date, end_date))
+
+    def total(self, start_date=None, end_date=None):
+        if start_date is None and end_date is None:
+            return float(self.amounts.sum())
+        return float(self.amounts[self.select(start_date, end_date)].sum())
+
+    def checksum(self, positions=None):
+        """Order-independent 64-bit checksum of the date, category and amount
+        of the rows at ``positions`` (every row without). Checksums of
+        disjoint sets of rows add up, modulo 2**64, to that of their union."""
+        if positions is None:
+            positions = np.arange(self.size)
+        names = np.array([zlib.crc32(category.encode()) for category in self.categories] + [0], dtype=np.uint64)
+        days = self._dates[positions].astype(np.int64).astype(np.uint64)
+        cents = np.round(self._amounts[positions] * 100).astype(np.int64).astype(np.uint64)
+        rows = days * np.uint64(0x9E3779B97F4A7C15) ^ names[self._category_codes[positions]] << np.uint64(32) ^ cents
+        # splitmix64 finaliser, so that summing rows cannot cancel changes out
+        rows ^= rows >> np.uint64(30)
+        rows *= np.uint64(0xBF58476D1CE4E5B9)
+        rows ^= rows >> np.uint64(27)
+        rows *= np.uint64(0x94D049BB133111EB)
+        rows ^= rows >> np.uint64(31)
+        return int(rows.sum(dtype=np.uint64))
+
+    def min_max(self, start_date=None, end_date=None, category=None):
+        amounts = self.amounts[self.select(start_date, end_date, category)]
+        if not len(amounts):
+            return None, None
+        return float(amounts.min()), float(amounts.max())
+
+    def totals_by_category(self, start_date=None, end_date=None, month=None):
+        # month restricts the rows to one calendar month number (1-12) of any year
+        positions = self.select(start_date, end_date)
+        if month is not None:
+            month_of_year = self.dates[positions].astype("datetime64[M]").astype(np.int64) % 12 + 1
+            positions = positions[month_of_year == month]
+        codes = self.category_codes[positions]
+        amounts = self.amounts[positions]
+        sums = np.bincount(codes, weights=amounts, minlength=len(self.categories))
+        counts = np.bincount(codes, minlength=len(self.categories))
+        return {self.categories[code]: float(sums[code]) for code in np.flatnonzero(counts)}
+
+    def totals_by_month(self, start_date=None, end_date=None):
+        positions = self.select(start_date, end_date)
+        months, inverse = np.unique(self.dates[positions].astype("datetime64[M]"), return_inverse=True)
+        sums = np.bincount(inverse, weights=self.amounts[positions], minlength=len(months))
+        return dict(zip(months.astype(str).tolist(), sums.tolist()))
+
+    def totals_by_month_and_category(self, start_date=None, end_date=None):
+        # {"YYYY-MM": {category: total}} containing only the populated cells
+        positions = self.select(start_date, end_date)
+        months, inverse = np.unique(self.dates[positions].astype("datetime64[M]"), return_inverse=True)
+        width = len(self.categories)
+        cells = inverse * width + self.category_codes[positions]
+        sums = np.bincount(cells, weights=self.amounts[positions], minlength=len(months) * width)
+        counts = np.bincount(cells, minlength=len(months) * width)
+
+        result = {month: {} for month in months.astype(str).tolist()}
+        month_names = list(result)
+        for cell in np.flatnonzero(counts):
+            result[month_names[cell // width]][self.categories[cell % width]] = float(sums[cell])
+        return result
+
+    def daily_category_totals(self):
+        # Parallel (days, categories, totals, counts) for every populated
+        # day/category cell
+        if not self.size:
+            return [], [], [], []
+        width = len(self.categories)
+        cells = self.dates.astype(np.int64) * width + self.category_codes
+        unique, inverse = np.unique(cells, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.amounts, minlength=len(unique))
+        counts = np.bincount(inverse, minlength=len(unique))
+        days = (unique // width).astype("datetime64[D]")
+        categories = [self.categories[code] for code in (unique % width).tolist()]
+        return days, categories, totals, counts
+
+    def monthly_category_stats(self):
+        # (month, category, total, count, min, max) for every populated
+        # month/category cell
+        if not self.size:
+            return []
+        month_keys, month_index = np.unique(self.dates.astype("datetime64[M]"), return_inverse=True)
+        width = len(self.categories)
+        cells = month_index * width + self.category_codes
+
+        # Sort by cell, then amount, so each cell's min and max sit at its ends
+        order = np.lexsort((self.amounts, cells))
+        sorted_cells = cells[order]
+        sorted_amounts = self.amounts[order]
+        starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+        ends = np.r_[starts[1:], len(sorted_cells)]
+
+        month_names = month_keys.astype(str).tolist()
+        return [
+            (month_names[cell // width], self.categories[cell % width], total, count, low, high)
+            for cell, total, count, low, high in zip(
+                sorted_cells[starts].tolist(),
+                np.add.reduceat(sorted_amounts, starts).tolist(),
+                (ends - starts).tolist(),
+                sorted_amounts[starts].tolist(),
+                sorted_amounts[ends - 1].tolist()
+            )
+        ]
@@ -0,0 +1,160 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+logger = logging.getLogger("finance_core")
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Prometheus metric name prefix
+PREFIX = "finance"
+
+
+class Metrics:
+    """Timing spans and counters, kept in memory for the whole process.
+
+    Each span name ("load", "save", "filter", "aggregate", "render",
+    "export", ...) accumulates its call count, total and slowest time;
+    counters such as records scanned and bytes written are kept per span.
+    Thread-safe, as exports and analyses run on worker threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = {}
+        self.counters = {}
+
+    def observe(self, name, seconds):
+        with self.lock:
+            span = self.spans.get(name)
+            if span is None:
+                self.spans[name] = {"count": 1, "seconds": seconds, "max_seconds": seconds}
+            else:
+                span["count"] += 1
+                span["seconds"] += seconds
+                span["max_seconds"] = max(span["max_seconds"], seconds)
+
+    def count(self, counter, span, value):
+        with self.lock:
+            counts = self.counters.setdefault(counter, {})
+            counts[span] = counts.get(span, 0) + value
+
+    def reset(self):
+        with self.lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def to_json(self):
+        with self.lock:
+            return {
+                "spans": {name: dict(span) for name, span in self.spans.items()},
+                "counters": {counter: dict(counts) for counter, counts in self.counters.items()}
+            }
+
+    def prometheus_text(self):
+        """The metrics in the Prometheus text exposition format."""
+        data = self.to_json()
+        lines = []
+        # One group of lines per metric, as the format requires
+        for metric, kind, field, fmt in (("span_count", "counter", "count", "{}"),
+                                         ("span_seconds_total", "counter", "seconds", "{:.6f}"),
+                                         ("span_seconds_max", "gauge", "max_seconds", "{:.6f}")):
+            lines.append(f"# TYPE {PREFIX}_{metric} {kind}")
+            for name, span in sorted(data["spans"].items()):
+                lines.append(f'{PREFIX}_{metric}{{span="{name}"}} ' + fmt.format(span[field]))
+        for counter, counts in sorted(data["counters"].items()):
+            lines.append(f"# TYPE {PREFIX}_{counter}_total counter")
+            for name, value in sorted(counts.items()):
+                lines.append(f'{PREFIX}_{counter}_total{{span="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by span()
+metrics = Metrics()
+
+
+class Span:
+    # Handle yielded by span(); counts are attributed to the span's name
+    def __init__(self, name):
+        self.name = name
+        self.counts = {}
+
+    def count(self, counter, value):
+        self.counts[counter] = self.counts.get(counter, 0) + value
+        metrics.count(counter, self.name, value)
+
+
+@contextmanager
+def span(name, detail=""):
+    """Time the enclosed block as span ``name``.
+
+    Yields a Span whose ``count`` records e.g. ``records_scanned`` or
+    ``bytes_written``. The time and counts are logged at DEBUG level.
+    """
+    handle = Span(name)
+    start = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe(name, seconds)
+        if logger.isEnabledFor(logging.DEBUG):
+            counts = "".join(f", {counter}={value}" for counter, value in handle.counts.items())
+            logger.debug("%s%s took %.1f ms%s", name, f" ({detail})" if detail else "", seconds * 1000, counts)
+
+
+def write_metrics_file(path):
+    with open(path, "w") as file:
+        json.dump(dict(metrics.to_json(), written=time.time()), file, indent=2)
+
+
+def _handler():
+    # http.server is only imported when the endpoint is enabled
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics endpoint: " + format, *args)
+
+    return MetricsHandler
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve ``/metrics`` in Prometheus text format on a daemon thread."""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), _handler())
+    threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+
+def configure(config, data_folder="."):
+    """Set up logging and metrics export from the ``config.json`` settings
+    ``log_level``, ``metrics_file`` (relative to the data folder) and
+    ``metrics_port``. Called by the app and the CLI; library users configure
+    logging themselves."""
+    level = str(config.get("log_level") or "WARNING").upper()
+    logging.basicConfig(format=LOG_FORMAT)
+    logging.getLogger().setLevel(getattr(logging, level, logging.WARNING))
+    if config.get("metrics_file"):
+        atexit.register(write_metrics_file, os.path.join(data_folder, config["metrics_file"]))
+    if config.get("metrics_port") is not None:
+        return serve_metrics(int(config["metrics_port"]))
+    return None
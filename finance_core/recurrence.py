@@ -0,0 +1,224 @@
+import calendar
+import heapq
+import logging
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+
+
+logger = logging.getLogger("finance_core.recurrence")
+
+FREQUENCIES = ("daily", "weekly", "monthly", "yearly")
+
+# Record fields every series keeps a copy of, so projecting never has to
+# read its record
+TEMPLATE_FIELDS = ("amount", "category", "description")
+
+# Open-ended windows are projected this far past today
+DEFAULT_HORIZON = timedelta(days=365)
+
+
+def _date(value):
+    # ISO strings, legacy "dd/mm/yyyy" strings and date/datetime objects
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    # Imported here: the GUI imports this module before numpy is needed
+    from .dates import to_day
+    return to_day(value).item()
+
+
+def make_series(record, frequency="monthly", interval=1, end=None, day_of_month=None):
+    """Recurrence rule for a recurring record, stored once per series.
+
+    The record itself is the first occurrence and supplies the amount,
+    category and description of every later one; the series keeps a copy of
+    them, refreshed whenever the record is edited. ``day_of_month`` applies
+    to monthly and yearly series (``-1`` is the last day of the month) and
+    defaults to the day of the first occurrence.
+    """
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"Unknown frequency: {frequency}")
+    if int(interval) < 1:
+        raise ValueError("Interval must be at least 1")
+    return {
+        "id": record["id"],
+        "frequency": frequency,
+        "interval": int(interval),
+        "start": _date(record["date"]).isoformat(),
+        "end": None if end is None else _date(end).isoformat(),
+        "day_of_month": day_of_month,
+        "amount": float(record["amount"]),
+        "category": record["category"],
+        "description": str(record["description"])
+    }
+
+
+def standalone_series(entry):
+    """Monthly series for a record copy that matches no stored record. It
+    has no ``id``, so its first occurrence is projected too."""
+    return make_series(dict(entry, id=None))
+
+
+def upgrade_series(entries, ledger):
+    """Replace the full record copies older files keep in
+    ``categories["recurring"]`` with monthly series. A matching record not
+    yet flagged recurring is flagged; copies that match no record are kept
+    as stand-alone series. Returns True when anything changed."""
+    changed = False
+    for slot in range(len(entries) - 1, -1, -1):
+        entry = entries[slot]
+        if "frequency" in entry:
+            continue
+        changed = True
+        position = None
+        if entry.get("id") is not None:
+            position = ledger.position_of(entry["id"])
+        if position is None:
+            try:
+                position = ledger.find(_date(entry["date"]).isoformat(), entry["amount"],
+                                       entry["category"], entry["description"])
+            except (KeyError, ValueError):
+                position = None
+        if position is None:
+            logger.warning("Recurring %s %s on %s matches no record; kept as a stand-alone series",
+                           entry["category"], entry["amount"], entry["date"])
+            entries[slot] = standalone_series(entry)
+            continue
+        record = ledger[position]
+        if not record["recurring"]:
+            ledger.update(position, dict(record, recurring=True))
+        entries[slot] = make_series(ledger[position])
+    return changed
+
+
+def occurrences(series, start, end):
+    """Yield the dates of a series inside ``[start, end]``, oldest first.
+
+    Arithmetic jumps straight to the first occurrence in the window, so the
+    cost is the number of occurrences yielded, not the age of the series.
+    """
+    anchor = _date(series["start"])
+    start = max(_date(start), anchor)
+    end = _date(end)
+    if series.get("end"):
+        end = min(end, _date(series["end"]))
+    if start > end:
+        return
+
+    interval = series.get("interval", 1)
+    frequency = series["frequency"]
+    if frequency in ("daily", "weekly"):
+        step = interval * (7 if frequency == "weekly" else 1)
+        skipped = -(-(start - anchor).days // step)
+        day = anchor + timedelta(days=skipped * step)
+        while day <= end:
+            yield day
+            day += timedelta(days=step)
+        return
+
+    step = interval * (12 if frequency == "yearly" else 1)
+    day_of_month = series.get("day_of_month") or anchor.day
+    first_month = anchor.year * 12 + anchor.month - 1
+    months = start.year * 12 + start.month - 1 - first_month
+    k = max(0, months // step)
+    while True:
+        year, month = divmod(first_month + k * step, 12)
+        last = calendar.monthrange(year, month + 1)[1]
+        day = date(year, month + 1, last if day_of_month == -1 else min(day_of_month, last))
+        if day > end:
+            return
+        if day >= start:
+            yield day
+        k += 1
+
+
+def project(series_list, ledger, start_date=None, end_date=None):
+    """Yield projected records for every series in the window, oldest first.
+
+    Occurrences after each series' first one are generated lazily and merged
+    across series; they are never stored. Each yielded record is a copy of
+    the series' record with the occurrence date and ``"projected": True``.
+    """
+    end = _date(end_date) if end_date is not None else date.today() + DEFAULT_HORIZON
+
+    def expand(series):
+        fields = series
+        if "amount" not in series:
+            # Series saved before they kept their record's fields
+            position = ledger.position_of(series["id"])
+            if position is None:
+                return
+            fields = ledger[position]
+        first = _date(series["start"])
+        if series["id"] is not None:
+            # The first occurrence is the stored record
+            first += timedelta(days=1)
+        window_start = first if start_date is None else max(first, _date(start_date))
+        for day in occurrences(series, window_start, end):
+            yield {"amount": fields["amount"], "category": fields["category"], "date": day.isoformat(),
+                   "recurring": True, "description": fields["description"], "id": series["id"], "projected": True}
+
+    return heapq.merge(*(expand(series) for series in series_list), key=lambda record: record["date"])
+
+
+class ProjectedView:
+    """A record view with projected occurrences merged in.
+
+    Wraps a ``LedgerView``/``SQLiteView`` and a list of projected records
+    (only those inside the window). In date order the projected rows are
+    placed among the stored ones via ``counts_before``; sorted by any other
+    column they follow the stored rows.
+    """
+
+    def __init__(self, base, projected):
+        self.base = base
+        self.projected = list(projected)
+        self.column = "date"
+        self.descending = True
+        self._place()
+
+    def refresh(self):
+        # Place the projected rows again if the stored ones moved
+        if self.base.refresh():
+            self._place()
+            return True
+        return False
+
+    def __len__(self):
+        self.refresh()
+        return len(self.base) + len(self.projected)
+
+    def sort(self, column, descending=True):
+        self.base.sort(column, descending)
+        self.column = column
+        self.descending = descending
+        self._place()
+
+    def _place(self):
+        # Merged row index of each projected record, ascending
+        key = (lambda record: str(record[self.column])) if self.column in ("category", "description") \
+            else (lambda record: record[self.column])
+        self.projected.sort(key=key, reverse=self.descending)
+        if self.column == "date":
+            counts = self.base.counts_before([record["date"] for record in self.projected], self.descending)
+            self.slots = [count + j for j, count in enumerate(counts)]
+        else:
+            self.slots = [len(self.base) + j for j in range(len(self.projected))]
+
+    def rows(self, start, stop):
+        self.refresh()
+        start = max(0, start)
+        stop = min(len(self), stop)
+        if stop <= start:
+            return []
+        k = bisect_left(self.slots, start)
+        base_rows = iter(self.base.rows(start - k, stop - k))
+        rows = []
+        for i in range(start, stop):
+            if k < len(self.slots) and self.slots[k] == i:
+                rows.append(self.projected[k])
+                k += 1
+            else:
+                rows.append(next(base_rows))
+        return rows
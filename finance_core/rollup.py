@@ -0,0 +1,207 @@
+import json
+import os
+
+import numpy as np
+
+from .cube import TimeCube
+from .ledger import to_day
+
+
+# Version 2 added the day x category cubes, version 3 the record checksums
+ROLLUP_VERSION = 3
+
+# Cell layout: [total, count, min, max]; min/max are None when stale
+TOTAL, COUNT, MIN, MAX = range(4)
+
+
+def _month_bounds(month):
+    # First and last day of a "YYYY-MM" month as datetime64[D]
+    first = np.datetime64(month, "M")
+    return first.astype("datetime64[D]"), (first + 1).astype("datetime64[D]") - 1
+
+
+class Rollup:
+    """Running totals keyed by (record type, "YYYY-MM", category), plus a
+    day x category ``TimeCube`` per record type.
+
+    Each month cell holds the sum, count, min and max of the amounts in it.
+    Adding or removing a record touches one month cell and one cube cell.
+    Removing a record that held the cell's min or max marks them stale; they
+    are recomputed from that month and category only when ``stats`` asks
+    for them.
+
+    Date-range totals come from the cubes at day resolution, rolled up to
+    the requested granularity, so no query has to scan the ledger.
+    """
+
+    def __init__(self):
+        self.cells = {"expense": {}, "income": {}}
+        self.cubes = {"expense": TimeCube(), "income": TimeCube()}
+
+    @classmethod
+    def build(cls, ledgers):
+        rollup = cls()
+        for record_type, ledger in ledgers.items():
+            months = rollup.cells.setdefault(record_type, {})
+            for month, category, total, count, low, high in ledger.monthly_category_stats():
+                months.setdefault(month, {})[category] = [total, count, low, high]
+            rollup.cube(record_type).add_many(*ledger.daily_category_totals())
+        return rollup
+
+    def copy(self):
+        rollup = Rollup()
+        rollup.cells = {
+            record_type: {month: {category: list(cell) for category, cell in categories.items()}
+                          for month, categories in months.items()}
+            for record_type, months in self.cells.items()
+        }
+        rollup.cubes = {record_type: cube.copy() for record_type, cube in self.cubes.items()}
+        return rollup
+
+    def cube(self, record_type):
+        return self.cubes.setdefault(record_type, TimeCube())
+
+    # Persistence -----------------------------------------------------------
+
+    @staticmethod
+    def fingerprint(ledgers):
+        # Record count and checksum (see Ledger.checksum) per type, checked
+        # before trusting a saved rollup
+        return {record_type: [len(ledger), ledger.checksum()] for record_type, ledger in ledgers.items()}
+
+    def to_json(self, fingerprint):
+        return {
+            "version": ROLLUP_VERSION,
+            "fingerprint": fingerprint,
+            "cells": self.cells,
+            "cubes": {record_type: cube.to_json() for record_type, cube in self.cubes.items()}
+        }
+
+    @classmethod
+    def from_json(cls, data, fingerprint):
+        # None when the saved rollup does not describe these ledgers
+        if not isinstance(data, dict) or data.get("version") != ROLLUP_VERSION:
+            return None
+        if data.get("fingerprint") != json.loads(json.dumps(fingerprint)):
+            return None
+        rollup = cls()
+        rollup.cells.update(data["cells"])
+        rollup.cubes.update({record_type: TimeCube.from_json(cube) for record_type, cube in data["cubes"].items()})
+        return rollup
+
+    @classmethod
+    def read(cls, file_path, fingerprint):
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, "r") as file:
+                return cls.from_json(json.load(file), fingerprint)
+        except (ValueError, KeyError):
+            return None
+
+    # Incremental maintenance -----------------------------------------------
+
+    def add(self, record_type, record):
+        month = str(to_day(record["date"]))[:7]
+        amount = float(record["amount"])
+        self.cube(record_type).add(record["date"], record["category"], amount)
+        categories = self.cells.setdefault(record_type, {}).setdefault(month, {})
+        cell = categories.get(record["category"])
+        if cell is None:
+            categories[record["category"]] = [amount, 1, amount, amount]
+            return
+        cell[TOTAL] += amount
+        cell[COUNT] += 1
+        if cell[MIN] is not None:
+            cell[MIN] = min(cell[MIN], amount)
+            cell[MAX] = max(cell[MAX], amount)
+
+    def add_batch(self, record_type, batch):
+        # Fold a whole Ledger of new records in, one cell update per
+        # month and category rather than per record
+        self.cube(record_type).add_many(*batch.daily_category_totals())
+        months = self.cells.setdefault(record_type, {})
+        for month, category, total, count, low, high in batch.monthly_category_stats():
+            categories = months.setdefault(month, {})
+            cell = categories.get(category)
+            if cell is None:
+                categories[category] = [total, count, low, high]
+                continue
+            cell[TOTAL] += total
+            cell[COUNT] += count
+            if cell[MIN] is not None:
+                cell[MIN] = min(cell[MIN], low)
+                cell[MAX] = max(cell[MAX], high)
+
+    def remove(self, record_type, record):
+        month = str(to_day(record["date"]))[:7]
+        amount = float(record["amount"])
+        self.cube(record_type).remove(record["date"], record["category"], amount)
+        categories = self.cells[record_type][month]
+        cell = categories[record["category"]]
+        cell[COUNT] -= 1
+        if cell[COUNT] == 0:
+            del categories[record["category"]]
+            if not categories:
+                del self.cells[record_type][month]
+            return
+        cell[TOTAL] -= amount
+        if cell[MIN] is not None and amount in (cell[MIN], cell[MAX]):
+            cell[MIN] = cell[MAX] = None
+
+    def stats(self, record_type, month, category, ledger):
+        """(total, count, min, max) for one cell, refreshing a stale min/max."""
+        cell = self.cells.get(record_type, {}).get(month, {}).get(category)
+        if cell is None:
+            return 0.0, 0, None, None
+        if cell[MIN] is None:
+            first, last = _month_bounds(month)
+            cell[MIN], cell[MAX] = ledger.min_max(first, last, category)
+        return tuple(cell)
+
+    # Queries ---------------------------------------------------------------
+
+    def totals_by_period(self, record_type, granularity="month", start_date=None, end_date=None):
+        # {period: {category: total}}; see TimeCube.totals_by_period
+        return self.cube(record_type).totals_by_period(granularity, start_date, end_date)
+
+    def totals_by_month_and_category(self, record_type, start_date=None, end_date=None):
+        return self.totals_by_period(record_type, "month", start_date, end_date)
+
+    def totals_by_month(self, record_type, start_date=None, end_date=None):
+        return {
+            month: sum(totals.values())
+            for month, totals in self.totals_by_month_and_category(record_type, start_date, end_date).items()
+        }
+
+    def category_total(self, record_type, category, start_date, end_date):
+        """Total of one category over an inclusive date range: from the
+        month cells when the range is whole months, else from the cube."""
+        first, last = to_day(start_date), to_day(end_date)
+        first_month, last_month = first.astype("datetime64[M]"), last.astype("datetime64[M]")
+        if first != first_month.astype("datetime64[D]") or last != (last_month + 1).astype("datetime64[D]") - 1:
+            return self.cube(record_type).category_total(category, first, last)
+        months = self.cells.get(record_type, {})
+        total = 0.0
+        for month in np.arange(first_month, last_month + 1).astype(str).tolist():
+            cell = months.get(month, {}).get(category)
+            if cell is not None:
+                total += cell[TOTAL]
+        return total
+
+    def totals_by_category(self, record_type, start_date=None, end_date=None, month=None):
+        # month restricts the cells to one calendar month number (1-12) of any year
+        if month is not None:
+            suffix = f"-{month:02d}"
+            totals = {}
+            for month_key, categories in self.cells.get(record_type, {}).items():
+                if month_key.endswith(suffix):
+                    for category, cell in categories.items():
+                        totals[category] = totals.get(category, 0) + cell[TOTAL]
+            return totals
+
+        totals = {}
+        for categories in self.totals_by_period(record_type, "year", start_date, end_date).values():
+            for category, total in categories.items():
+                totals[category] = totals.get(category, 0) + total
+        return totals
@@ -0,0 +1,88 @@
+import numpy as np
+
+
+def parse_query(query):
+    """Split a search box query into ``(term, prefix)`` pairs.
+
+    Terms are separated by whitespace and all of them must match. A term
+    matches text containing it anywhere, ignoring case; a term ending in
+    ``*`` only matches at the start of a word ("car*" finds "Car rental" but
+    not "Oscar").
+    """
+    terms = []
+    for word in (query or "").lower().split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append((word, prefix))
+    return terms
+
+
+def term_matches(text, term, prefix=False):
+    # text is already lower case; words are separated by spaces
+    if prefix:
+        return text.startswith(term) or f" {term}" in text
+    return term in text
+
+
+def record_matches(record, terms):
+    # For records outside a ledger, such as projected occurrences
+    texts = (str(record["description"]).lower(), str(record["category"]).lower())
+    return all(any(term_matches(text, term, prefix) for text in texts) for term, prefix in terms)
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to the codes of an interned string pool.
+
+    Ledgers intern their descriptions, so the index covers each distinct
+    description once however many records share it, and grows with the pool
+    (``add`` for every newly interned string). A term of three or more
+    characters is looked up by intersecting the posting lists of its
+    trigrams; the few candidates left are then checked against the text.
+    """
+
+    def __init__(self):
+        self.texts = []
+        self.postings = {}
+
+    @classmethod
+    def build(cls, texts):
+        index = cls()
+        for text in texts:
+            index.add(text)
+        return index
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, text):
+        # Index the next code of the pool
+        code = len(self.texts)
+        text = str(text).lower()
+        self.texts.append(text)
+        postings = self.postings
+        for trigram in _trigrams(text):
+            codes = postings.get(trigram)
+            if codes is None:
+                postings[trigram] = [code]
+            else:
+                codes.append(code)
+
+    def match(self, term, prefix=False):
+        """Codes of the strings matching one term, ascending."""
+        texts = self.texts
+        if len(term) < 3:
+            candidates = range(len(texts))
+        else:
+            lists = sorted((self.postings.get(trigram, ()) for trigram in _trigrams(term)), key=len)
+            candidates = set(lists[0])
+            for codes in lists[1:]:
+                if not candidates:
+                    break
+                candidates.intersection_update(codes)
+            candidates = sorted(candidates)
+        return np.array([code for code in candidates if term_matches(texts[code], term, prefix)], dtype=np.intp)
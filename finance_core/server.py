@@ -0,0 +1,359 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import numpy as np
+
+from .dates import to_days
+from .metrics import span
+
+
+logger = logging.getLogger("finance_core.server")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Idle keep-alive connections are closed after this many seconds
+KEEP_ALIVE_TIMEOUT = 15
+
+# GET responses and record views kept per version of the data
+CACHE_SIZE = 256
+VIEW_CACHE_SIZE = 32
+
+# Largest request body accepted, in bytes
+MAX_BODY = 64 * 1024 * 1024
+
+# Rows returned by one records request unless the client asks for fewer
+MAX_PAGE = 10000
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _flag(params, name):
+    return params.get(name, "").lower() in ("1", "true", "yes")
+
+
+def _json_columns(records):
+    # Import columns sent as JSON lists, back into the arrays the engine takes
+    return {
+        record_type: dict(columns, date=to_days(columns["date"]), amount=np.asarray(columns["amount"], dtype=np.float64))
+        for record_type, columns in records.items()
+    }
+
+
+class LedgerServer:
+    """Serves one ``FinanceEngine`` to many clients over HTTP/JSON.
+
+    The ledger is loaded once and every request is handled on one asyncio
+    event loop. Reads run straight against the engine; writes go through a
+    queue drained by a single writer task, so they are applied one at a
+    time in arrival order. Each write bumps ``version``, which keys the
+    caches of GET responses and sorted record views, and is sent as the
+    ETag so unchanged data costs a 304. Connections are kept alive between
+    requests (HTTP/1.1).
+    """
+
+    def __init__(self, engine, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.version = 0
+        # Part of every ETag, so tags from an earlier run never match
+        self.run = int(time.time())
+        self.cache = OrderedDict()
+        self.views = OrderedDict()
+        self.writes = None
+        self.server = None
+        # Alerts raised by the write being applied
+        self.alerts = []
+        engine.budget_listeners.append(self.alerts.extend)
+
+        self.routes = []
+        for method, pattern, handler in (
+            ("GET", r"/status", self.get_status),
+            ("GET", r"/categories", self.get_categories),
+            ("PUT", r"/categories", self.put_categories),
+            ("POST", r"/categories/(\w+)", self.add_category),
+            ("DELETE", r"/categories/(\w+)/(\d+)", self.delete_category),
+            ("PUT", r"/limits/(.+)", self.set_limit),
+            ("DELETE", r"/limits/(.+)", self.delete_limit),
+            ("GET", r"/records/(\w+)", self.get_records),
+            ("POST", r"/records/(\w+)", self.add_record),
+            ("GET", r"/records/(\w+)/(\d+)", self.get_record),
+            ("PUT", r"/records/(\w+)/(\d+)", self.edit_record),
+            ("DELETE", r"/records/(\w+)/(\d+)", self.delete_record),
+            ("POST", r"/import", self.import_records),
+            ("GET", r"/totals/(\w+)", self.get_totals),
+            ("GET", r"/totals/(\w+)/categories", self.get_category_totals),
+            ("GET", r"/analysis", self.get_analysis),
+            ("GET", r"/budget", self.get_budget),
+            ("GET", r"/forecast", self.get_forecast),
+            ("POST", r"/save", self.save)
+        ):
+            self.routes.append((method, re.compile(pattern + "$"), handler))
+        # GET answers that change with the date, not just with the data
+        self.dated = {self.get_budget, self.get_forecast}
+
+    # Reads -----------------------------------------------------------------
+
+    def get_status(self, params):
+        return {"version": self.version}
+
+    def get_categories(self, params):
+        return self.engine.categories
+
+    def _view(self, record_type, params):
+        # Record views are cached per query, so paging through one sorts once.
+        # Reading in a partition for another query changes the generation.
+        key = (record_type, params.get("start"), params.get("end"), _flag(params, "projected"), params.get("search"),
+               params.get("sort", "date"), _flag(params, "descending"), self.version,
+               self.engine.ledger(record_type).generation)
+        view = self.views.get(key)
+        if view is None:
+            view = self.engine.view(record_type, key[1], key[2], key[3], key[4])
+            view.sort(key[5], key[6])
+            # Kept under the generation after the partitions it read
+            key = key[:-1] + (self.engine.ledger(record_type).generation,)
+            self.views[key] = view
+            if len(self.views) > VIEW_CACHE_SIZE:
+                self.views.popitem(last=False)
+        else:
+            self.views.move_to_end(key)
+        return view
+
+    def get_records(self, params, record_type):
+        # ?start=&end=&search=&projected=1&sort=amount&descending=1&offset=0&limit=40
+        view = self._view(record_type, params)
+        offset = int(params.get("offset", 0))
+        limit = min(int(params.get("limit", MAX_PAGE)), MAX_PAGE)
+        return {"total": len(view), "records": view.rows(offset, offset + limit)}
+
+    def get_record(self, params, record_type, record_id):
+        record = self.engine.get_record(record_type, int(record_id))
+        if record is None:
+            raise HTTPError(404, f"No {record_type} record {record_id}")
+        return record
+
+    def _offload(self, query):
+        # Run a slow aggregation on a worker thread, against a snapshot so
+        # writes applied meanwhile don't race with it; respond awaits the
+        # result. Taking the snapshot reads any records it needs here, and
+        # the worker cannot reach the live ledgers.
+        engine = self.engine.snapshot()
+        return asyncio.get_running_loop().run_in_executor(None, query, engine)
+
+    def get_totals(self, params, record_type):
+        granularity = params.get("granularity", "month")
+        return self._offload(lambda engine: engine.totals_by_period(
+            record_type, granularity, params.get("start"), params.get("end"), _flag(params, "projected")))
+
+    def get_category_totals(self, params, record_type):
+        return self.engine.totals_by_category(record_type, params.get("start"), params.get("end"),
+                                              include_projected=_flag(params, "projected"))
+
+    def get_analysis(self, params):
+        return self._offload(lambda engine: engine.analyze_categories(
+            params.get("start"), params.get("end"), _flag(params, "projected")))
+
+    def get_budget(self, params):
+        return self.engine.budget_status(include_projected=_flag(params, "projected"))
+
+    def get_forecast(self, params):
+        months = int(params.get("months", 12))
+        return self._offload(lambda engine: engine.forecast(months))
+
+    # Writes, applied by the writer task --------------------------------------
+
+    def put_categories(self, params, body):
+        self.engine.categories.clear()
+        self.engine.categories.update(body)
+        self.engine.save_categories()
+        return self.engine.categories
+
+    def add_category(self, params, body, category_type):
+        self.engine.add_category(category_type, body["name"])
+        return self.engine.categories
+
+    def delete_category(self, params, body, category_type, index):
+        self.engine.delete_category(category_type, int(index))
+        return self.engine.categories
+
+    def set_limit(self, params, body, category):
+        self.engine.set_spending_limit(unquote(category), body["limit"], body.get("period", "monthly"))
+        return self.engine.categories
+
+    def delete_limit(self, params, body, category):
+        category = unquote(category)
+        if category not in self.engine.categories["spending_limits"]:
+            raise HTTPError(404, f"No spending limit for {category}")
+        self.engine.delete_spending_limit(category)
+        return self.engine.categories
+
+    def add_record(self, params, body, record_type):
+        record_id = self.engine.add_record(record_type, body["date"], body["amount"], body["category"],
+                                           body.get("description", ""), body.get("recurring", False),
+                                           body.get("frequency", "monthly"))
+        return {"id": record_id}
+
+    def edit_record(self, params, body, record_type, record_id):
+        self.get_record(params, record_type, record_id)
+        self.engine.edit_record(record_type, int(record_id), body["record"], body.get("series"))
+        return {}
+
+    def delete_record(self, params, body, record_type, record_id):
+        self.get_record(params, record_type, record_id)
+        self.engine.delete_record(record_type, int(record_id))
+        return {}
+
+    def import_records(self, params, body):
+        return self.engine.import_columns(_json_columns(body))
+
+    def save(self, params, body):
+        self.engine.save()
+        return {}
+
+    async def writer(self):
+        # The single writer: one change at a time, in arrival order
+        while True:
+            handler, params, body, groups, done = await self.writes.get()
+            del self.alerts[:]
+            try:
+                result = handler(params, body, *groups)
+            except Exception as e:
+                done.set_exception(e)
+                continue
+            self.version += 1
+            self.cache.clear()
+            self.views.clear()
+            if self.alerts:
+                result = dict(result, alerts=list(self.alerts))
+            done.set_result(result)
+
+    # HTTP --------------------------------------------------------------------
+
+    def route(self, method, path):
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match is not None:
+                if route_method == method:
+                    return handler, match.groups()
+                allowed = True
+        if allowed:
+            raise HTTPError(405, f"{method} is not allowed on {path}")
+        raise HTTPError(404, f"Nothing at {path}")
+
+    async def respond(self, method, target, headers, body):
+        # (status, body bytes, extra headers) for one request
+        parts = urlsplit(target)
+        params = dict(parse_qsl(parts.query))
+        handler, groups = self.route(method, parts.path)
+        if method != "GET":
+            data = json.loads(body) if body else {}
+            done = asyncio.get_running_loop().create_future()
+            await self.writes.put((handler, params, data, groups, done))
+            return 200, json.dumps(await done).encode("utf-8"), {}
+
+        tag = str(self.version)
+        if handler in self.dated:
+            tag += "-" + date.today().isoformat()
+        etag = f'"{self.run}-{tag}"'
+        if headers.get("if-none-match") == etag:
+            return 304, b"", {"ETag": etag}
+        cached = self.cache.get(target)
+        if cached is None or cached[0] != tag:
+            result = handler(params, *groups)
+            if asyncio.isfuture(result):
+                result = await result
+            cached = (tag, json.dumps(result).encode("utf-8"))
+            self.cache[target] = cached
+            if len(self.cache) > CACHE_SIZE:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(target)
+        return 200, cached[1], {"ETag": etag}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" if version == "HTTP/1.1" \
+                    else headers.get("connection", "").lower() == "keep-alive"
+
+                length = int(headers.get("content-length", 0))
+                with span("request", f"{method} {target}"):
+                    try:
+                        if length > MAX_BODY:
+                            keep_alive = False
+                            raise HTTPError(413, "Request body too large")
+                        body = await reader.readexactly(length) if length else b""
+                        status, payload, extra = await self.respond(method, target, headers, body)
+                    except HTTPError as e:
+                        status, payload, extra = e.status, json.dumps({"error": str(e)}).encode("utf-8"), {}
+                    except (ValueError, KeyError, TypeError) as e:
+                        status, payload, extra = 400, json.dumps({"error": str(e)}).encode("utf-8"), {}
+                    except Exception as e:
+                        logger.exception("Error handling %s %s", method, target)
+                        status, payload, extra = 500, json.dumps({"error": str(e)}).encode("utf-8"), {}
+
+                lines = [f"HTTP/1.1 {status} {REASONS[status]}",
+                         "Content-Type: application/json",
+                         f"Content-Length: {len(payload)}",
+                         "Connection: " + ("keep-alive" if keep_alive else "close")]
+                if keep_alive:
+                    lines.append(f"Keep-Alive: timeout={KEEP_ALIVE_TIMEOUT}")
+                lines.extend(f"{name}: {value}" for name, value in extra.items())
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.writes = asyncio.Queue()
+        asyncio.get_running_loop().create_task(self.writer())
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        logger.info("Serving the ledger on http://%s:%d", self.host, self.port)
+        return self.server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+
+def serve(engine, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Serve a loaded engine until interrupted."""
+    try:
+        asyncio.run(LedgerServer(engine, host, port).serve_forever())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,515 @@
+import argparse
+import copy
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from .journal import apply_operation
+from .ledger import RECURRING, to_day
+from .rollup import Rollup
+from .search import parse_query
+from .config import load_config, open_store, save_config
+from .storage import DEFAULT_CATEGORIES
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    category TEXT NOT NULL,
+    description,
+    recurring INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS records_type_date ON records (type, date);
+CREATE INDEX IF NOT EXISTS records_type_category_date ON records (type, category, date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Trigram full-text index over descriptions and categories, kept in step
+# with the records table by triggers. Needs SQLite 3.34+ built with FTS5;
+# without it searches fall back to LIKE scans.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE records_search USING fts5(
+    description, category, content='records', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER records_search_insert AFTER INSERT ON records BEGIN
+    INSERT INTO records_search (rowid, description, category) VALUES (new.id, new.description, new.category);
+END;
+CREATE TRIGGER records_search_delete AFTER DELETE ON records BEGIN
+    INSERT INTO records_search (records_search, rowid, description, category) VALUES ('delete', old.id, old.description, old.category);
+END;
+CREATE TRIGGER records_search_update AFTER UPDATE OF description, category ON records BEGIN
+    INSERT INTO records_search (records_search, rowid, description, category) VALUES ('delete', old.id, old.description, old.category);
+    INSERT INTO records_search (rowid, description, category) VALUES (new.id, new.description, new.category);
+END;
+INSERT INTO records_search (records_search) VALUES ('rebuild');
+"""
+
+RECORD_COLUMNS = "id, date, amount, category, description, recurring"
+
+# Open-ended ranges still go through the (type, date) index
+FIRST_DATE = "0000-01-01"
+LAST_DATE = "9999-12-31"
+
+
+def _bound(value, default):
+    return default if value is None else str(to_day(value))
+
+
+def _like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_clause(terms, full_text):
+    # SQL condition and parameters matching every (term, prefix) pair of
+    # parse_query. LIKE decides; the trigram index only narrows the rows
+    # first, for terms long enough to have a trigram.
+    clauses, parameters = [], []
+    for term, prefix in terms:
+        if prefix:
+            patterns = [_like(term) + "%", "% " + _like(term) + "%"]
+        else:
+            patterns = ["%" + _like(term) + "%"]
+        likes = " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in ("description", "category") for _ in patterns)
+        clauses.append(f"({likes})")
+        parameters += patterns * 2
+        if full_text and len(term) >= 3:
+            clauses.append("id IN (SELECT rowid FROM records_search WHERE records_search MATCH ?)")
+            parameters.append('"' + term.replace('"', '""') + '"')
+    return " AND ".join(clauses), tuple(parameters)
+
+
+def _record(row):
+    record_id, date, amount, category, description, recurring = row
+    return {
+        "amount": amount,
+        "category": category,
+        "date": date,
+        "recurring": bool(recurring),
+        "description": description,
+        "id": record_id
+    }
+
+
+def _row(record):
+    # id first; None lets SQLite pick the next row id
+    return (record.get("id") or None, str(to_day(record["date"])), float(record["amount"]),
+            record["category"], record["description"], 1 if record["recurring"] else 0)
+
+
+# Columns the record views can sort on
+SORT_COLUMNS = ("date", "amount", "category", "description", "recurring")
+
+
+class SQLiteView:
+    """Rows of a date-range query, fetched one page at a time.
+
+    Date order pages with LIMIT/OFFSET on the ``(type, date)`` index; other
+    sort orders fetch the matching row ids once and page through them.
+    """
+
+    def __init__(self, ledger, start_date, end_date, query=None):
+        self.ledger = ledger
+        self.where = "type = ? AND date BETWEEN ? AND ?"
+        self.parameters = (ledger.record_type, _bound(start_date, FIRST_DATE), _bound(end_date, LAST_DATE))
+        terms = parse_query(query)
+        if terms:
+            clause, parameters = _search_clause(terms, ledger.store.full_text)
+            self.where += " AND " + clause
+            self.parameters += parameters
+        self.size = ledger._query(f"SELECT COUNT(*) FROM records WHERE {self.where}", self.parameters)[0][0]
+        self.descending = True
+        self.ids = None
+
+    def __len__(self):
+        return self.size
+
+    def refresh(self):
+        # Nothing is held that a change could leave stale but the count,
+        # which a new view picks up
+        return False
+
+    def sort(self, column, descending=True):
+        if column not in SORT_COLUMNS:
+            raise ValueError(f"Unknown column: {column}")
+        self.descending = descending
+        if column == "date":
+            self.ids = None
+            return
+        direction = "DESC" if descending else "ASC"
+        self.ids = [row[0] for row in self.ledger._query(
+            f"SELECT id FROM records WHERE {self.where} ORDER BY {column} {direction}, id {direction}",
+            self.parameters
+        )]
+
+    def count_before(self, date, descending=True):
+        # Rows in date order ahead of a new row dated ``date``, which goes
+        # after the existing rows of that day
+        comparison = ">=" if descending else "<="
+        return self.ledger._query(
+            f"SELECT COUNT(*) FROM records WHERE {self.where} AND date {comparison} ?",
+            self.parameters + (str(to_day(date)),)
+        )[0][0]
+
+    def counts_before(self, dates, descending=True):
+        """``count_before`` for each of several dates, in two queries: the
+        rows before the earliest date, and the rows per day up to the latest."""
+        days = [str(to_day(date)) for date in dates]
+        if not days:
+            return []
+        first, last = min(days), max(days)
+        below = self.ledger._query(f"SELECT COUNT(*) FROM records WHERE {self.where} AND date < ?",
+                                   self.parameters + (first,))[0][0]
+        groups = self.ledger._query(
+            f"SELECT date, COUNT(*) FROM records WHERE {self.where} AND date BETWEEN ? AND ? GROUP BY date ORDER BY date",
+            self.parameters + (first, last)
+        )
+        keys = [row[0] for row in groups]
+        running = list(accumulate((row[1] for row in groups), initial=below))
+        if descending:
+            return [self.size - running[bisect_left(keys, day)] for day in days]
+        return [running[bisect_right(keys, day)] for day in days]
+
+    def rows(self, start, stop):
+        start = max(0, start)
+        stop = min(self.size, stop)
+        if stop <= start:
+            return []
+        if self.ids is None:
+            direction = "DESC" if self.descending else "ASC"
+            rows = self.ledger._query(
+                f"SELECT {RECORD_COLUMNS} FROM records WHERE {self.where} "
+                f"ORDER BY date {direction}, id {direction} LIMIT ? OFFSET ?",
+                self.parameters + (stop - start, start)
+            )
+            return [_record(row) for row in rows]
+        ids = self.ids[start:stop]
+        placeholders = ", ".join("?" * len(ids))
+        fetched = {
+            row[0]: _record(row)
+            for row in self.ledger._query(f"SELECT {RECORD_COLUMNS} FROM records WHERE id IN ({placeholders})", ids)
+        }
+        return [fetched[row_id] for row_id in ids]
+
+
+class SQLiteLedger:
+    """One record type of a SQLite database, with the Ledger query methods.
+
+    Positions are SQLite row ids, which double as the record ids. Filtering and aggregation run as SQL on
+    the ``(type, date)`` and ``(type, category, date)`` indexes; writes are
+    left uncommitted so the store can group them into one transaction.
+    """
+
+    # Views re-run their queries, so nothing needs re-bounding (see Ledger)
+    generation = 0
+
+    def __init__(self, store, record_type):
+        self.store = store
+        self.record_type = record_type
+
+    def _query(self, sql, parameters=()):
+        with self.store.lock:
+            return self.store.connection.execute(sql, parameters).fetchall()
+
+    def _execute(self, sql, parameters=()):
+        with self.store.lock:
+            return self.store.connection.execute(sql, parameters)
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM records WHERE type = ?", (self.record_type,))[0][0]
+
+    def __getitem__(self, position):
+        rows = self._query(f"SELECT {RECORD_COLUMNS} FROM records WHERE id = ?", (position,))
+        if not rows:
+            raise IndexError(position)
+        return _record(rows[0])
+
+    def __iter__(self):
+        return iter(self.to_records())
+
+    @property
+    def next_id(self):
+        # Row ids are shared by both record types
+        return self._query("SELECT COALESCE(MAX(id), 0) + 1 FROM records")[0][0]
+
+    def position_of(self, record_id):
+        rows = self._query("SELECT id FROM records WHERE id = ? AND type = ?", (record_id, self.record_type))
+        return rows[0][0] if rows else None
+
+    def append(self, record):
+        return self._execute(
+            f"INSERT INTO records (type, {RECORD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.record_type,) + _row(record)
+        ).lastrowid
+
+    def extend(self, records):
+        with self.store.lock:
+            self.store.connection.executemany(
+                f"INSERT INTO records (type, {RECORD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((self.record_type,) + _row(record) for record in records)
+            )
+
+    def append_batch(self, batch):
+        # Rows of an in-memory Ledger, inserted with their ids
+        categories = batch.categories
+        descriptions = batch.descriptions
+        with self.store.lock:
+            self.store.connection.executemany(
+                f"INSERT INTO records (type, {RECORD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (self.record_type, record_id, date, amount, categories[category], descriptions[description], recurring)
+                    for record_id, date, amount, category, description, recurring in zip(
+                        batch.ids.tolist(), batch.dates.astype(str).tolist(), batch.amounts.tolist(),
+                        batch.category_codes.tolist(), batch.description_codes.tolist(),
+                        (batch.flags & RECURRING).astype(int).tolist()
+                    )
+                )
+            )
+
+    def update(self, position, record):
+        self._execute(
+            "UPDATE records SET date = ?, amount = ?, category = ?, description = ?, recurring = ? WHERE id = ?",
+            _row(record)[1:] + (position,)
+        )
+
+    def remove(self, position):
+        self._execute("DELETE FROM records WHERE id = ?", (position,))
+
+    def find(self, date, amount, category, description):
+        rows = self._query(
+            "SELECT id FROM records WHERE type = ? AND date = ? AND amount = ? AND category = ? AND description = ? "
+            "ORDER BY id LIMIT 1",
+            (self.record_type, str(to_day(date)), float(amount), category, description)
+        )
+        return rows[0][0] if rows else None
+
+    def to_records(self):
+        rows = self._query(f"SELECT {RECORD_COLUMNS} FROM records WHERE type = ? ORDER BY id", (self.record_type,))
+        return [_record(row) for row in rows]
+
+    def view(self, start_date=None, end_date=None, query=None):
+        return SQLiteView(self, start_date, end_date, query)
+
+    def records_between(self, start_date=None, end_date=None):
+        rows = self._query(
+            f"SELECT {RECORD_COLUMNS} FROM records WHERE type = ? AND date BETWEEN ? AND ? "
+            "ORDER BY date DESC, id DESC",
+            (self.record_type, _bound(start_date, FIRST_DATE), _bound(end_date, LAST_DATE))
+        )
+        return [_record(row) for row in rows]
+
+    def total(self, start_date=None, end_date=None):
+        rows = self._query(
+            "SELECT COALESCE(SUM(amount), 0) FROM records WHERE type = ? AND date BETWEEN ? AND ?",
+            (self.record_type, _bound(start_date, FIRST_DATE), _bound(end_date, LAST_DATE))
+        )
+        return float(rows[0][0])
+
+    def min_max(self, start_date=None, end_date=None, category=None):
+        sql = "SELECT MIN(amount), MAX(amount) FROM records WHERE type = ? AND date BETWEEN ? AND ?"
+        parameters = [self.record_type, _bound(start_date, FIRST_DATE), _bound(end_date, LAST_DATE)]
+        if category is not None:
+            sql += " AND category = ?"
+            parameters.append(category)
+        return tuple(self._query(sql, parameters)[0])
+
+    def daily_category_totals(self):
+        rows = self._query(
+            "SELECT date, category, SUM(amount), COUNT(*) FROM records WHERE type = ? GROUP BY date, category",
+            (self.record_type,)
+        )
+        if not rows:
+            return [], [], [], []
+        return tuple(map(list, zip(*rows)))
+
+    def monthly_category_stats(self):
+        return self._query(
+            "SELECT substr(date, 1, 7) AS month, category, SUM(amount), COUNT(*), MIN(amount), MAX(amount) "
+            "FROM records WHERE type = ? GROUP BY month, category",
+            (self.record_type,)
+        )
+
+    def totals_by_category(self, start_date=None, end_date=None, month=None):
+        sql = "SELECT category, SUM(amount) FROM records WHERE type = ? AND date BETWEEN ? AND ?"
+        parameters = [self.record_type, _bound(start_date, FIRST_DATE), _bound(end_date, LAST_DATE)]
+        if month is not None:
+            sql += " AND substr(date, 6, 2) = ?"
+            parameters.append(f"{month:02d}")
+        return dict(self._query(sql + " GROUP BY category", parameters))
+
+    def totals_by_month(self, start_date=None, end_date=None):
+        return dict(self._query(
+            "SELECT substr(date, 1, 7) AS month, SUM(amount) FROM records "
+            "WHERE type = ? AND date BETWEEN ? AND ? GROUP BY month ORDER BY month",
+            (self.record_type, _bound(start_date, FIRST_DATE), _bound(end_date, LAST_DATE))
+        ))
+
+    def totals_by_month_and_category(self, start_date=None, end_date=None):
+        result = {}
+        for month, category, total in self._query(
+            "SELECT substr(date, 1, 7) AS month, category, SUM(amount) FROM records "
+            "WHERE type = ? AND date BETWEEN ? AND ? GROUP BY month, category ORDER BY month",
+            (self.record_type, _bound(start_date, FIRST_DATE), _bound(end_date, LAST_DATE))
+        ):
+            result.setdefault(month, {})[category] = total
+        return result
+
+
+class SQLiteStore:
+    """Ledger storage in a single SQLite database (WAL mode).
+
+    Has the same interface as ``JsonStore``. Each committed operation is one
+    transaction covering the record change, the categories (kept as JSON in
+    the ``meta`` table) and a change counter. The month x category rollup is
+    saved to ``meta`` on close and reused only if the counter still matches.
+    """
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+        self.connection = sqlite3.connect(database_path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.full_text = self._create_search_index()
+        self.load_report = {}
+        self.rollup = None
+
+    def _create_search_index(self):
+        # True when the trigram index exists or could be created
+        exists = self.connection.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'records_search'"
+        ).fetchone()[0]
+        if exists:
+            return True
+        try:
+            self.connection.executescript("BEGIN;" + SEARCH_SCHEMA + "COMMIT;")
+        except sqlite3.OperationalError:
+            self.connection.rollback()
+            return False
+        return True
+
+    def ledger(self, record_type):
+        return SQLiteLedger(self, record_type)
+
+    def load_categories(self):
+        rows = self.connection.execute("SELECT value FROM meta WHERE key = 'categories'").fetchall()
+        return json.loads(rows[0][0]) if rows else copy.deepcopy(DEFAULT_CATEGORIES)
+
+    def _write_categories(self, categories):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('categories', ?)",
+            (json.dumps(categories),)
+        )
+
+    def _meta(self, key):
+        rows = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchall()
+        return rows[0][0] if rows else None
+
+    def load(self):
+        """Return ``(expenses, income, categories, errors)``."""
+        ledgers = {"expense": self.ledger("expense"), "income": self.ledger("income")}
+        changes = int(self._meta("changes") or 0)
+        saved = self._meta("rollup")
+        self.rollup = Rollup.from_json(json.loads(saved), changes) if saved else None
+        if self.rollup is None:
+            self.rollup = Rollup.build(ledgers)
+        return ledgers["expense"], ledgers["income"], self.load_categories(), []
+
+    def commit(self, operation, ledgers, categories):
+        with self.lock, self.connection:
+            apply_operation(ledgers, categories, operation, self.rollup)
+            self._write_categories(categories)
+            self.connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('changes', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+
+    def save_categories(self, categories):
+        with self.lock, self.connection:
+            self._write_categories(categories)
+
+    def save(self, ledgers, categories, background=True):
+        # Every commit is already durable
+        pass
+
+    def require(self, ledger, record_type, start_date=None, end_date=None):
+        # Queries always run against the whole table
+        pass
+
+    def require_id(self, ledger, record_type, record_id):
+        pass
+
+    def close(self):
+        with self.lock:
+            if self.rollup is not None:
+                with self.connection:
+                    changes = int(self._meta("changes") or 0)
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('rollup', ?)",
+                        (json.dumps(self.rollup.to_json(changes)),)
+                    )
+            self.connection.close()
+
+
+def migrate_json_to_sqlite(data_folder, database_path, replace=False):
+    """Import the JSON snapshots (and any journal) into a SQLite database.
+    The folder is read with its own ``config.json`` settings and left as it
+    is. Returns the number of expense and income records imported.
+    """
+    json_store = open_store(data_folder, dict(load_config(data_folder), backend="json"))
+    expenses, income, categories, errors = json_store.load(rewrite=False)
+    json_store.require(expenses, "expense")
+    json_store.require(income, "income")
+    json_store.close()
+    if errors:
+        raise RuntimeError("\n".join(errors))
+
+    store = SQLiteStore(database_path)
+    try:
+        with store.lock, store.connection:
+            existing = store.connection.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            if existing and not replace:
+                raise RuntimeError(f"{database_path} already contains {existing} records; use --replace to overwrite them.")
+            store.connection.execute("DELETE FROM records")
+            store.connection.execute("DELETE FROM meta WHERE key = 'rollup'")
+            store.ledger("expense").extend(expenses.to_records())
+            store.ledger("income").extend(income.to_records())
+            # Recurring copies travel inside the categories document
+            store._write_categories(categories)
+    finally:
+        store.close()
+    return len(expenses), len(income)
+
+
+def main(argv=None):
+    default_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "finance_data")
+    parser = argparse.ArgumentParser(description="Import the finance_data JSON files into a SQLite database.")
+    parser.add_argument("--data-folder", default=default_folder, help="folder holding expenses.json, income.json and categories.json")
+    parser.add_argument("--database", help="SQLite file to create (defaults to the configured sqlite_file)")
+    parser.add_argument("--replace", action="store_true", help="overwrite records already in the database")
+    parser.add_argument("--use", action="store_true", help="switch config.json to the SQLite backend afterwards")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.data_folder)
+    database_path = args.database or os.path.join(args.data_folder, config["sqlite_file"])
+    expenses, income = migrate_json_to_sqlite(args.data_folder, database_path, replace=args.replace)
+    print(f"Imported {expenses} expense and {income} income records into {database_path}")
+
+    if args.use:
+        config["backend"] = "sqlite"
+        config["sqlite_file"] = os.path.relpath(database_path, args.data_folder)
+        save_config(args.data_folder, config)
+        print("Backend set to sqlite in config.json")
+
+
+if __name__ == "__main__":
+    main()
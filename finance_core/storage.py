@@ -0,0 +1,473 @@
+import ast
+import copy
+import gc
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .binary import ledger_bytes, open_ledger
+from .dates import day_number, to_day, to_days
+from .journal import COMPACT_THRESHOLD, Journal, apply_operation
+from .ledger import Ledger
+from .metrics import span
+from .recurrence import upgrade_series
+from .rollup import Rollup
+
+
+DEFAULT_CATEGORIES = {
+    "income": [],
+    "expense": [],
+    "spending_limits": {},
+    "recurring": {
+        "income": [],
+        "expense": []
+    }
+}
+
+
+# Record files are split by date into one file per year or month, listed
+# in a manifest
+PARTITION_FOLDER = "partitions"
+MANIFEST_NAME = "manifest.json"
+PARTITION_UNITS = {"year": "Y", "month": "M"}
+PARTITION_NAMES = {"expense": "expenses", "income": "income"}
+# Partition file extension per record format
+RECORD_FORMATS = {"json": ".json", "binary": ".bin"}
+
+
+class CustomJSONDecoder(json.JSONDecoder):
+    def __init__(self, *args, **kwargs):
+        json.JSONDecoder.__init__(self, object_hook=self.object_hook, *args, **kwargs)
+
+    def object_hook(self, obj):
+        for key, value in obj.items():
+            if isinstance(value, str):
+                try:
+                    obj[key] = ast.literal_eval(value)
+                except (ValueError, SyntaxError):
+                    pass
+        return obj
+
+
+class _PausedGC:
+    # Parsing allocates millions of small dicts, which otherwise triggers
+    # repeated full collections that cost more than the parse itself
+    def __enter__(self):
+        self.enabled = gc.isenabled()
+        gc.disable()
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            gc.enable()
+
+
+def parse_strict(file_path):
+    with open(file_path, "rb") as file:
+        raw = file.read()
+    with _PausedGC():
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+
+def parse_lenient(file_path):
+    # Repair path for hand-edited files: trailing commas, single quotes and
+    # stringified literals. Slow, and mangles values containing apostrophes.
+    with open(file_path, "r") as file:
+        data = file.read()
+        # Remove any trailing commas
+        data = re.sub(r',\s*}', '}', data)
+        data = re.sub(r',\s*]', ']', data)
+        # Replace single quotes with double quotes
+        data = data.replace("'", '"')
+        # Parse the data
+        parsed_data = json.loads(data, cls=CustomJSONDecoder)
+        # Normalize keys to lowercase for dictionaries in lists
+        if isinstance(parsed_data, list):
+            return [{k.lower(): v for k, v in item.items()} for item in parsed_data]
+        return parsed_data
+
+
+def load_json(file_path):
+    """Parse a JSON file, trying the strict parser before the repair path.
+
+    Returns ``(data, mode, seconds)`` where mode is "strict" or "lenient".
+    """
+    start = time.perf_counter()
+    try:
+        data = parse_strict(file_path)
+        mode = "strict"
+    except ValueError:
+        data = parse_lenient(file_path)
+        mode = "lenient"
+    return data, mode, time.perf_counter() - start
+
+
+def load_ledger(file_path):
+    """Load a record file straight into a Ledger.
+
+    The strict path is a single parse followed by the Ledger's typed column
+    conversion, which rejects missing fields, non-numeric amounts and
+    malformed dates. Any such failure falls back to the lenient repair path.
+    Returns ``(ledger, mode, seconds)``.
+    """
+    start = time.perf_counter()
+    try:
+        with _PausedGC():
+            ledger = Ledger.from_records(parse_strict(file_path))
+        mode = "strict"
+    except (ValueError, TypeError, KeyError, AttributeError):
+        ledger = Ledger.from_records(parse_lenient(file_path))
+        mode = "lenient"
+    return ledger, mode, time.perf_counter() - start
+
+
+def partition_keys(dates, granularity):
+    # "YYYY" or "YYYY-MM" key of each datetime64[D] date
+    return to_days(dates).astype(f"datetime64[{PARTITION_UNITS[granularity]}]").astype(str)
+
+
+def partition_bounds(key):
+    # First and last day ordinal of a partition key
+    first = np.datetime64(key)
+    return day_number(first), day_number(first + 1) - 1
+
+
+def _migrate(expenses, income, categories):
+    # Files written before records had ids: make ids unique across both
+    # ledgers, then turn the recurring record copies into recurrence series.
+    # Returns True when anything changed and the snapshots need rewriting.
+    changed = expenses.assigned_ids or income.assigned_ids
+    clash = np.intersect1d(expenses.ids, income.ids)
+    if len(clash):
+        income.reassign_ids(np.flatnonzero(np.isin(income.ids, clash)), max(expenses.next_id, income.next_id))
+        changed = True
+
+    recurring = categories.setdefault("recurring", {})
+    for record_type, ledger in (("expense", expenses), ("income", income)):
+        if upgrade_series(recurring.setdefault(record_type, []), ledger):
+            changed = True
+    return bool(changed)
+
+
+class JsonStore:
+    """The JSON record files in ``finance_data/`` plus their journal.
+
+    Records are stored per type and per year (or month, with the
+    ``partition`` setting) under ``partitions/``, and ``manifest.json`` lists
+    every partition with its date range, id range, count and total. Loading
+    reads the manifest and only the newest partition of each type; others
+    are read into the ledgers by ``require`` when a query first reaches their
+    dates. Saves rewrite only the partitions changed since the last save.
+    Folders holding the older single ``expenses.json``/``income.json`` files
+    are converted on their first load; the single files are left as they
+    were and no longer read.
+
+    Partitions are JSON or, with ``record_format="binary"``, fixed-width
+    binary files that are memory-mapped instead of parsed (see
+    ``finance_core.binary``). A folder written in the other format is
+    converted on load; without a format the folder's own is kept.
+
+    Every store offers the same methods: ``load`` returns the ledgers and
+    categories, ``commit`` applies and persists one journal operation,
+    ``save_categories`` persists category changes, ``save`` writes a full
+    snapshot, ``require``/``require_id`` make sure records are in memory and
+    ``close`` flushes outstanding work.
+    """
+
+    def __init__(self, data_folder, partition="year", record_format=None):
+        if partition not in PARTITION_UNITS:
+            raise ValueError(f"Unknown partition size: {partition}")
+        if record_format is not None and record_format not in RECORD_FORMATS:
+            raise ValueError(f"Unknown record format: {record_format}")
+        self.data_folder = data_folder
+        self.partition = partition
+        self.record_format = record_format
+        self.expenses_file = os.path.join(data_folder, "expenses.json")
+        self.income_file = os.path.join(data_folder, "income.json")
+        self.categories_file = os.path.join(data_folder, "categories.json")
+        self.rollup_file = os.path.join(data_folder, "rollup.json")
+        self.manifest_file = os.path.join(data_folder, MANIFEST_NAME)
+
+        # Month x category totals, saved with every snapshot
+        self.rollup = None
+
+        # Partitions on disk, {"expense": {key: entry}, "income": ...}, and
+        # the keys changed since the last save
+        self.manifest = None
+        self.dirty = {"expense": set(), "income": set()}
+
+        # Write-ahead journal of add/edit/delete operations since the last snapshot
+        self.journal = Journal(data_folder)
+
+        # Which loader ran for each file and how long it took
+        self.load_report = {}
+
+    def partition_file(self, record_type, key, record_format=None):
+        extension = RECORD_FORMATS[record_format or self.record_format]
+        return os.path.join(self.data_folder, PARTITION_FOLDER, PARTITION_NAMES[record_type], key + extension)
+
+    def load(self, rewrite=True):
+        """Return ``(expenses, income, categories, errors)``. With
+        ``rewrite=False`` the folder is read as it is, for tools that copy it
+        elsewhere: nothing is converted or saved."""
+        errors = []
+
+        def load_file(file_path, loader):
+            try:
+                data, mode, seconds = loader(file_path)
+                self.load_report[os.path.basename(file_path)] = (mode, seconds)
+                return data
+            except FileNotFoundError:
+                errors.append(f"{file_path} not found in the finance_data folder.")
+            except json.JSONDecodeError as e:
+                errors.append(f"Invalid JSON in {file_path}: {str(e)}")
+            except Exception as e:
+                errors.append(f"Error loading {file_path}: {str(e)}")
+            return None
+
+        self.manifest = load_file(self.manifest_file, load_json) if os.path.exists(self.manifest_file) else None
+        stored_format = None if self.manifest is None else self.manifest.get("format", "json")
+        self.record_format = self.record_format or stored_format or "json"
+        if not rewrite and stored_format is not None:
+            self.record_format = stored_format
+        convert = stored_format is not None and stored_format != self.record_format
+        if self.manifest is None:
+            expenses = load_file(self.expenses_file, load_ledger) or Ledger()
+            income = load_file(self.income_file, load_ledger) or Ledger()
+        else:
+            self.partition = self.manifest["partition"]
+            expenses, income = self._open_partitions("expense"), self._open_partitions("income")
+        categories = load_file(self.categories_file, load_json) or copy.deepcopy(DEFAULT_CATEGORIES)
+        ledgers = {"expense": expenses, "income": income}
+
+        if self.manifest is None:
+            # Single-file layout: everything is in memory already
+            migrated = not errors and _migrate(expenses, income, categories)
+            self.rollup = None
+            if not errors:
+                self.rollup = Rollup.read(self.rollup_file, Rollup.fingerprint(ledgers))
+            self.manifest = {"partition": self.partition, "format": self.record_format, "expense": {}, "income": {}}
+            for record_type, ledger in ledgers.items():
+                self.dirty[record_type].update(partition_keys(ledger.dates, self.partition).tolist())
+        else:
+            fingerprint = self.fingerprint()
+            # Partitions without a checksum are rewritten with one
+            migrated = fingerprint is None
+            # A saved rollup is only trusted when it matches the partitions
+            self.rollup = None if migrated else Rollup.read(self.rollup_file, fingerprint)
+            for record_type, ledger in ledgers.items():
+                if self.rollup is None or convert:
+                    self.require(ledger, record_type)
+                    if convert or migrated:
+                        self.dirty[record_type].update(self.manifest[record_type])
+                elif ledger.on_disk:
+                    # The newest records, which the default views show
+                    self._read_partitions(ledger, record_type, [max(ledger.on_disk)])
+        if self.rollup is None:
+            self.rollup = Rollup.build(ledgers)
+
+        # Replay operations journalled since the snapshots were written
+        try:
+            operations = self.journal.replay()
+            for operation in operations:
+                self._touch(ledgers, operation)
+                apply_operation(ledgers, categories, operation, self.rollup)
+        except Exception as e:
+            errors.append(f"Error replaying journal: {str(e)}")
+            operations = []
+
+        legacy = rewrite and not errors and not os.path.exists(self.manifest_file) and \
+            (os.path.exists(self.expenses_file) or os.path.exists(self.income_file))
+        if legacy:
+            # Convert to partitions now; the manifest takes precedence over
+            # the single files from then on
+            self.save(ledgers, categories, background=False)
+        elif convert and not errors:
+            # Rewrite every partition in the new format, then drop the old files
+            previous = self.manifest
+            self.save(ledgers, categories, background=False)
+            for record_type in ("expense", "income"):
+                for key in previous[record_type]:
+                    path = self.partition_file(record_type, key, stored_format)
+                    if os.path.exists(path):
+                        os.remove(path)
+        elif rewrite and (operations or migrated):
+            self.save(ledgers, categories)
+
+        return expenses, income, categories, errors
+
+    def _open_partitions(self, record_type):
+        # An empty ledger that knows its partitions and the ids they use
+        ledger = Ledger()
+        for key, entry in self.manifest[record_type].items():
+            first, last = partition_bounds(key)
+            ledger.on_disk[key] = (first, last, entry["min_id"], entry["max_id"])
+            ledger.next_id = max(ledger.next_id, entry["max_id"] + 1)
+        return ledger
+
+    def _read_partitions(self, ledger, record_type, keys):
+        if not keys:
+            return
+        # Partitions are read in the format the manifest says they were written in
+        record_format = self.manifest.get("format", "json")
+        with span("load", f"{record_type} {', '.join(sorted(keys))}") as timing:
+            if record_format == "binary":
+                for key in sorted(keys):
+                    path = self.partition_file(record_type, key, record_format)
+                    start = time.perf_counter()
+                    batch = open_ledger(path)
+                    self.load_report[os.path.relpath(path, self.data_folder)] = ("mapped", time.perf_counter() - start)
+                    ledger.append_batch(batch)
+                    timing.count("records_scanned", len(batch))
+            else:
+                records = []
+                for key in sorted(keys):
+                    path = self.partition_file(record_type, key, record_format)
+                    data, mode, seconds = load_json(path)
+                    self.load_report[os.path.relpath(path, self.data_folder)] = (mode, seconds)
+                    records.extend(data)
+                ledger.append_batch(Ledger.from_records(records))
+                timing.count("records_scanned", len(records))
+            for key in keys:
+                del ledger.on_disk[key]
+
+    def require(self, ledger, record_type, start_date=None, end_date=None):
+        """Read every partition overlapping the inclusive date range (all of
+        them without one) that ``ledger`` does not hold yet."""
+        if not ledger.on_disk:
+            return
+        low = None if start_date is None else day_number(start_date)
+        high = None if end_date is None else day_number(end_date)
+        self._read_partitions(ledger, record_type, [
+            key for key, (first, last, _, _) in ledger.on_disk.items()
+            if (high is None or first <= high) and (low is None or last >= low)
+        ])
+
+    def require_id(self, ledger, record_type, record_id):
+        # Read the partitions whose id range covers a record not in memory
+        if ledger.on_disk and ledger.position_of(record_id) is None:
+            self._read_partitions(ledger, record_type, [
+                key for key, (_, _, low, high) in ledger.on_disk.items() if low <= record_id <= high
+            ])
+
+    def _partition_of(self, date):
+        return partition_keys([to_day(date)], self.partition)[0]
+
+    def _touch(self, ledgers, operation):
+        # Read the partitions an operation changes and mark them dirty
+        kind = operation["op"]
+        if kind == "import":
+            for record_type, columns in operation["records"].items():
+                keys = set(partition_keys(columns["date"], self.partition).tolist())
+                ledger = ledgers[record_type]
+                self._read_partitions(ledger, record_type, [key for key in keys if key in ledger.on_disk])
+                self.dirty[record_type].update(keys)
+            return
+        if kind not in ("add", "edit", "delete"):
+            return
+
+        record_type = operation["type"]
+        ledger = ledgers[record_type]
+        if kind != "add":
+            if "id" in operation:
+                self.require_id(ledger, record_type, operation["id"])
+                position = ledger.position_of(operation["id"])
+            else:
+                self.require(ledger, record_type)
+                position = operation["position"]
+            if position is not None:
+                self.dirty[record_type].add(self._partition_of(ledger.dates[position]))
+        if kind != "delete":
+            date = operation["record"]["date"]
+            self.require(ledger, record_type, date, date)
+            self.dirty[record_type].add(self._partition_of(date))
+
+    def fingerprint(self):
+        # Record count and checksum per type, from the manifest, and the save
+        # that wrote it; None for manifests older than partition checksums
+        fingerprint = {"generation": self.manifest.get("generation", 0)}
+        for record_type in ("expense", "income"):
+            entries = self.manifest[record_type].values()
+            if any("checksum" not in entry for entry in entries):
+                return None
+            fingerprint[record_type] = [sum(entry["count"] for entry in entries),
+                                        sum(entry["checksum"] for entry in entries) % 2 ** 64]
+        return fingerprint
+
+    def commit(self, operation, ledgers, categories):
+        # Apply an add/edit/delete in memory, then make it durable with a
+        # single journal append instead of rewriting the record files
+        self._touch(ledgers, operation)
+        apply_operation(ledgers, categories, operation, self.rollup)
+        self.journal.record(operation)
+        if self.journal.pending >= COMPACT_THRESHOLD:
+            self.save(ledgers, categories)
+
+    def save_categories(self, categories):
+        self.journal.record({"op": "categories", "categories": categories})
+
+    def save(self, ledgers, categories, background=True):
+        # Fold the journal into the record files. Only dirty partitions are
+        # rewritten; their rows are copied out here, so the caller can keep
+        # editing while they are written.
+        manifest = copy.deepcopy(self.manifest)
+        manifest["format"] = self.record_format
+        manifest["generation"] = manifest.get("generation", 0) + 1
+        snapshots = {}
+        for record_type, keys in self.dirty.items():
+            ledger = ledgers[record_type]
+            if keys:
+                # Mapped files cannot be replaced on every platform
+                ledger.detach()
+            for key in keys:
+                first, last = partition_bounds(key)
+                positions = ledger.select(np.datetime64(first, "D"), np.datetime64(last, "D"))[::-1]
+                if not len(positions):
+                    # Every record of the partition is gone; drop its file
+                    snapshots[self.partition_file(record_type, key)] = lambda: None
+                    manifest[record_type].pop(key, None)
+                    continue
+                if self.record_format == "binary":
+                    data = ledger_bytes(ledger, positions)
+                else:
+                    data = ledger.records(positions)
+                snapshots[self.partition_file(record_type, key)] = lambda data=data: data
+                ids = ledger.ids[positions]
+                manifest[record_type][key] = {
+                    "first": str(ledger.dates[positions[0]]),
+                    "last": str(ledger.dates[positions[-1]]),
+                    "count": len(positions),
+                    "total": float(ledger.amounts[positions].sum()),
+                    "checksum": ledger.checksum(positions),
+                    "min_id": int(ids.min()),
+                    "max_id": int(ids.max())
+                }
+        for record_type in ("expense", "income"):
+            manifest[record_type] = dict(sorted(manifest[record_type].items()))
+            os.makedirs(os.path.dirname(self.partition_file(record_type, "-")), exist_ok=True)
+
+        previous, self.manifest = self.manifest, manifest
+        categories = copy.deepcopy(categories)
+        rollup = self.rollup.copy()
+        fingerprint = self.fingerprint()
+        snapshots.update({
+            self.categories_file: lambda: categories,
+            self.rollup_file: lambda: rollup.to_json(fingerprint),
+            self.manifest_file: lambda: manifest
+        })
+        if self.journal.compact(snapshots, background=background):
+            self.dirty = {"expense": set(), "income": set()}
+        else:
+            self.manifest = previous
+
+    def close(self):
+        self.journal.close()
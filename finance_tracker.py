@@ -1,37 +1,67 @@
+import sys
+import time
+
+# Reference point for the startup report
+STARTED = time.perf_counter()
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # python -m finance_tracker <command> ...: the headless CLI, which never
+    # imports Tk, matplotlib or pandas
+    from finance_core.cli import main
+    sys.exit(main())
+
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import json
+from tkinter import ttk, messagebox, simpledialog, filedialog
 from datetime import datetime, date
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import pandas as pd
-from tkcalendar import Calendar
+import logging
 import os
-import ast
-import re
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
+import threading
+# matplotlib, numpy, tkcalendar and the engine are imported on first use
+from finance_core.jobs import JobScheduler
+from finance_core.metrics import metrics, span
+from finance_core.recurrence import FREQUENCIES
+
+
+log = logging.getLogger("finance_tracker")
+
+
+# How often the main loop checks whether the background load has finished
+LOAD_POLL_MS = 50
+
+# How often the main loop collects progress and results of background jobs
+JOB_POLL_MS = 50
+
+# Pause in typing after which the record views are searched
+SEARCH_DELAY_MS = 200
+
+# How each budget period reads after an amount
+PERIOD_LABELS = {"weekly": "per week", "monthly": "per month", "yearly": "per year"}
+
+
+def period_dates(periods, granularity):
+    # Period labels ("YYYY-MM", "YYYY-Qn", ...) to the first day of each
+    from finance_core.cube import period_start
+    return [period_start(period, granularity) for period in periods]
 
 
 class FinanceTracker:
-    def __init__(self, master):
+    def __init__(self, master, config=None):
         self.master = master
         self.master.title("Finance Tracker")
         self.master.geometry("800x600")
         self.master.configure(bg="#2C3E50")
 
         self.data_folder = os.path.join(os.path.dirname(__file__), "finance_data")
-        
-        # Ensure the data folder exists
-        if not os.path.exists(self.data_folder):
-            os.makedirs(self.data_folder)
-
-        self.expenses_file = os.path.join(self.data_folder, "expenses.json")
-        self.income_file = os.path.join(self.data_folder, "income.json")
-        self.categories_file = os.path.join(self.data_folder, "categories.json")
-
-        self.expenses = []
-        self.income = []
+        self.base_dir = os.path.dirname(__file__)  # Base directory for saving files
+        self.config = config
+
+        # Records, categories, storage and analyses live in the GUI-free core;
+        # this class only drives the widgets. The engine is imported and the
+        # data loaded on a background thread while the window comes up.
+        self.engine = None
+        self.store = None
+        self.expenses = None
+        self.income = None
         self.categories = {
             "income": [],
             "expense": [],
@@ -41,20 +71,55 @@ class FinanceTracker:
                 "expense": []
             }
         }
+        self.record_views = {}
 
-        self.load_data()
+        # Seconds from module import to the first window and to loaded data
+        self.startup_report = {}
+
+        # Analyses and exports run on worker threads; results come back
+        # through poll_jobs on the main loop
+        self.jobs = JobScheduler()
+        self.polling_jobs = False
 
         self.create_widgets()
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.master.after_idle(self.mark_window_shown)
 
-        self.base_dir = os.path.dirname(__file__)  # Base directory for saving files
+        self.load_data()
 
     def create_widgets(self):
+        # Shared by the record views, the analyses and the budget
+        self.include_projected_var = tk.BooleanVar(value=False)
+
+        # Menu bar; importing needs the data, so it is enabled once loaded
+        menu_bar = tk.Menu(self.master)
+        self.file_menu = tk.Menu(menu_bar, tearoff=0)
+        self.file_menu.add_command(label="Import Statement...", command=self.import_statement, state=tk.DISABLED)
+        menu_bar.add_cascade(label="File", menu=self.file_menu)
+        self.master.config(menu=menu_bar)
+
         # Main frame
         main_frame = ttk.Frame(self.master, padding="10")
         main_frame.pack(fill=tk.BOTH, expand=True)
 
+        # Loading indicator, removed once the data is in
+        self.loading_frame = ttk.Frame(main_frame)
+        self.loading_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        ttk.Label(self.loading_frame, text="Loading data...").pack(side=tk.LEFT, padx=5)
+        self.loading_bar = ttk.Progressbar(self.loading_frame, mode="indeterminate")
+        self.loading_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.loading_bar.start()
+
+        # Progress of background jobs, packed only while any are running
+        self.job_frame = ttk.Frame(main_frame)
+        self.job_label = ttk.Label(self.job_frame, text="")
+        self.job_label.pack(side=tk.LEFT, padx=5)
+        self.job_bar = ttk.Progressbar(self.job_frame, mode="determinate", maximum=1.0)
+        self.job_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
         # Tabs
-        tab_control = ttk.Notebook(main_frame)
+        self.tab_control = ttk.Notebook(main_frame)
+        tab_control = self.tab_control
         
         add_tab = ttk.Frame(tab_control)
         view_tab = ttk.Frame(tab_control)
@@ -71,14 +136,22 @@ class FinanceTracker:
         # Add Record Tab
         self.create_add_record_widgets(add_tab)
 
-        # View Records Tab
-        self.create_view_records_widgets(view_tab)
-
-        # Category Management Tab
-        self.create_category_management_widgets(category_tab)
+        # The other tabs are built the first time they are selected
+        self.tab_builders = {
+            str(view_tab): (view_tab, self.create_view_records_widgets),
+            str(category_tab): (category_tab, self.create_category_management_widgets),
+            str(analysis_tab): (analysis_tab, self.create_analysis_widgets)
+        }
+        tab_control.bind("<<NotebookTabChanged>>", self.on_tab_changed)
 
-        # Analysis Tab
-        self.create_analysis_widgets(analysis_tab)  # Add this line
+    def on_tab_changed(self, event=None):
+        # Tabs need the data, so a tab selected during loading is built after
+        if self.engine is None:
+            return
+        builder = self.tab_builders.pop(self.tab_control.select(), None)
+        if builder is not None:
+            frame, create = builder
+            create(frame)
 
     def create_add_record_widgets(self, parent):
         # Date selection
@@ -114,17 +187,21 @@ class FinanceTracker:
 
         # Recurring
         self.recurring_var = tk.BooleanVar()
-        ttk.Checkbutton(parent, text="Recurring", variable=self.recurring_var).grid(row=5, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+        ttk.Checkbutton(parent, text="Recurring", variable=self.recurring_var).grid(row=5, column=0, padx=5, pady=5, sticky="w")
+        self.frequency_var = tk.StringVar(value="monthly")
+        ttk.Combobox(parent, textvariable=self.frequency_var, values=FREQUENCIES, state="readonly", width=10).grid(row=5, column=1, padx=5, pady=5, sticky="w")
 
         # Add button
-        ttk.Button(parent, text="Add Record", command=self.add_record).grid(row=6, column=0, columnspan=3, padx=5, pady=10)
+        self.add_button = ttk.Button(parent, text="Add Record", command=self.add_record, state=tk.DISABLED)
+        self.add_button.grid(row=6, column=0, columnspan=3, padx=5, pady=10)
 
         # Add a label to display the remaining budget
         self.remaining_budget_label = ttk.Label(parent, text="Remaining Budget: N/A", foreground="white")
         self.remaining_budget_label.grid(row=7, column=0, columnspan=3, padx=5, pady=10)
 
         # Add button for updating remaining budget
-        ttk.Button(parent, text="Update Remaining Budget", command=self.update_remaining_budget).grid(row=8, column=0, columnspan=3, padx=5, pady=10)
+        self.budget_button = ttk.Button(parent, text="Update Remaining Budget", command=self.update_remaining_budget, state=tk.DISABLED)
+        self.budget_button.grid(row=8, column=0, columnspan=3, padx=5, pady=10)
 
     def create_view_records_widgets(self, parent):
         # Create a notebook for income and expense tabs
@@ -166,6 +243,20 @@ class FinanceTracker:
         # Add a button for showing records
         ttk.Button(date_frame, text="Show Records", command=lambda: self.show_records("Income", self.start_date_var, self.end_date_var)).pack(side=tk.LEFT, padx=5)
         ttk.Button(date_frame, text="Show Records", command=lambda: self.show_records("Expense", self.start_date_var, self.end_date_var)).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(date_frame, text="Include projected", variable=self.include_projected_var).pack(side=tk.LEFT, padx=5)
+
+        # Search box; matches descriptions and categories within the dates
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(padx=10, fill=tk.X)
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=40)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<KeyRelease>", self.schedule_search)
+        search_entry.bind("<Return>", lambda event: self.apply_search())
+        ttk.Button(search_frame, text="Clear", command=lambda: (self.search_var.set(""), self.apply_search())).pack(side=tk.LEFT, padx=5)
+        ttk.Label(search_frame, text='e.g. "fuel" or "car*" for words starting with car').pack(side=tk.LEFT, padx=5)
+        self.search_after = None
 
         # Add a button for downloading records
         ttk.Button(parent, text="Download Records", command=self.download_records).pack(pady=10)
@@ -183,18 +274,13 @@ class FinanceTracker:
         hsb = ttk.Scrollbar(tree_frame, orient="horizontal")
         hsb.pack(side=tk.BOTTOM, fill=tk.X)
 
-        # Treeview for displaying records
-        tree = ttk.Treeview(tree_frame, columns=("Date", "Amount", "Category", "Description", "Recurring"), show="headings", yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        tree.heading("Date", text="Date")
-        tree.heading("Amount", text="Amount")
-        tree.heading("Category", text="Category")
-        tree.heading("Description", text="Description")
-        tree.heading("Recurring", text="Recurring")
+        # Treeview for displaying records; only the visible page is inserted
+        tree = ttk.Treeview(tree_frame, columns=("Date", "Amount", "Category", "Description", "Recurring"), show="headings", xscrollcommand=hsb.set)
         tree.pack(fill=tk.BOTH, expand=True)
 
-        # Configure the scrollbars
-        vsb.config(command=tree.yview)
+        # Configure the scrollbars; the vertical one scrolls the virtual list
         hsb.config(command=tree.xview)
+        self.record_views[tree] = VirtualRecordView(tree, vsb)
 
         # Store the treeview in a dictionary for later access
         if record_type == "Expense":
@@ -205,7 +291,6 @@ class FinanceTracker:
     def show_records(self, record_type, start_date_var, end_date_var):
         start_date = start_date_var.get()
         end_date = end_date_var.get()
-        print(f"Start Date: {start_date}, End Date: {end_date}, Record Type: {record_type}")  # Debug print
 
         if not start_date or not end_date:
             messagebox.showerror("Error", "Please select both start and end dates.")
@@ -214,6 +299,18 @@ class FinanceTracker:
         tree = self.expense_tree if record_type == "Expense" else self.income_tree
         self.populate_treeview(tree, record_type, start_date, end_date)
 
+    def schedule_search(self, event=None):
+        # Search once typing pauses rather than on every key
+        if self.search_after is not None:
+            self.master.after_cancel(self.search_after)
+        self.search_after = self.master.after(SEARCH_DELAY_MS, self.apply_search)
+
+    def apply_search(self):
+        self.search_after = None
+        for record_type, tree in (("Income", self.income_tree), ("Expense", self.expense_tree)):
+            if self.record_views[tree].view is not None:
+                self.populate_treeview(tree, record_type, self.start_date_var.get(), self.end_date_var.get())
+
     def populate_treeview(self, tree, record_type, start_date, end_date):
         # Convert start_date and end_date to datetime objects
         try:
@@ -223,41 +320,14 @@ class FinanceTracker:
             messagebox.showerror("Error", f"Invalid date format: {e}")
             return
 
-        # Clear existing items
-        for item in tree.get_children():
-            tree.delete(item)
-
-        # Check if records are loaded
-        records = self.expenses if record_type == "Expense" else self.income
-        print(f"Total {record_type} records: {len(records)}")  # Debug print
-
-        # Filter records for the specified date range
-        filtered_records = [
-            record for record in records
-            if start_date <= datetime.strptime(record["date"], "%Y-%m-%d").date() <= end_date
-        ]
-
-        print(f"Filtered Records for {record_type}: {len(filtered_records)}")  # Debug print
-
-        # Sort records by date in reverse chronological order
-        sorted_records = sorted(filtered_records, key=lambda x: datetime.strptime(x["date"], "%Y-%m-%d"), reverse=True)
-
-        # Add records to treeview
-        for index, record in enumerate(sorted_records):
-            try:
-                tree.insert("", tk.END, values=(
-                    record["date"],
-                    record["amount"],
-                    record["category"],
-                    record["description"],
-                    "Yes" if record["recurring"] else "No"
-                ))
-            except KeyError as e:
-                print(f"Error in {record_type} record {index}: Missing key {e}")
-                print(f"Problematic record: {record}")
-                messagebox.showwarning("Data Error", f"Some {record_type.lower()} records are missing required fields. Check the console for details.")
+        # Filter records for the specified date range and search; rows are
+        # fetched from the view only as they scroll into sight
+        view = self.engine.view(record_type, start_date, end_date, self.include_projected_var.get(), self.search_var.get())
+        self.record_views[tree].set_view(view)
 
     def open_calendar_for_date(self, date_var):
+        from tkcalendar import Calendar
+
         top = tk.Toplevel(self.master)
         cal = Calendar(top, selectmode='day', date_pattern='yyyy-mm-dd')
         cal.pack(padx=10, pady=10)
@@ -302,36 +372,39 @@ class FinanceTracker:
             listbox.insert(tk.END, category)
 
     def populate_spending_limits(self):
+        from finance_core.budget import limit_of
+
         self.spending_limit_listbox.delete(0, tk.END)
-        for category, limit in self.categories["spending_limits"].items():
-            self.spending_limit_listbox.insert(tk.END, f"{category}: ${limit}")
+        for category, entry in self.categories["spending_limits"].items():
+            limit, period = limit_of(entry)
+            self.spending_limit_listbox.insert(tk.END, f"{category}: ${limit} {PERIOD_LABELS[period]}")
 
     def add_category(self, category_type):
         new_category = simpledialog.askstring("Add Category", f"Enter new {category_type} category:")
         if new_category:
-            self.categories[category_type].append(new_category)
+            self.engine.add_category(category_type, new_category)
             if category_type == "income":
                 self.populate_category_listbox(self.income_listbox, self.categories["income"])
             else:
                 self.populate_category_listbox(self.expense_listbox, self.categories["expense"])
-            self.save_categories()
+            self.update_categories()
 
     def delete_category(self, category_type):
         if category_type == "income":
             selected = self.income_listbox.curselection()
             if selected:
-                index = selected[0]
-                del self.categories["income"][index]
+                self.engine.delete_category("income", selected[0])
                 self.populate_category_listbox(self.income_listbox, self.categories["income"])
         else:
             selected = self.expense_listbox.curselection()
             if selected:
-                index = selected[0]
-                del self.categories["expense"][index]
+                self.engine.delete_category("expense", selected[0])
                 self.populate_category_listbox(self.expense_listbox, self.categories["expense"])
-        self.save_categories()
+        self.update_categories()
 
     def set_spending_limit(self):
+        from finance_core.budget import PERIODS
+
         # Create a new window for setting the spending limit
         limit_window = tk.Toplevel(self.master)
         limit_window.title("Set Spending Limit")
@@ -348,10 +421,15 @@ class FinanceTracker:
         limit_entry = ttk.Entry(limit_window)
         limit_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w")
 
+        # Period the limit applies to
+        ttk.Label(limit_window, text="Per:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        period_var = tk.StringVar(value="monthly")
+        ttk.Combobox(limit_window, textvariable=period_var, values=PERIODS, state="readonly").grid(row=2, column=1, padx=5, pady=5, sticky="w")
+
         # Button to set the limit
-        ttk.Button(limit_window, text="Set Limit", command=lambda: self.save_spending_limit(category_var, limit_entry, limit_window)).grid(row=2, column=0, columnspan=2, padx=5, pady=10)
+        ttk.Button(limit_window, text="Set Limit", command=lambda: self.save_spending_limit(category_var, limit_entry, limit_window, period_var)).grid(row=3, column=0, columnspan=2, padx=5, pady=10)
 
-    def save_spending_limit(self, category_var, limit_entry, limit_window):
+    def save_spending_limit(self, category_var, limit_entry, limit_window, period_var):
         category = category_var.get()
         try:
             limit = float(limit_entry.get())
@@ -360,10 +438,11 @@ class FinanceTracker:
             return
 
         if category and limit is not None:
-            self.categories["spending_limits"][category] = limit
+            period = period_var.get()
+            self.engine.set_spending_limit(category, limit, period)
             self.populate_spending_limits()
-            self.save_categories()
-            messagebox.showinfo("Success", f"Spending limit for {category} set to ${limit:.2f}.")
+            self.update_remaining_budget()
+            messagebox.showinfo("Success", f"Spending limit for {category} set to ${limit:.2f} {PERIOD_LABELS[period]}.")
             limit_window.destroy()
 
     def delete_spending_limit(self):
@@ -376,14 +455,13 @@ class FinanceTracker:
         category = self.spending_limit_listbox.get(index).split(":")[0].strip()
 
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete the spending limit for {category}?"):
-            del self.categories["spending_limits"][category]
+            self.engine.delete_spending_limit(category)
             self.populate_spending_limits()
-            self.save_categories()
+            self.update_remaining_budget()
             messagebox.showinfo("Success", f"Spending limit for {category} deleted successfully.")
 
     def save_categories(self):
-        with open(self.categories_file, "w") as file:
-            json.dump(self.categories, file)
+        self.engine.save_categories()
         self.update_categories()
 
     def update_categories(self, *args):
@@ -395,7 +473,6 @@ class FinanceTracker:
 
     def add_record(self):
         date = self.date_var.get()
-        date = datetime.strptime(date, "%d/%m/%Y").strftime("%Y-%m-%d")
         amount = self.amount_entry.get()
         record_type = self.type_var.get()
         category = self.category_var.get()
@@ -412,24 +489,16 @@ class FinanceTracker:
             messagebox.showerror("Error", "Amount must be a number.")
             return
 
-        record = {
-            "amount": amount,
-            "category": category,
-            "date": date,
-            "description": description,
-            "recurring": recurring
-        }
-
-        if record_type == "Expense":
-            self.expenses.append(record)
-        else:
-            self.income.append(record)
-
-        if recurring:
-            self.categories["recurring"][record_type.lower()].append(record)
-
-        self.save_data()
-        self.populate_treeview(self.tree, self.type_var.get(), self.start_date_var.get(), self.end_date_var.get())
+        try:
+            self.engine.add_record(record_type, date, amount, category, description, recurring, self.frequency_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid date format: {e}")
+            return
+        self.update_remaining_budget()
+        # The record views only exist once their tab has been opened
+        tree = getattr(self, "expense_tree" if record_type == "Expense" else "income_tree", None)
+        if tree is not None:
+            self.populate_treeview(tree, record_type, self.start_date_var.get(), self.end_date_var.get())
         messagebox.showinfo("Success", "Record added successfully!")
 
         # Clear entries
@@ -445,16 +514,13 @@ class FinanceTracker:
             messagebox.showerror("Error", "Please select a record to edit.")
             return
 
-        item = tree.item(selected_item)
-        records = self.expenses if record_type == "Expense" else self.income
-
-        for index, record in enumerate(records):
-            if (record["date"] == item['values'][0] and
-                record["amount"] == float(item['values'][1]) and
-                record["category"] == item['values'][2] and
-                record["description"] == item['values'][3]):
-                break
-        else:
+        # Rows are inserted with the record id as their item id
+        if not selected_item[0].isdigit():
+            messagebox.showerror("Error", "Projected occurrences can't be edited; edit the recurring record instead.")
+            return
+        record_id = int(selected_item[0])
+        record = self.engine.get_record(record_type, record_id)
+        if record is None:
             messagebox.showerror("Error", "Record not found.")
             return
 
@@ -494,10 +560,12 @@ class FinanceTracker:
 
         # Save button
         ttk.Button(edit_window, text="Save Changes", command=lambda: self.save_edited_record(
-            records, index, date_var, amount_entry, record_type, category_var, description_entry, recurring_var, edit_window, tree
+            record_id, date_var, amount_entry, record_type, category_var, description_entry, recurring_var, edit_window, tree
         )).grid(row=5, column=0, columnspan=3, padx=5, pady=10)
 
     def open_calendar_for_edit(self, date_var):
+        from tkcalendar import Calendar
+
         top = tk.Toplevel(self.master)
         cal = Calendar(top, selectmode='day', date_pattern='dd/mm/yyyy')
         cal.pack(padx=10, pady=10)
@@ -507,7 +575,7 @@ class FinanceTracker:
         date_var.set(cal.get_date())
         top.destroy()
 
-    def save_edited_record(self, records, index, date_var, amount_entry, record_type, category_var, description_entry, recurring_var, edit_window, tree):
+    def save_edited_record(self, record_id, date_var, amount_entry, record_type, category_var, description_entry, recurring_var, edit_window, tree):
         try:
             amount = float(amount_entry.get())
         except ValueError:
@@ -522,19 +590,14 @@ class FinanceTracker:
             "recurring": recurring_var.get()
         }
 
-        old_record = records[index]
-        records[index] = new_record
-
-        # Update recurring records if necessary
-        if old_record["recurring"] and not new_record["recurring"]:
-            self.categories["recurring"][record_type.lower()].remove(old_record)
-        elif not old_record["recurring"] and new_record["recurring"]:
-            self.categories["recurring"][record_type.lower()].append(new_record)
-        elif old_record["recurring"] and new_record["recurring"]:
-            recurring_index = self.categories["recurring"][record_type.lower()].index(old_record)
-            self.categories["recurring"][record_type.lower()][recurring_index] = new_record
+        # Recurring copies are updated along with the record
+        try:
+            self.engine.edit_record(record_type, record_id, new_record)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid date format: {e}")
+            return
+        self.update_remaining_budget()
 
-        self.save_data()
         self.populate_treeview(tree, record_type, self.start_date_var.get(), self.end_date_var.get())
         messagebox.showinfo("Success", "Record updated successfully!")
         edit_window.destroy()
@@ -545,77 +608,126 @@ class FinanceTracker:
             messagebox.showerror("Error", "Please select a record to delete.")
             return
 
+        if not selected_item[0].isdigit():
+            messagebox.showerror("Error", "Projected occurrences can't be deleted; delete the recurring record instead.")
+            return
+
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this record?"):
-            item = tree.item(selected_item)
-            records = self.expenses if record_type == "Expense" else self.income
-
-            for index, record in enumerate(records):
-                if (record["date"] == item['values'][0] and
-                    record["amount"] == float(item['values'][1]) and
-                    record["category"] == item['values'][2] and
-                    record["description"] == item['values'][3]):
-                    del records[index]
-                    if record["recurring"]:
-                        self.categories["recurring"][record_type.lower()].remove(record)
-                    break
-            else:
+            record_id = int(selected_item[0])
+            if self.engine.get_record(record_type, record_id) is None:
                 messagebox.showerror("Error", "Record not found.")
                 return
 
-            self.save_data()
+            self.engine.delete_record(record_type, record_id)
+            self.update_remaining_budget()
             self.populate_treeview(tree, record_type, self.start_date_var.get(), self.end_date_var.get())  # Ensure the treeview is updated
             messagebox.showinfo("Success", "Record deleted successfully!")
 
     def load_data(self):
-        def load_file(file_path):
+        # Import the engine and load the data off the main loop; Tk is only
+        # touched again from on_data_loaded, on the main thread
+        result = {}
+
+        def load():
             try:
-                with open(file_path, "r") as file:
-                    data = file.read()
-                    # Remove any trailing commas
-                    data = re.sub(r',\s*}', '}', data)
-                    data = re.sub(r',\s*]', ']', data)
-                    # Replace single quotes with double quotes
-                    data = data.replace("'", '"')
-                    # Parse the data
-                    parsed_data = json.loads(data, cls=CustomJSONDecoder)
-                    # Normalize keys to lowercase for dictionaries in lists
-                    if isinstance(parsed_data, list):
-                        return [{k.lower(): v for k, v in item.items()} for item in parsed_data]
-                    return parsed_data
-            except FileNotFoundError:
-                messagebox.showerror("Error", f"{file_path} not found in the finance_data folder.")
-            except json.JSONDecodeError as e:
-                messagebox.showerror("Error", f"Invalid JSON in {file_path}: {str(e)}")
+                from finance_core.config import load_config
+                config = self.config or load_config(self.data_folder)
+                if config.get("server"):
+                    # Client of a ledger server that other apps share
+                    from finance_core.client import RemoteEngine
+                    engine = RemoteEngine(config["server"])
+                else:
+                    from finance_core.engine import FinanceEngine
+                    engine = FinanceEngine(self.data_folder, config)
+                result["errors"] = engine.load()
+                result["engine"] = engine
             except Exception as e:
-                messagebox.showerror("Error", f"Error loading {file_path}: {str(e)}")
-            return None
+                result["errors"] = [f"Error loading data: {str(e)}"]
 
-        self.expenses = load_file(self.expenses_file) or []
-        self.income = load_file(self.income_file) or []
-        self.categories = load_file(self.categories_file) or {
-            "income": [],
-            "expense": [],
-            "spending_limits": {},
-            "recurring": {
-                "income": [],
-                "expense": []
-            }
-        }
+        self.loading_thread = threading.Thread(target=load, name="load-data", daemon=True)
+        self.loading_thread.start()
+        self.master.after(LOAD_POLL_MS, self.on_data_loaded, result)
 
-        if not all([self.expenses, self.income, self.categories]):
-            messagebox.showwarning("Data Loading Issue", "Some data couldn't be loaded. The application might not work as expected.")
+    def on_data_loaded(self, result):
+        if self.loading_thread.is_alive():
+            self.master.after(LOAD_POLL_MS, self.on_data_loaded, result)
+            return
+
+        self.loading_bar.stop()
+        self.loading_frame.destroy()
+        self.startup_report["data"] = time.perf_counter() - STARTED
+        metrics.observe("startup.data", self.startup_report["data"])
+        log.info("Startup: data loaded after %.0f ms", self.startup_report["data"] * 1000)
+
+        for error in result["errors"]:
+            messagebox.showerror("Error", error)
+        if "engine" not in result:
+            return
+
+        self.engine = result["engine"]
+        self.store = self.engine.store
+        self.expenses = self.engine.expenses
+        self.income = self.engine.income
+        self.categories = self.engine.categories
+
+        if self.store is not None:
+            for file_name, (mode, seconds) in self.store.load_report.items():
+                log.info("Loaded %s via %s path in %.1f ms", file_name, mode, seconds * 1000)
 
-    def save_data(self):
-        with open(self.expenses_file, "w") as file:
-            json.dump(self.expenses, file, indent=2)
+        if self.store is not None and not all([self.expenses, self.income, self.categories]):
+            messagebox.showwarning("Data Loading Issue", "Some data couldn't be loaded. The application might not work as expected.")
 
-        with open(self.income_file, "w") as file:
-            json.dump(self.income, file, indent=2)
+        self.update_categories()
+        self.add_button.config(state=tk.NORMAL)
+        self.budget_button.config(state=tk.NORMAL)
+        self.engine.budget_listeners.append(self.show_budget_alerts)
+        self.update_remaining_budget()
+        self.file_menu.entryconfig("Import Statement...", state=tk.NORMAL)
+        self.on_tab_changed()
+
+    def mark_window_shown(self):
+        self.startup_report["window"] = time.perf_counter() - STARTED
+        metrics.observe("startup.window", self.startup_report["window"])
+        log.info("Startup: first window after %.0f ms", self.startup_report["window"] * 1000)
+
+    def save_data(self, background=True):
+        self.engine.save(background=background)
+
+    def run_job(self, key, function, on_done, message="Working..."):
+        # Run function(job) on a worker; a newer job with the same key
+        # replaces a pending one, and on_done runs on the main loop
+        def on_progress(fraction, text):
+            self.job_bar["value"] = fraction
+            self.job_label.config(text=text or message)
+
+        def on_error(e):
+            messagebox.showerror("Error", f"An error occurred: {e}")
+
+        self.jobs.submit(key, function, on_done=on_done, on_error=on_error, on_progress=on_progress)
+        self.job_label.config(text=message)
+        self.job_bar["value"] = 0
+        self.job_frame.pack(side=tk.BOTTOM, fill=tk.X, before=self.tab_control)
+        if not self.polling_jobs:
+            self.polling_jobs = True
+            self.master.after(JOB_POLL_MS, self.poll_jobs)
+
+    def poll_jobs(self):
+        self.jobs.poll()
+        if self.jobs.pending():
+            self.master.after(JOB_POLL_MS, self.poll_jobs)
+        else:
+            self.polling_jobs = False
+            self.job_frame.pack_forget()
 
-        with open(self.categories_file, "w") as file:
-            json.dump(self.categories, file, indent=2)
+    def on_close(self):
+        self.jobs.shutdown()
+        if self.engine is not None:
+            self.engine.close()
+        self.master.destroy()
 
     def open_calendar(self):
+        from tkcalendar import Calendar
+
         top = tk.Toplevel(self.master)
         cal = Calendar(top, selectmode='day', date_pattern='dd/mm/yyyy')
         cal.pack(padx=10, pady=10)
@@ -625,8 +737,6 @@ class FinanceTracker:
         self.date_var.set(cal.get_date())
         top.destroy()
 
-    from datetime import datetime, date
-
     def create_analysis_widgets(self, parent):
         # Frame for date range selection
         date_frame = ttk.Frame(parent)
@@ -654,7 +764,7 @@ class FinanceTracker:
         ttk.Label(parent, text="Select Analysis Type:").pack(pady=5)
         self.analysis_type_var = tk.StringVar()
         analysis_type_combobox = ttk.Combobox(parent, textvariable=self.analysis_type_var)
-        analysis_type_combobox['values'] = ("Categories Analysis", "Income vs Spending", "Monthly by Category")
+        analysis_type_combobox['values'] = ("Categories Analysis", "Income vs Spending", "Monthly by Category", "Cash-flow Forecast")
         analysis_type_combobox.pack(pady=5)
 
         # Chart Type
@@ -664,16 +774,45 @@ class FinanceTracker:
         chart_type_combobox['values'] = ("Pie Chart", "Bar Chart", "Line Graph", "Area Chart")  # Removed "Scatter Plot"
         chart_type_combobox.pack(pady=5)
 
+        # Granularity; changing it redraws the last chart from the rollup
+        from finance_core.cube import GRANULARITIES
+        ttk.Label(parent, text="Granularity:").pack(pady=5)
+        self.granularity_var = tk.StringVar(value="month")
+        granularity_combobox = ttk.Combobox(parent, textvariable=self.granularity_var, state="readonly")
+        granularity_combobox['values'] = GRANULARITIES
+        granularity_combobox.pack(pady=5)
+        granularity_combobox.bind("<<ComboboxSelected>>", self.on_granularity_changed)
+        self.redraw_analysis = None
+
+        # Months projected by the cash-flow forecast, after the current one
+        ttk.Label(parent, text="Forecast Months:").pack(pady=5)
+        self.forecast_months_var = tk.IntVar(value=12)
+        ttk.Spinbox(parent, from_=3, to=24, textvariable=self.forecast_months_var, width=5).pack(pady=5)
+
         # Button to perform analysis
         ttk.Button(parent, text="Perform Analysis", command=self.perform_analysis).pack(pady=10)
 
+        # Charts are drawn here, into one figure created on first use
+        self.chart_frame = ttk.Frame(parent)
+        self.chart_frame.pack(fill=tk.BOTH, expand=True)
+        self.chart_panel = None
+
+    def on_granularity_changed(self, event=None):
+        if self.redraw_analysis is not None:
+            self.redraw_analysis()
+
+    def get_chart_panel(self):
+        if self.chart_panel is None:
+            self.chart_panel = ChartPanel(self.chart_frame)
+        return self.chart_panel
+
     def perform_analysis(self):
         start_date = self.analysis_start_date_var.get()
         end_date = self.analysis_end_date_var.get()
         analysis_type = self.analysis_type_var.get()
         chart_type = self.chart_type_var.get()
 
-        print(f"Performing analysis from {start_date} to {end_date} with type {analysis_type} and chart {chart_type}")
+        log.debug("Performing analysis from %s to %s with type %s and chart %s", start_date, end_date, analysis_type, chart_type)
 
         if not start_date or not end_date:
             messagebox.showerror("Error", "Please select both start and end dates.")
@@ -693,6 +832,12 @@ class FinanceTracker:
                 self.visualize_monthly_by_category(start_date, end_date, chart_type, record_type="Expense")
             elif analysis_choice == "3":
                 self.visualize_monthly_by_category(start_date, end_date, chart_type, record_type="Both")
+        elif analysis_type == "Cash-flow Forecast":
+            # Looks ahead from today, so the date range does not apply
+            if not chart_type:
+                messagebox.showerror("Error", "Please select a chart type for the selected analysis.")
+                return
+            self.visualize_forecast(chart_type)
         else:
             if analysis_type in ["Income vs Spending"] and not chart_type:
                 messagebox.showerror("Error", "Please select a chart type for the selected analysis.")
@@ -720,113 +865,104 @@ class FinanceTracker:
         if isinstance(end_date, str):
             end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
 
-        # Initialize dictionaries to hold totals
-        spending_totals = {}
-        income_totals = {}
-
-        # Aggregate spending and income by category
-        for record in self.expenses:
-            record_date = datetime.strptime(record["date"], "%Y-%m-%d").date()
-            if start_date <= record_date <= end_date:
-                category = record["category"]
-                spending_totals[category] = spending_totals.get(category, 0) + record["amount"]
-
-        for record in self.income:
-            record_date = datetime.strptime(record["date"], "%Y-%m-%d").date()
-            if start_date <= record_date <= end_date:
-                category = record["category"]
-                income_totals[category] = income_totals.get(category, 0) + record["amount"]
+        # Aggregate spending and income by category on a worker, from a
+        # snapshot so edits made meanwhile don't race with it
+        engine = self.engine.snapshot()
+        include_projected = self.include_projected_var.get()
+        self.run_job("analysis", lambda job: engine.analyze_categories(start_date, end_date, include_projected),
+                     on_done=self.show_category_analysis, message="Analysing categories...")
 
+    def show_category_analysis(self, result):
         # Find categories with highest and lowest spending/income
-        highest_spending = max(spending_totals, key=spending_totals.get, default=None)
-        lowest_spending = min(spending_totals, key=spending_totals.get, default=None)
-        highest_income = max(income_totals, key=income_totals.get, default=None)
-        lowest_income = min(income_totals, key=income_totals.get, default=None)
+        highest_spending, highest_spending_total = result["expense"]["highest"]
+        lowest_spending, lowest_spending_total = result["expense"]["lowest"]
+        highest_income, highest_income_total = result["income"]["highest"]
+        lowest_income, lowest_income_total = result["income"]["lowest"]
 
         # Prepare result text
         result_text = (
-            f"Highest Spending Category: {highest_spending} with ${spending_totals.get(highest_spending, 0):.2f}\n"
-            f"Lowest Spending Category: {lowest_spending} with ${spending_totals.get(lowest_spending, 0):.2f}\n"
-            f"Highest Income Category: {highest_income} with ${income_totals.get(highest_income, 0):.2f}\n"
-            f"Lowest Income Category: {lowest_income} with ${income_totals.get(lowest_income, 0):.2f}"
+            f"Highest Spending Category: {highest_spending} with ${highest_spending_total:.2f}\n"
+            f"Lowest Spending Category: {lowest_spending} with ${lowest_spending_total:.2f}\n"
+            f"Highest Income Category: {highest_income} with ${highest_income_total:.2f}\n"
+            f"Lowest Income Category: {lowest_income} with ${lowest_income_total:.2f}"
         )
 
         # Display results in the analysis type selection widget
         messagebox.showinfo("Analysis Results", result_text)  # Show results in a message box
         
     def visualize_income_vs_spending(self, start_date, end_date, chart_type):
-        # Filter data based on the date range
-        filtered_income = [record for record in self.income if start_date <= datetime.strptime(record["date"], "%Y-%m-%d").date() <= end_date]
-        filtered_spending = [record for record in self.expenses if start_date <= datetime.strptime(record["date"], "%Y-%m-%d").date() <= end_date]
-
-        # Aggregate data by month
-        income_totals = {}
-        spending_totals = {}
-
-        for record in filtered_income:
-            month = datetime.strptime(record["date"], "%Y-%m-%d").strftime("%Y-%m")
-            income_totals[month] = income_totals.get(month, 0) + record["amount"]
-
-        for record in filtered_spending:
-            month = datetime.strptime(record["date"], "%Y-%m-%d").strftime("%Y-%m")
-            spending_totals[month] = spending_totals.get(month, 0) + record["amount"]
-
-        # Sort months
-        months = sorted(set(income_totals.keys()).union(spending_totals.keys()))
+        engine = self.engine.snapshot()
+        include_projected = self.include_projected_var.get()
+        granularity = self.granularity_var.get()
+
+        def totals(job):
+            # Aggregate data by period within the date range
+            income_totals = engine.totals_by_period("income", granularity, start_date, end_date, include_projected)
+            job.progress(0.5, "Totalling spending...")
+            spending_totals = engine.totals_by_period("expense", granularity, start_date, end_date, include_projected)
+            return ({period: sum(totals.values()) for period, totals in income_totals.items()},
+                    {period: sum(totals.values()) for period, totals in spending_totals.items()})
+
+        self.redraw_analysis = lambda: self.visualize_income_vs_spending(start_date, end_date, chart_type)
+        self.run_job("analysis", totals, message="Totalling income...",
+                     on_done=lambda result: self.draw_income_vs_spending(*result, chart_type, granularity))
+
+    def draw_income_vs_spending(self, income_totals, spending_totals, chart_type, granularity="month"):
+        # Sort periods
+        periods = sorted(set(income_totals.keys()).union(spending_totals.keys()))
 
         # Prepare data for plotting
-        income_values = [income_totals.get(month, 0) for month in months]
-        spending_values = [spending_totals.get(month, 0) for month in months]
-
-        # Create a new Toplevel window for the graph
-        graph_window = tk.Toplevel(self.master)
-        graph_window.title("Income vs Spending Graph")
-
-        # Create a new figure
-        fig = Figure(figsize=(6, 4), dpi=100)
-        ax = fig.add_subplot(111)
-
-        # Plot data based on the selected chart type
-        if chart_type == "Bar Chart":
-            x = np.arange(len(months))  # the label locations
-            width = 0.35  # the width of the bars
-
-            ax.bar(x - width/2, income_values, width, label='Income', color='green')
-            ax.bar(x + width/2, spending_values, width, label='Spending', color='red')
-
-            ax.set_xticks(x)
-            ax.set_xticklabels(months)
-
-        elif chart_type == "Line Graph":
-            ax.plot(months, income_values, label='Income', color='green')
-            ax.plot(months, spending_values, label='Spending', color='red')
-        elif chart_type == "Area Chart":
-            ax.fill_between(months, income_values, label='Income', color='green', alpha=0.5)
-            ax.fill_between(months, spending_values, label='Spending', color='red', alpha=0.5)
-        elif chart_type == "Pie Chart":
-            # Pie chart needs a single set of values, so we sum across months
-            total_income = sum(income_values)
-            total_spending = sum(spending_values)
-            ax.pie([total_income, total_spending], labels=['Income', 'Spending'], autopct='%1.1f%%', colors=['green', 'red'])
-            ax.set_title('Income vs Spending')
-            # No need for further configuration for pie chart
-            canvas = FigureCanvasTkAgg(fig, master=graph_window)
-            canvas.draw()
-            canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-            return  # Exit early for pie chart
-
-        ax.set_title('Income vs Spending')
-        ax.set_xlabel('Month')
-        ax.set_ylabel('Amount')
-        ax.legend()
-
-        # Display the figure in the new window
-        canvas = FigureCanvasTkAgg(fig, master=graph_window)
-        canvas.draw()
-        canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-
-        # Debugging: Confirm the canvas is packed
-        print("Graph displayed in the pop-up window.")
+        income_values = [income_totals.get(period, 0) for period in periods]
+        spending_values = [spending_totals.get(period, 0) for period in periods]
+
+        # Plot data based on the selected chart type, in the Analysis tab's
+        # chart panel
+        panel = self.get_chart_panel()
+        series = [("Income", income_values, "green"), ("Spending", spending_values, "red")]
+        with span("render", "income vs spending"):
+            if chart_type == "Bar Chart":
+                panel.show_bars("Income vs Spending", period_dates(periods, granularity), series)
+            elif chart_type == "Line Graph":
+                panel.show_lines("Income vs Spending", period_dates(periods, granularity), series)
+            elif chart_type == "Area Chart":
+                panel.show_lines("Income vs Spending", period_dates(periods, granularity), series, area=True)
+            elif chart_type == "Pie Chart":
+                # Pie chart needs a single set of values, so we sum across periods
+                panel.show_pie("Income vs Spending", [sum(income_values), sum(spending_values)],
+                               ["Income", "Spending"], ["green", "red"])
+
+    def visualize_forecast(self, chart_type):
+        try:
+            months = int(self.forecast_months_var.get())
+        except (tk.TclError, ValueError):
+            messagebox.showerror("Error", "Forecast months must be a whole number.")
+            return
+        engine = self.engine.snapshot()
+        # Always monthly, so a granularity change has nothing to redraw
+        self.redraw_analysis = None
+        self.run_job("analysis", lambda job: engine.forecast(months), message="Forecasting...",
+                     on_done=lambda result: self.draw_forecast(result, chart_type))
+
+    def draw_forecast(self, result, chart_type):
+        panel = self.get_chart_panel()
+        title = f"Cash-flow Forecast (balance now {result['opening_balance']:.2f})"
+        dates = period_dates(result["months"], "month")
+        flows = [("Income", result["income"], "green"), ("Spending", result["expense"], "red")]
+        with span("render", "forecast"):
+            if chart_type == "Bar Chart":
+                panel.show_bars(title, dates, flows)
+            elif chart_type == "Line Graph":
+                panel.show_lines(title, dates, flows + [("Balance", result["balance"], "blue")])
+            elif chart_type == "Area Chart":
+                panel.show_lines(title, dates, flows + [("Balance", result["balance"], "blue")], area=True)
+            elif chart_type == "Pie Chart":
+                # Forecast spending per category over the whole horizon
+                totals = {category: sum(values) for category, values in result["categories"]["expense"].items()}
+                totals = {category: total for category, total in totals.items() if total > 0}
+                if not totals:
+                    messagebox.showwarning("Warning", "No spending is forecast.")
+                    return
+                panel.show_pie("Forecast Spending by Category", list(totals.values()), list(totals))
 
     def visualize_monthly_by_category(self, start_date, end_date, chart_type, record_type="Both"):
         # Ensure start_date and end_date are datetime.date objects
@@ -835,33 +971,45 @@ class FinanceTracker:
         if isinstance(end_date, str):
             end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
 
-        # Aggregate data by month and category
-        months = sorted(set(
-            datetime.strptime(record["date"], "%Y-%m-%d").strftime("%Y-%m")
-            for record in self.expenses + self.income
-            if start_date <= datetime.strptime(record["date"], "%Y-%m-%d").date() <= end_date
-        ))
-        
-        monthly_data = {month: {} for month in months}
-        
-        if record_type in ["Income", "Both"]:
-            for record in self.income:
-                record_date = datetime.strptime(record["date"], "%Y-%m-%d").date()
-                if start_date <= record_date <= end_date:
-                    month = record_date.strftime("%Y-%m")
-                    category = record["category"]
-                    monthly_data[month][category] = monthly_data[month].get(category, 0) + record["amount"]
-
-        if record_type in ["Expense", "Both"]:
-            for record in self.expenses:
-                record_date = datetime.strptime(record["date"], "%Y-%m-%d").date()
-                if start_date <= record_date <= end_date:
-                    month = record_date.strftime("%Y-%m")
-                    category = record["category"]
-                    monthly_data[month][category] = monthly_data[month].get(category, 0) + record["amount"]
+        def refresh(show):
+            # Totals at the selected granularity, handed to show() when done
+            engine = self.engine.snapshot()
+            include_projected = self.include_projected_var.get()
+            granularity = self.granularity_var.get()
+
+            def totals(job):
+                # Aggregate data by period and category
+                income_data = engine.totals_by_period("income", granularity, start_date, end_date, include_projected)
+                job.progress(0.5, "Totalling expenses by category...")
+                expense_data = engine.totals_by_period("expense", granularity, start_date, end_date, include_projected)
+                return income_data, expense_data, granularity
+
+            self.run_job("analysis", totals, message="Totalling income by category...",
+                         on_done=lambda result: show(*result))
+
+        refresh(lambda income_data, expense_data, granularity: self.show_monthly_by_category(
+            income_data, expense_data, chart_type, record_type, granularity, refresh))
+
+    def show_monthly_by_category(self, income_data, expense_data, chart_type, record_type, granularity="month", refresh=None):
+        # Periods and per period category totals; replaced when the
+        # granularity changes while the window is open
+        state = {}
+
+        def collect(income_data, expense_data, granularity):
+            periods = sorted(set(income_data).union(expense_data))
+            period_data = {period: {} for period in periods}
+            for ledger_type, ledger_data in (("Income", income_data), ("Expense", expense_data)):
+                if record_type not in [ledger_type, "Both"]:
+                    continue
+                for period, totals in ledger_data.items():
+                    for category, amount in totals.items():
+                        period_data[period][category] = period_data[period].get(category, 0) + amount
+            state.update(periods=periods, data=period_data, granularity=granularity)
+
+        collect(income_data, expense_data, granularity)
 
         # Prepare data for plotting
-        all_categories = sorted(set(category for month in monthly_data.values() for category in month.keys()))
+        all_categories = sorted(set(category for period in state["data"].values() for category in period.keys()))
 
         # Create a new Toplevel window for category selection and graph
         selection_window = tk.Toplevel(self.master)
@@ -883,18 +1031,11 @@ class FinanceTracker:
             selected_indices = category_listbox.curselection()
             selected_categories = [category_listbox.get(i) for i in selected_indices]
 
-            # Create a new Toplevel window for the graph
-            graph_window = tk.Toplevel(selection_window)
-            graph_window.title("Monthly by Category Graph")
-
-            # Create a new figure
-            fig = Figure(figsize=(8, 6), dpi=100)
-            ax = fig.add_subplot(111)
-
             # Prepare data for the selected categories
+            periods, period_data = state["periods"], state["data"]
             values = []
             for category in selected_categories:
-                total = sum(monthly_data[month].get(category, 0) for month in months)
+                total = sum(period_data[period].get(category, 0) for period in periods)
                 values.append(total)
 
             # Check if there are values to plot
@@ -902,62 +1043,44 @@ class FinanceTracker:
                 messagebox.showwarning("Warning", "No data available for the selected categories.")
                 return
 
-            # Plot data based on the selected chart type
-            if chart_type == "Bar Chart":
-                x = np.arange(len(months))  # the label locations
-                width = 0.8 / len(selected_categories)  # the width of the bars
-
-                for i, category in enumerate(selected_categories):
-                    ax.bar(x + i * width, [monthly_data[month].get(category, 0) for month in months], width, label=category)
-                ax.set_xlabel('Month')
-                ax.set_ylabel('Amount')
-                
-            elif chart_type == "Line Graph":
-                for category in selected_categories:
-                    ax.plot(months, [monthly_data[month].get(category, 0) for month in months], label=category)
-                ax.set_xlabel('Month')
-                ax.set_ylabel('Amount')
-                
-            elif chart_type == "Area Chart":
-                for category in selected_categories:
-                    ax.fill_between(months, [monthly_data[month].get(category, 0) for month in months], label=category, alpha=0.5)
-                ax.set_xlabel('Month')
-                ax.set_ylabel('Amount')
-                
-            elif chart_type == "Pie Chart":
-                # Prepare data for pie chart
-                ax.pie(values, labels=selected_categories, autopct='%1.1f%%', startangle=90)
-                ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-
-            ax.set_title('Monthly by Category')
-            ax.legend()
-
-            # Display the figure in the new window
-            canvas = FigureCanvasTkAgg(fig, master=graph_window)
-            canvas.draw()
-            canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+            # Plot data based on the selected chart type, in the Analysis
+            # tab's chart panel
+            panel = self.get_chart_panel()
+            series = [(category, [period_data[period].get(category, 0) for period in periods], None)
+                      for category in selected_categories]
+            dates = period_dates(periods, state["granularity"])
+            with span("render", "monthly by category"):
+                if chart_type == "Bar Chart":
+                    panel.show_bars("Monthly by Category", dates, series)
+                elif chart_type == "Line Graph":
+                    panel.show_lines("Monthly by Category", dates, series)
+                elif chart_type == "Area Chart":
+                    panel.show_lines("Monthly by Category", dates, series, area=True)
+                elif chart_type == "Pie Chart":
+                    panel.show_pie("Monthly by Category", values, selected_categories)
 
         ttk.Button(selection_window, text="Show Graph", command=show_selected_graph).pack(pady=10)
 
-        # Debugging: Confirm the listbox and button are packed
-        print("Category selection window displayed.")
+        def redraw(income_data, expense_data, granularity):
+            if not selection_window.winfo_exists():
+                return
+            collect(income_data, expense_data, granularity)
+            if category_listbox.curselection():
+                show_selected_graph()
+
+        if refresh is not None:
+            self.redraw_analysis = lambda: refresh(redraw)
 
 
     def update_remaining_budget(self):
         budget_texts = []
 
-        for category, limit in self.categories["spending_limits"].items():
-            spent = sum(
-                record["amount"] for record in self.expenses
-                if record["category"] == category and
-                datetime.strptime(record["date"], "%Y-%m-%d").month == datetime.now().month
-            )
-            remaining = limit - spent
-
+        # Spending per category in each limit's current week, month or year
+        for category, spent, limit, remaining, period in self.engine.budget_status(include_projected=self.include_projected_var.get()):
             if remaining < 0:
-                budget_texts.append(f"{category}: {spent}/{limit} (Exceeded by {-remaining})")
+                budget_texts.append(f"{category}: {spent:.2f}/{limit:.2f} {PERIOD_LABELS[period]} (Exceeded by {-remaining:.2f})")
             else:
-                budget_texts.append(f"{category}: {spent}/{limit} ({remaining} remaining)")
+                budget_texts.append(f"{category}: {spent:.2f}/{limit:.2f} {PERIOD_LABELS[period]} ({remaining:.2f} remaining)")
 
         if not budget_texts:
             budget_texts.append("No spending limits set.")
@@ -965,10 +1088,24 @@ class FinanceTracker:
         # Update the label with the remaining budget information
         self.remaining_budget_label.config(text="\n".join(budget_texts))
 
+    def show_budget_alerts(self, alerts):
+        # Engine callback, run as soon as a change crosses 80% or 100% of a limit
+        self.update_remaining_budget()
+        lines = []
+        for alert in alerts:
+            if alert["threshold"] >= 1:
+                lines.append(f"{alert['category']}: ${alert['spent']:.2f} spent, over the ${alert['limit']:.2f} limit {PERIOD_LABELS[alert['period']]}.")
+            else:
+                lines.append(f"{alert['category']}: ${alert['spent']:.2f} spent, {alert['threshold']:.0%} of the ${alert['limit']:.2f} limit {PERIOD_LABELS[alert['period']]}.")
+        messagebox.showwarning("Budget Alert", "\n".join(lines))
+
     def download_records(self):
-        # Prompt user to select a format
-        format_options = ["CSV", "JSON", "XLSX"]
-        selected_format = simpledialog.askstring("Select Format", f"Choose format: {', '.join(format_options)}")
+        # Prompt user to select a format; XLSX and Parquet are offered when
+        # openpyxl / pyarrow are installed
+        from finance_core.export import available_formats
+
+        format_options = available_formats()
+        selected_format = (simpledialog.askstring("Select Format", f"Choose format: {', '.join(format_options)}") or "").strip().upper()
 
         if selected_format not in format_options:
             messagebox.showerror("Error", "Invalid format selected.")
@@ -989,79 +1126,391 @@ class FinanceTracker:
             messagebox.showerror("Error", f"Invalid date format: {e}")
             return
 
-        # Filter records based on the date range
-        filtered_income = [record for record in self.income if start_date <= datetime.strptime(record["date"], "%Y-%m-%d").date() <= end_date]
-        filtered_expenses = [record for record in self.expenses if start_date <= datetime.strptime(record["date"], "%Y-%m-%d").date() <= end_date]
+        output_folder = filedialog.askdirectory(title="Export records to", initialdir=self.base_dir)
+        if not output_folder:
+            return
 
-        # Debugging: Print filtered records
-        print(f"Filtered Income Records: {filtered_income}")
-        print(f"Filtered Expense Records: {filtered_expenses}")
+        # Stream the records to disk in the selected format on a worker
+        engine = self.engine.snapshot()
+        self.run_job("export", lambda job: engine.copy_records().export(output_folder, selected_format, start_date, end_date, job.progress),
+                     on_done=self.show_export_result, message=f"Exporting {selected_format}...")
+
+    def show_export_result(self, written):
+        for path in written:
+            log.info("Exported to: %s", path)
+        if written:
+            messagebox.showinfo("Success", f"Records exported to {', '.join(written)} successfully.")
+        else:
+            messagebox.showinfo("Export", "No records to export in this date range.")
+
+    def import_statement(self):
+        path = filedialog.askopenfilename(
+            title="Import bank statement",
+            initialdir=self.base_dir,
+            filetypes=[("Bank statements", "*.csv *.ofx *.qfx"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        if os.path.splitext(path)[1].lower() in (".ofx", ".qfx"):
+            self.start_import(path, None, {})
+            return
+
+        # CSV statements differ per bank: ask how to read the columns
+        mapping_window = tk.Toplevel(self.master)
+        mapping_window.title("Import Statement")
+        fields = [
+            ("Date column:", "date", "Date"),
+            ("Amount column:", "amount", "Amount"),
+            ("Description column:", "description", "Description"),
+            ("Category column (optional):", "category", ""),
+            ("Date format:", "date_format", "%d/%m/%Y"),
+            ("Delimiter:", "delimiter", ",")
+        ]
+        variables = {}
+        for row, (label, key, default) in enumerate(fields):
+            ttk.Label(mapping_window, text=label).grid(row=row, column=0, padx=5, pady=5, sticky="w")
+            variables[key] = tk.StringVar(value=default)
+            ttk.Entry(mapping_window, textvariable=variables[key]).grid(row=row, column=1, padx=5, pady=5)
+
+        ttk.Label(mapping_window, text="Import as:").grid(row=len(fields), column=0, padx=5, pady=5, sticky="w")
+        type_var = tk.StringVar(value="By sign")
+        ttk.Combobox(mapping_window, textvariable=type_var, values=("By sign", "Expense", "Income"),
+                     state="readonly").grid(row=len(fields), column=1, padx=5, pady=5)
+
+        def start():
+            mapping = {key: variables[key].get().strip() or None for key in ("date", "amount", "description", "category")}
+            options = {
+                "mapping": mapping,
+                "date_format": variables["date_format"].get() or "%Y-%m-%d",
+                "delimiter": variables["delimiter"].get() or ","
+            }
+            record_type = None if type_var.get() == "By sign" else type_var.get()
+            mapping_window.destroy()
+            self.start_import(path, record_type, options)
+
+        ttk.Button(mapping_window, text="Import", command=start).grid(row=len(fields) + 1, column=0, columnspan=2, pady=10)
+
+    def start_import(self, path, record_type, options):
+        # Parse on a worker; the records are added on the main loop in one
+        # journal operation, followed by a single save and refresh
+        from finance_core.importer import read_statement, split_by_type
+
+        self.run_job("import", lambda job: split_by_type(read_statement(path, **options), record_type),
+                     on_done=self.finish_import, message=f"Reading {os.path.basename(path)}...")
+
+    def finish_import(self, split):
+        counts = self.engine.import_columns(split)
+        self.update_remaining_budget()
+        for record_type, tree_name in (("Expense", "expense_tree"), ("Income", "income_tree")):
+            tree = getattr(self, tree_name, None)
+            if tree is not None and counts.get(record_type.lower()):
+                self.populate_treeview(tree, record_type, self.start_date_var.get(), self.end_date_var.get())
+        if hasattr(self, "income_listbox"):
+            self.populate_category_listbox(self.income_listbox, self.categories["income"])
+            self.populate_category_listbox(self.expense_listbox, self.categories["expense"])
+        self.update_categories()
+        messagebox.showinfo("Import", f"Imported {counts.get('expense', 0)} expense and {counts.get('income', 0)} income records.")
+
+class VirtualRecordView:
+    """Virtual list mode for a record Treeview.
+
+    The tree only ever holds the visible rows plus a small overscan. The
+    scrollbar moves an offset into the filtered result and the page is
+    refetched from the view, and heading clicks sort the view's underlying
+    data rather than the widget's items.
+    """
+
+    OVERSCAN = 5
+    COLUMNS = ("Date", "Amount", "Category", "Description", "Recurring")
+
+    def __init__(self, tree, scrollbar):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.view = None
+        self.offset = 0
+        self.visible_rows = int(tree.cget("height"))
+        self.sort_column = "Date"
+        self.sort_descending = True
+
+        scrollbar.config(command=self.yview)
+        tree.bind("<Configure>", self.on_resize)
+        tree.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1, "units"))
+        tree.bind("<Button-4>", lambda event: self.scroll(-1, "units"))
+        tree.bind("<Button-5>", lambda event: self.scroll(1, "units"))
+        tree.bind("<Up>", self.on_key)
+        tree.bind("<Down>", self.on_key)
+        tree.bind("<Prior>", lambda event: self.scroll(-1, "pages"))
+        tree.bind("<Next>", lambda event: self.scroll(1, "pages"))
+
+        for column in self.COLUMNS:
+            tree.heading(column, text=column, command=lambda column=column: self.sort(column))
+        self.update_headings()
+
+    def set_view(self, view):
+        self.view = view
+        self.offset = 0
+        self.view.sort(self.sort_column.lower(), self.sort_descending)
+        self.refresh()
+
+    def sort(self, column):
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = column == "Date"
+        self.update_headings()
+        if self.view is not None:
+            self.view.sort(column.lower(), self.sort_descending)
+            self.offset = 0
+            self.refresh()
+
+    def update_headings(self):
+        for column in self.COLUMNS:
+            marker = ""
+            if column == self.sort_column:
+                marker = " \u25bc" if self.sort_descending else " \u25b2"
+            self.tree.heading(column, text=column + marker)
+
+    def max_offset(self):
+        return max(0, len(self.view) - self.visible_rows)
+
+    def refresh(self):
+        self.tree.delete(*self.tree.get_children())
+        if self.view is None:
+            self.scrollbar.set(0, 1)
+            return
+
+        self.offset = min(self.offset, self.max_offset())
+        with span("render", "record page") as timing:
+            rows = self.view.rows(self.offset, self.offset + self.visible_rows + self.OVERSCAN)
+            for record in rows:
+                if record.get("projected"):
+                    # Not stored, so no record id to address it by
+                    self.tree.insert("", tk.END, values=(
+                        record["date"], record["amount"], record["category"], record["description"], "Projected"
+                    ))
+                    continue
+                self.tree.insert("", tk.END, iid=str(record["id"]), values=(
+                    record["date"],
+                    record["amount"],
+                    record["category"],
+                    record["description"],
+                    "Yes" if record["recurring"] else "No"
+                ))
+            timing.count("records_scanned", len(rows))
+
+        total = len(self.view)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_to(self, offset):
+        if self.view is None:
+            return
+        offset = max(0, min(int(offset), self.max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+
+    def scroll(self, amount, what):
+        step = self.visible_rows if what == "pages" else 1
+        self.scroll_to(self.offset + int(amount) * step)
+        return "break"
+
+    def yview(self, *args):
+        # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"|"pages")
+        if self.view is None:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * len(self.view))
+        elif args[0] == "scroll":
+            self.scroll(args[1], args[2])
+
+    def on_key(self, event):
+        # Keep keyboard navigation going past the edges of the page
+        children = self.tree.get_children()
+        selection = self.tree.selection()
+        if not children or not selection:
+            return None
+        row = children.index(selection[0])
+        if event.keysym == "Down" and row >= self.visible_rows - 1 and self.offset < self.max_offset():
+            self.scroll(1, "units")
+            target = min(row, len(self.tree.get_children()) - 1)
+        elif event.keysym == "Up" and row == 0 and self.offset > 0:
+            self.scroll(-1, "units")
+            target = 0
+        else:
+            return None
+        item = self.tree.get_children()[target]
+        self.tree.selection_set(item)
+        self.tree.focus(item)
+        return "break"
+
+    def on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        heading_height = row_height + 5
+        visible_rows = max(1, (event.height - heading_height) // row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            if self.view is not None:
+                self.refresh()
+
+
+class ChartPanel:
+    """One matplotlib figure embedded in the Analysis tab, reused by every
+    analysis.
+
+    Line series keep their artists between analyses and only get new data;
+    when the axes limits stay the same the lines are blitted over a cached
+    background instead of redrawing the figure. Series are stored at full
+    resolution and drawn downsampled (LTTB) to the axes' pixel width,
+    re-sampled for the visible range whenever the toolbar zooms or pans.
+    """
+
+    def __init__(self, parent):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=(6, 3), dpi=100)
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=parent)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, parent, pack_toolbar=False)
+        self.toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+        # Full-resolution (x, y) per line label, and the animated line artists
+        self.series = {}
+        self.lines = {}
+        self.kind = None
+        self.background = None
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, event):
+        # A full draw leaves out the animated lines: keep that as the blit
+        # background, then draw the lines on top
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+
+    def pixel_width(self):
+        return max(int(self.ax.bbox.width), 100)
+
+    def resample(self, ax=None):
+        # Re-downsample every line for the visible x range
+        from finance_core.downsample import visible
+
+        low, high = self.ax.get_xlim()
+        for label, line in self.lines.items():
+            x, y = self.series[label]
+            line.set_data(*visible(x, y, low, high, self.pixel_width()))
+
+    def reset(self, kind):
+        self.ax.clear()
+        self.series = {}
+        self.lines = {}
+        self.kind = kind
+
+    def _date_axis(self):
+        import matplotlib.dates as mdates
+
+        locator = mdates.AutoDateLocator()
+        self.ax.xaxis.set_major_locator(locator)
+        self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+    def _finish(self, title, legend=True):
+        self.ax.set_title(title)
+        if legend:
+            self.ax.legend(loc="upper left")
+        # Home/back/forward restart from this chart
+        self.toolbar.update()
+        self.canvas.draw()
+
+    def show_lines(self, title, dates, series, area=False):
+        """Plot ``[(label, values, color), ...]`` against ``dates``, as lines
+        or as filled areas."""
+        import numpy as np
+        import matplotlib.dates as mdates
+        from finance_core.downsample import lttb
+
+        x = mdates.date2num(np.asarray(dates, dtype="datetime64[D]"))
+        kind = "area" if area else "line"
+        labels = [label for label, _, _ in series]
+        if kind == "line" and self.kind == "line" and labels == list(self.lines):
+            self.update_lines(title, x, series)
+            return
+
+        self.reset(kind)
+        width = self.pixel_width()
+        for label, values, color in series:
+            y = np.asarray(values, dtype=np.float64)
+            self.series[label] = (x, y)
+            if area:
+                self.ax.fill_between(*lttb(x, y, width), label=label, color=color, alpha=0.5)
+            else:
+                self.lines[label] = self.ax.plot(*lttb(x, y, width), label=label, color=color, animated=True)[0]
+        self._date_axis()
+        self.ax.set_ylabel("Amount")
+        if self.lines:
+            self.ax.callbacks.connect("xlim_changed", self.resample)
+        self._finish(title)
+
+    def update_lines(self, title, x, series):
+        # Same lines as before: swap their data in place, and blit if the
+        # axes limits do not have to move
+        import numpy as np
+
+        for label, values, _ in series:
+            self.series[label] = (x, np.asarray(values, dtype=np.float64))
+        fits = len(x) > 0 and self.background is not None and title == self.ax.get_title()
+        if fits:
+            all_y = np.concatenate([y for _, y in self.series.values()])
+            x_low, x_high = self.ax.get_xlim()
+            y_low, y_high = self.ax.get_ylim()
+            fits = x_low <= x.min() and x.max() <= x_high and y_low <= all_y.min() and all_y.max() <= y_high
+        if fits:
+            self.resample()
+            self.canvas.restore_region(self.background)
+            for line in self.lines.values():
+                self.ax.draw_artist(line)
+            self.canvas.blit(self.figure.bbox)
+            return
+
+        for label, line in self.lines.items():
+            line.set_data(*self.series[label])
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.resample()
+        self._finish(title)
+
+    def show_bars(self, title, dates, series):
+        """Grouped bars of ``[(label, values, color), ...]`` per date."""
+        import numpy as np
+        import matplotlib.dates as mdates
+
+        self.reset("bar")
+        x = mdates.date2num(np.asarray(dates, dtype="datetime64[D]"))
+        spacing = np.min(np.diff(x)) if len(x) > 1 else 30.0
+        width = 0.8 * spacing / max(len(series), 1)
+        for i, (label, values, color) in enumerate(series):
+            self.ax.bar(x + (i - (len(series) - 1) / 2) * width, values, width, label=label, color=color)
+        self._date_axis()
+        self.ax.set_ylabel("Amount")
+        self._finish(title)
+
+    def show_pie(self, title, values, labels, colors=None):
+        self.reset("pie")
+        self.ax.pie(values, labels=labels, autopct="%1.1f%%", colors=colors, startangle=90)
+        self.ax.axis("equal")
+        self._finish(title, legend=False)
 
-        # Export records based on the selected format
-        try:
-            if selected_format == "XLSX":
-                output_file = os.path.join(self.base_dir, "records.xlsx")
-                print(f"Exporting to: {output_file}")  # Debugging: Print the output file path
-                with pd.ExcelWriter(output_file) as writer:
-                    if filtered_income:
-                        pd.DataFrame(filtered_income).to_excel(writer, sheet_name="Income", index=False)
-                        print("Income records exported.")  # Debugging: Confirm income export
-                    if filtered_expenses:
-                        pd.DataFrame(filtered_expenses).to_excel(writer, sheet_name="Expenses", index=False)
-                        print("Expense records exported.")  # Debugging: Confirm expense export
-                messagebox.showinfo("Success", f"Records exported to {output_file} successfully.")
-
-            elif selected_format == "CSV":
-                income_file = os.path.join(self.base_dir, "income_records.csv")
-                expenses_file = os.path.join(self.base_dir, "expense_records.csv")
-                print(f"Exporting Income to: {income_file}")  # Debugging: Print the output file path
-                print(f"Exporting Expenses to: {expenses_file}")  # Debugging: Print the output file path
-                
-                if filtered_income:
-                    pd.DataFrame(filtered_income).to_csv(income_file, index=False)
-                    print("Income records exported to CSV.")  # Debugging: Confirm income export
-                else:
-                    print("No income records to export to CSV.")
-                    
-                if filtered_expenses:
-                    pd.DataFrame(filtered_expenses).to_csv(expenses_file, index=False)
-                    print("Expense records exported to CSV.")  # Debugging: Confirm expense export
-                else:
-                    print("No expense records to export to CSV.")
-                    
-                messagebox.showinfo("Success", "Records exported to CSV successfully.")
-
-            elif selected_format == "JSON":
-                output_file = os.path.join(self.base_dir, "records.json")
-                print(f"Exporting to: {output_file}")  # Debugging: Print the output file path
-                
-                combined_records = {
-                    "income": filtered_income,
-                    "expenses": filtered_expenses
-                }
-                with open(output_file, "w") as json_file:
-                    json.dump(combined_records, json_file, indent=2)
-                    print("Records exported to JSON.")  # Debugging: Confirm JSON export
-                
-                messagebox.showinfo("Success", f"Records exported to {output_file} successfully.")
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export records: {str(e)}")
-
-class CustomJSONDecoder(json.JSONDecoder):
-    def __init__(self, *args, **kwargs):
-        json.JSONDecoder.__init__(self, object_hook=self.object_hook, *args, **kwargs)
-
-    def object_hook(self, obj):
-        for key, value in obj.items():
-            if isinstance(value, str):
-                try:
-                    obj[key] = ast.literal_eval(value)
-                except (ValueError, SyntaxError):
-                    pass
-        return obj
 
 if __name__ == "__main__":
+    from finance_core.config import load_config
+    from finance_core.metrics import configure
+
+    data_folder = os.path.join(os.path.dirname(__file__), "finance_data")
+    configure(load_config(data_folder), data_folder)
     root = tk.Tk()
     app = FinanceTracker(root)
     root.mainloop()
@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+
+from finance_core.binary import binary_to_json, json_to_binary, ledger_bytes, open_ledger, write_ledger
+from finance_core.ledger import Ledger
+
+
+RECORDS = [
+    {"amount": 12.5, "category": "Food", "date": "2024-06-05", "recurring": False, "description": "lunch", "id": 3},
+    {"amount": 1200.0, "category": "Housing", "date": "2024-06-01", "recurring": True, "description": "rent", "id": 1},
+    {"amount": 0.1, "category": "Food", "date": "2023-12-31", "recurring": False, "description": "café ☕", "id": 2},
+]
+
+
+def _by_id(records):
+    return sorted(records, key=lambda record: record["id"])
+
+
+def test_ledger_round_trip(tmp_path):
+    path = str(tmp_path / "expenses.bin")
+    ledger = Ledger.from_records(RECORDS)
+    write_ledger(ledger, path)
+
+    loaded = open_ledger(path)
+    assert len(loaded) == len(RECORDS)
+    assert loaded.next_id == ledger.next_id
+    assert _by_id(loaded.records()) == _by_id(RECORDS)
+    # The date index is read back, not rebuilt
+    assert loaded.dates[loaded.index.array()].astype(str).tolist() == ["2023-12-31", "2024-06-01", "2024-06-05"]
+
+
+def test_ledger_bytes_of_some_rows(tmp_path):
+    ledger = Ledger.from_records(RECORDS)
+    path = tmp_path / "food.bin"
+    path.write_bytes(ledger_bytes(ledger, np.array([0, 2])))
+    assert _by_id(open_ledger(str(path)).records()) == _by_id([RECORDS[0], RECORDS[2]])
+
+
+def test_json_binary_json(tmp_path):
+    source = tmp_path / "expenses.json"
+    source.write_text(json.dumps(RECORDS))
+    assert json_to_binary(str(source), str(tmp_path / "expenses.bin")) == 3
+    assert binary_to_json(str(tmp_path / "expenses.bin"), str(tmp_path / "back.json")) == 3
+    assert _by_id(json.loads((tmp_path / "back.json").read_text())) == _by_id(RECORDS)
+
+
+def test_empty_ledger(tmp_path):
+    path = str(tmp_path / "empty.bin")
+    write_ledger(Ledger(), path)
+    assert len(open_ledger(path)) == 0
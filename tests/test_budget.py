@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+
+from finance_core.budget import Budget, limit_of, make_limit, period_bounds
+from finance_core.engine import FinanceEngine
+from finance_core.ledger import Ledger
+from finance_core.rollup import Rollup
+
+
+def _expenses(*records):
+    ledger = Ledger.from_records([
+        {"id": record_id, "date": day, "amount": amount, "category": category, "description": "", "recurring": False}
+        for record_id, (day, amount, category) in enumerate(records, 1)
+    ])
+    return Rollup.build({"expense": ledger, "income": Ledger()})
+
+
+def test_limits_and_periods():
+    assert make_limit(100) == 100.0 and limit_of(100) == (100.0, "monthly")
+    assert limit_of(make_limit(30, "weekly")) == (30.0, "weekly")
+    with pytest.raises(ValueError):
+        make_limit(30, "daily")
+    # 2024-03-07 was a Thursday
+    assert [str(day) for day in period_bounds("2024-03-07", "weekly")] == ["2024-03-04", "2024-03-10"]
+    assert [str(day) for day in period_bounds("2024-02-10", "monthly")] == ["2024-02-01", "2024-02-29"]
+    assert [str(day) for day in period_bounds("2024-02-10", "yearly")] == ["2024-01-01", "2024-12-31"]
+
+
+def test_status_per_period():
+    rollup = _expenses(("2024-03-03", 10.0, "Food"), ("2024-03-05", 20.0, "Food"), ("2024-01-20", 40.0, "Food"),
+                       ("2023-12-31", 80.0, "Food"), ("2024-03-06", 500.0, "Housing"))
+    limits = {"Food": make_limit(25, "weekly"), "Housing": 400, "Fun": make_limit(1000, "yearly")}
+    today = date(2024, 3, 7)
+    assert Budget(rollup, limits).status(today) == [
+        ("Food", 20.0, 25.0, 5.0, "weekly"), ("Housing", 500.0, 400.0, -100.0, "monthly"),
+        ("Fun", 0.0, 1000.0, 1000.0, "yearly")]
+
+    limits["Food"] = make_limit(100, "yearly")
+    # Projected occurrences count towards their period
+    status = Budget(rollup, limits).status(today, lambda first, last: {"Food": 5.0})
+    assert status[0] == ("Food", 75.0, 100.0, 25.0, "yearly")
+
+
+def test_engine_alerts_when_a_threshold_is_first_crossed(tmp_path):
+    engine = FinanceEngine(str(tmp_path))
+    engine.load()
+    alerts = []
+    engine.budget_listeners.append(alerts.extend)
+    engine.set_spending_limit("Food", 100)
+    today = date.today().isoformat()
+
+    first = engine.add_record("expense", today, 50, "Food")
+    engine.add_record("income", today, 500, "Food")
+    assert alerts == []
+    second = engine.add_record("expense", today, 35, "Food")
+    assert [(alert["category"], alert["threshold"], alert["spent"]) for alert in alerts] == [("Food", 0.8, 85.0)]
+    engine.add_record("expense", today, 5, "Food")
+    assert len(alerts) == 1
+
+    # Deleting never alerts; climbing back over 80% alerts again
+    engine.delete_record("expense", first)
+    engine.edit_record("expense", second, dict(engine.get_record("expense", second), amount=75.0))
+    assert [alert["threshold"] for alert in alerts] == [0.8, 0.8]
+
+    # One change past both thresholds reports only the highest
+    engine.set_spending_limit("Fun", 50, "weekly")
+    engine.add_record("expense", today, 60, "Fun")
+    assert alerts[-1] == {"category": "Fun", "period": "weekly", "spent": 60.0, "limit": 50.0, "threshold": 1.0}
+    assert len(alerts) == 3
+    engine.close()
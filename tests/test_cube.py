@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+import pytest
+
+from finance_core.cube import GRANULARITIES, TimeCube, period_of, period_start
+
+CATEGORIES = ["Food", "Housing", "Transport"]
+
+
+def _churned(seed=5):
+    # A cube after adds that grow the day axis both ways and removes of
+    # half the records, with the records that remain
+    generator = random.Random(seed)
+    cube, records = TimeCube(), []
+    for _ in range(400):
+        record = (str(np.datetime64("2024-06-01") + generator.randint(-900, 900)),
+                  generator.choice(CATEGORIES), generator.randint(1, 4000) / 4)
+        cube.add(*record)
+        records.append(record)
+    generator.shuffle(records)
+    for record in records[:200]:
+        cube.remove(*record)
+    return cube, records[200:]
+
+
+def _brute_force(records, granularity, start_date=None, end_date=None):
+    totals = {}
+    for date, category, amount in records:
+        if (start_date is None or date >= start_date) and (end_date is None or date <= end_date):
+            period = totals.setdefault(period_of(date, granularity), {})
+            period[category] = period.get(category, 0) + amount
+    return dict(sorted(totals.items()))
+
+
+@pytest.mark.parametrize("granularity", GRANULARITIES)
+def test_periods_match_a_rebuild_after_removes(granularity):
+    cube, records = _churned()
+    rebuilt = TimeCube()
+    rebuilt.add_many(*zip(*[(date, category, amount, 1) for date, category, amount in records]))
+    for start_date, end_date in ((None, None), ("2023-02-15", "2025-01-10"), ("2030-01-01", None)):
+        expected = _brute_force(records, granularity, start_date, end_date)
+        assert cube.totals_by_period(granularity, start_date, end_date) == expected
+        assert rebuilt.totals_by_period(granularity, start_date, end_date) == expected
+    assert list(cube.totals_by_period(granularity)) == sorted(cube.totals_by_period(granularity))
+
+
+def test_removed_cells_drop_out():
+    cube = TimeCube()
+    cube.add("2024-03-05", "Food", 10.0)
+    cube.add("2024-03-06", "Fun", 4.0)
+    cube.remove("2024-03-05", "Food", 10.0)
+    assert cube.totals_by_period("month") == {"2024-03": {"Fun": 4.0}}
+    assert cube.category_total("Food", "2024-01-01", "2024-12-31") == 0.0
+    assert cube.category_total("Fees", "2024-01-01", "2024-12-31") == 0.0
+
+
+def test_json_round_trip():
+    cube, _ = _churned()
+    copy = TimeCube.from_json(cube.to_json())
+    for granularity in GRANULARITIES:
+        assert copy.totals_by_period(granularity) == cube.totals_by_period(granularity)
+
+
+def test_period_labels():
+    # 2024-03-07 was a Thursday
+    assert [period_of("2024-03-07", granularity) for granularity in GRANULARITIES] == \
+        ["2024-03-07", "2024-03-04", "2024-03", "2024-Q1", "2024"]
+    assert str(period_start("2024-Q3", "quarter")) == "2024-07-01"
+    assert str(period_start("2024", "year")) == "2024-01-01"
+    with pytest.raises(ValueError):
+        period_of("2024-03-07", "decade")
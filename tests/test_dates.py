@@ -0,0 +1,42 @@
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from finance_core.dates import day_number, parse_date, to_day, to_days
+
+
+def test_iso_and_day_first():
+    assert parse_date("2024-06-05") == np.datetime64("2024-06-05")
+    assert parse_date(" 5/6/2024 ") == np.datetime64("2024-06-05")
+
+
+def test_slash_dates_are_always_day_first():
+    # Both readings are valid; the day-first one wins
+    assert parse_date("05/06/2024") == np.datetime64("2024-06-05")
+
+
+@pytest.mark.parametrize("text", ["10/22/2024", "2024-02-30", "31/02/2024", "2024/06/05", "June 5", ""])
+def test_rejected(text):
+    with pytest.raises(ValueError):
+        parse_date(text)
+
+
+def test_to_day_objects():
+    assert to_day(date(2024, 6, 5)) == np.datetime64("2024-06-05")
+    assert to_day(datetime(2024, 6, 5, 23, 59)) == np.datetime64("2024-06-05")
+    assert to_day(np.datetime64("2024-06-05T10:00")) == np.datetime64("2024-06-05")
+    assert day_number("1970-01-02") == 1
+
+
+def test_to_days_mixed_column():
+    days = to_days(["2024-06-05", "05/06/2024", date(2024, 6, 6), "2024-06-05"])
+    assert days.dtype == np.dtype("datetime64[D]")
+    assert days.astype(str).tolist() == ["2024-06-05", "2024-06-05", "2024-06-06", "2024-06-05"]
+
+
+@pytest.mark.parametrize("values", [[5], ["2024-06-05", 19000], [None], [3.5]])
+def test_to_days_rejects_non_dates(values):
+    # A number must not turn into a day count from 1970
+    with pytest.raises(ValueError):
+        to_days(values)
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+
+from finance_core.engine import FinanceEngine
+
+
+def _engine(folder):
+    engine = FinanceEngine(str(folder))
+    engine.load()
+    return engine
+
+
+def test_snapshot_answers_aggregates_without_the_records(tmp_path):
+    engine = _engine(tmp_path)
+    engine.add_record("expense", "2024-05-03", 40, "Food", "groceries")
+    engine.add_record("expense", "2024-05-10", 900, "Housing", "rent", recurring=True)
+    snapshot = engine.snapshot()
+    engine.add_record("expense", "2024-05-11", 1000, "Food", "feast")
+
+    # The snapshot keeps the totals of when it was taken
+    assert snapshot.totals_by_category("expense") == {"Food": 40.0, "Housing": 900.0}
+    assert snapshot.totals_by_category("expense", "2024-05-01", "2024-06-30", include_projected=True)["Housing"] == 1800.0
+    assert snapshot.forecast(1, today=date(2024, 5, 15))["categories"]["expense"]["Housing"] == [900.0]
+    with pytest.raises(RuntimeError):
+        snapshot.view("expense")
+    engine.close()
+
+
+def test_copy_records_detaches_the_snapshot(tmp_path):
+    engine = _engine(tmp_path)
+    engine.add_record("expense", "2024-05-03", 40, "Food", "groceries")
+    snapshot = engine.snapshot().copy_records()
+    engine.add_record("expense", "2024-05-04", 10, "Food", "coffee")
+    engine.delete_record("expense", 1)
+
+    assert [row["description"] for row in snapshot.view("expense").rows(0, 10)] == ["groceries"]
+    assert [row["description"] for row in engine.view("expense").rows(0, 10)] == ["coffee"]
+    engine.close()
+
+
+def test_snapshot_fills_older_series_from_their_records(tmp_path):
+    engine = _engine(tmp_path)
+    record_id = engine.add_record("income", "2024-01-25", 3000, "Salary", "pay", recurring=True)
+    series = engine.categories["recurring"]["income"][0]
+    for key in ("amount", "category", "description"):
+        # As saved before series kept a copy of their record
+        del series[key]
+    snapshot = engine.snapshot()
+
+    assert snapshot.categories["recurring"]["income"][0]["amount"] == 3000.0
+    assert "amount" not in engine.categories["recurring"]["income"][0]
+    assert snapshot.totals_by_month("income", "2024-01-01", "2024-03-31", include_projected=True) == \
+        {"2024-01": 3000.0, "2024-02": 3000.0, "2024-03": 3000.0}
+    assert engine.get_record("income", record_id)["recurring"]
+    engine.close()
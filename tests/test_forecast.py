@@ -0,0 +1,62 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from finance_core.forecast import cash_flow, month_number, occurrence_counts
+from finance_core.ledger import Ledger
+from finance_core.recurrence import FREQUENCIES, make_series, project
+from finance_core.rollup import Rollup
+
+
+def _record(day, amount, category, record_id, recurring=False):
+    return {"id": record_id, "date": day, "amount": amount, "category": category,
+            "description": category.lower(), "recurring": recurring}
+
+
+def test_occurrence_counts_match_project():
+    generator = random.Random(7)
+    series_list = []
+    for _ in range(300):
+        start = date(2022, 1, 1) + timedelta(days=generator.randrange(900))
+        end = start + timedelta(days=generator.randrange(20, 700)) if generator.random() < 0.3 else None
+        record = _record(start.isoformat(), 10.0, "Food", generator.choice([None, 1]))
+        series_list.append(make_series(record, generator.choice(FREQUENCIES), generator.randint(1, 3), end,
+                                       generator.choice([None, None, -1, 31, 15])))
+    first, stop = month_number("2022-01-01"), month_number("2025-06-01")
+    counts = occurrence_counts(series_list, first, stop)
+
+    expected = np.zeros_like(counts)
+    for row, series in enumerate(series_list):
+        for record in project([series], Ledger(), "2022-01-01", "2025-05-31"):
+            expected[row, month_number(record["date"]) - first] += 1
+    assert np.array_equal(counts, expected)
+
+
+def test_monthly_cash_flow():
+    income = Ledger.from_records([_record("2024-01-25", 3000.0, "Salary", 1, True)])
+    expenses = Ledger.from_records([
+        _record("2024-01-01", 1000.0, "Housing", 2, True),
+        _record("2024-02-10", 200.0, "Food", 3),
+    ])
+    recurring = {
+        "income": [(make_series(income[0]), income[0])],
+        "expense": [(make_series(expenses[0]), expenses[0])],
+    }
+    result = cash_flow(Rollup.build({"expense": expenses, "income": income}), recurring, 2, date(2024, 3, 15))
+
+    assert result["months"] == ["2024-04", "2024-05"]
+    # Stored Jan-Mar plus the February and March occurrences of both series
+    assert result["opening_balance"] == pytest.approx((3000 + 6000) - (1200 + 2000))
+    assert result["income"] == pytest.approx([3000.0, 3000.0])
+    # Rent from its series, food from its average over January and February
+    assert result["categories"]["expense"] == {"Food": pytest.approx([100.0, 100.0]),
+                                               "Housing": pytest.approx([1000.0, 1000.0])}
+    assert result["net"] == pytest.approx([1900.0, 1900.0])
+    assert result["balance"] == pytest.approx([7700.0, 9600.0])
+
+
+def test_forecast_needs_a_month():
+    with pytest.raises(ValueError):
+        cash_flow(Rollup(), {}, 0, date(2024, 3, 15))
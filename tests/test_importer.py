@@ -0,0 +1,66 @@
+import numpy as np
+
+from finance_core.importer import parse_amounts, read_csv, read_ofx, split_by_type
+
+
+def test_parse_amounts_signs():
+    amounts = parse_amounts(["-12.00", "(12.00)", "1,234.50", "$7", " 0.5 ", ""])
+    assert amounts.tolist() == [-12.0, -12.0, 1234.5, 7.0, 0.5, 0.0]
+
+
+def test_parse_amounts_decimal_comma():
+    assert parse_amounts(["-1.234,50", "3,25"], decimal=",", thousands=".").tolist() == [-1234.5, 3.25]
+
+
+def test_split_by_sign():
+    columns = {
+        "date": np.array(["2024-06-01", "2024-06-02", "2024-06-03"], dtype="datetime64[D]"),
+        "amount": np.array([-20.0, 1500.0, 0.0]),
+        "description": np.array(["groceries", "salary", "fee waived"], dtype=object),
+        "category": np.array(["Food", "Salary", "Fees"], dtype=object)
+    }
+    split = split_by_type(columns)
+    # Money out is an expense, money in income; amounts are kept positive
+    # and zero amounts are neither
+    assert split["expense"]["amount"].tolist() == [20.0]
+    assert split["expense"]["description"].tolist() == ["groceries"]
+    assert split["income"]["amount"].tolist() == [1500.0]
+    assert split["income"]["category"].tolist() == ["Salary"]
+
+
+def test_split_with_a_record_type():
+    columns = {
+        "date": np.array(["2024-06-01", "2024-06-02"], dtype="datetime64[D]"),
+        "amount": np.array([-20.0, 5.0]),
+        "description": np.array(["a", "b"], dtype=object),
+        "category": np.array(["Food", "Food"], dtype=object)
+    }
+    split = split_by_type(columns, "Expense")
+    assert list(split) == ["expense"]
+    assert split["expense"]["amount"].tolist() == [20.0, 5.0]
+
+
+def test_csv_debit_and_credit_columns(tmp_path):
+    path = tmp_path / "statement.csv"
+    path.write_text("Date,Details,Debit,Credit\n"
+                    "05/06/2024,Coffee,3.20,\n"
+                    "06/06/2024,Refund,,15.00\n"
+                    "07/06/2024,Card fee,-1.00,\n")
+    columns = read_csv(str(path), {"description": "Details", "debit": "Debit", "credit": "Credit"},
+                       date_format="%d/%m/%Y")
+    # Debits are money out whichever sign the bank writes them with
+    assert columns["amount"].tolist() == [-3.2, 15.0, -1.0]
+    assert columns["date"].astype(str).tolist() == ["2024-06-05", "2024-06-06", "2024-06-07"]
+    assert columns["category"].tolist() == ["Uncategorized"] * 3
+
+
+def test_ofx_amounts(tmp_path):
+    path = tmp_path / "statement.ofx"
+    path.write_text("<OFX><BANKTRANLIST>"
+                    "<STMTTRN><DTPOSTED>20240605<TRNAMT>-42.10<NAME>Grocer</STMTTRN>"
+                    "<STMTTRN><DTPOSTED>20240606120000<TRNAMT>1000.00<NAME>Employer<MEMO>June</STMTTRN>"
+                    "</BANKTRANLIST></OFX>")
+    split = split_by_type(read_ofx(str(path)))
+    assert split["expense"]["amount"].tolist() == [42.1]
+    assert split["income"]["description"].tolist() == ["Employer - June"]
+    assert split["income"]["date"].astype(str).tolist() == ["2024-06-06"]
@@ -0,0 +1,97 @@
+import json
+import os
+
+from finance_core.engine import FinanceEngine
+from finance_core.journal import Journal
+
+
+def test_replay_returns_recorded_operations(tmp_path):
+    journal = Journal(str(tmp_path))
+    journal.record({"op": "delete", "type": "expense", "id": 1})
+    journal.record({"op": "delete", "type": "expense", "id": 2})
+    journal.close()
+
+    operations = Journal(str(tmp_path)).replay()
+    assert [(operation["seq"], operation["id"]) for operation in operations] == [(1, 1), (2, 2)]
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    journal = Journal(str(tmp_path))
+    journal.record({"op": "delete", "type": "expense", "id": 1})
+    journal.close()
+    with open(journal.path, "a") as file:
+        file.write('{"op": "delete", "type": "exp')
+
+    journal = Journal(str(tmp_path))
+    assert [operation["id"] for operation in journal.replay()] == [1]
+    # The torn bytes are cut off, so the next append starts a clean line
+    journal.record({"op": "delete", "type": "expense", "id": 3})
+    journal.close()
+    assert [operation["id"] for operation in Journal(str(tmp_path)).replay()] == [1, 3]
+
+
+def test_compaction_interrupted_before_commit_point(tmp_path):
+    # The journal was rotated aside but no snapshot was written: its
+    # operations are folded back in, without duplicating any
+    journal = Journal(str(tmp_path))
+    for record_id in (1, 2, 3):
+        journal.record({"op": "delete", "type": "expense", "id": record_id})
+    journal.close()
+    os.replace(journal.path, journal.compacting_path)
+    with open(journal.path, "w") as file:
+        file.write(json.dumps({"op": "delete", "type": "expense", "id": 3, "seq": 3}) + "\n")
+        file.write(json.dumps({"op": "delete", "type": "expense", "id": 4, "seq": 4}) + "\n")
+
+    journal = Journal(str(tmp_path))
+    assert [operation["id"] for operation in journal.replay()] == [1, 2, 3, 4]
+    assert not os.path.exists(journal.compacting_path)
+    assert [operation["id"] for operation in Journal(str(tmp_path)).replay()] == [1, 2, 3, 4]
+
+
+def test_compaction_interrupted_after_commit_point(tmp_path):
+    # The marker exists, so the written snapshots are moved into place
+    journal = Journal(str(tmp_path))
+    journal.record({"op": "delete", "type": "expense", "id": 1})
+    journal.close()
+    os.replace(journal.path, journal.compacting_path)
+    snapshot = os.path.join(str(tmp_path), "expenses.json")
+    with open(snapshot, "w") as file:
+        file.write("old")
+    with open(snapshot + ".tmp", "w") as file:
+        file.write("new")
+    emptied = os.path.join(str(tmp_path), "income.json")
+    with open(emptied, "w") as file:
+        file.write("old")
+    with open(journal.pending_path, "w") as file:
+        json.dump({snapshot + ".tmp": snapshot, emptied: None}, file)
+
+    journal = Journal(str(tmp_path))
+    assert journal.replay() == []
+    with open(snapshot) as file:
+        assert file.read() == "new"
+    assert not os.path.exists(emptied)
+    assert not os.path.exists(journal.pending_path)
+    assert not os.path.exists(journal.compacting_path)
+
+
+def test_engine_recovers_unsaved_changes(tmp_path):
+    folder = str(tmp_path)
+    engine = FinanceEngine(folder)
+    engine.load()
+    first = engine.add_record("expense", "2024-06-05", 12.5, "Food", "lunch")
+    engine.add_record("income", "05/06/2024", 100, "Salary")
+    engine.edit_record("expense", first, dict(engine.get_record("expense", first), amount=15.0))
+    # Closed without a save: only the journal has the changes
+    engine.close()
+
+    engine = FinanceEngine(folder)
+    engine.load()
+    assert engine.get_record("expense", first)["amount"] == 15.0
+    assert engine.totals_by_month("income") == {"2024-06": 100.0}
+    engine.save(background=False)
+    engine.close()
+
+    engine = FinanceEngine(folder)
+    engine.load()
+    assert engine.totals_by_category("expense") == {"Food": 15.0}
+    engine.close()
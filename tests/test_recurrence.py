@@ -0,0 +1,99 @@
+import logging
+
+import pytest
+
+from finance_core.ledger import Ledger
+from finance_core.recurrence import ProjectedView, make_series, occurrences, project, upgrade_series
+
+
+def _record(day, amount=100.0, record_id=1, category="Housing", description="rent", recurring=True):
+    return {"id": record_id, "date": day, "amount": amount, "category": category,
+            "description": description, "recurring": recurring}
+
+
+def _dates(series, start, end):
+    return [day.isoformat() for day in occurrences(series, start, end)]
+
+
+def test_monthly_clamps_to_short_months():
+    series = make_series(_record("2024-01-31"))
+    assert _dates(series, "2024-01-01", "2024-05-31") == \
+        ["2024-01-31", "2024-02-29", "2024-03-31", "2024-04-30", "2024-05-31"]
+
+
+def test_last_day_of_month_and_intervals():
+    series = make_series(_record("2024-01-15"), "monthly", interval=2, day_of_month=-1)
+    assert _dates(series, "2024-01-01", "2024-07-31") == ["2024-01-31", "2024-03-31", "2024-05-31", "2024-07-31"]
+    weekly = make_series(_record("2024-01-01"), "weekly", interval=2)
+    assert _dates(weekly, "2024-01-10", "2024-02-12") == ["2024-01-15", "2024-01-29", "2024-02-12"]
+    yearly = make_series(_record("2020-02-29"), "yearly")
+    assert _dates(yearly, "2020-01-01", "2024-12-31") == \
+        ["2020-02-29", "2021-02-28", "2022-02-28", "2023-02-28", "2024-02-29"]
+
+
+def test_end_date_stops_the_series():
+    series = make_series(_record("2024-01-10"), "daily", end="2024-01-13")
+    assert _dates(series, "2024-01-01", "2024-12-31") == ["2024-01-10", "2024-01-11", "2024-01-12", "2024-01-13"]
+    assert _dates(series, "2024-01-14", "2024-12-31") == []
+
+
+def test_bad_rules_are_rejected():
+    with pytest.raises(ValueError):
+        make_series(_record("2024-01-10"), "fortnightly")
+    with pytest.raises(ValueError):
+        make_series(_record("2024-01-10"), interval=0)
+
+
+def test_project_skips_the_stored_first_occurrence():
+    stored = make_series(_record("2024-01-10", 900.0, 1))
+    standalone = make_series(_record("2024-01-20", 50.0, None, "Utilities", "water"))
+    records = list(project([stored, standalone], Ledger(), "2024-01-01", "2024-03-15"))
+    assert [(record["date"], record["amount"]) for record in records] == [
+        ("2024-01-20", 50.0), ("2024-02-10", 900.0), ("2024-02-20", 50.0), ("2024-03-10", 900.0)]
+    assert all(record["projected"] and record["recurring"] for record in records)
+
+
+def test_projected_rows_land_among_stored_rows():
+    ledger = Ledger.from_records([
+        _record("2024-01-10", 900.0, 1),
+        _record("2024-02-05", 20.0, 2, "Food", "lunch", False),
+        _record("2024-02-10", 30.0, 3, "Food", "dinner", False),
+        _record("2024-03-20", 40.0, 4, "Food", "brunch", False),
+    ])
+    series = make_series(ledger[0])
+    projected = list(project([series], ledger, "2024-01-01", "2024-03-31"))
+    view = ProjectedView(ledger.view("2024-01-01", "2024-03-31"), projected)
+    rows = view.rows(0, len(view))
+    # Newest first; a projected row follows the stored rows of its day
+    assert [(row["date"], row.get("projected", False)) for row in rows] == [
+        ("2024-03-20", False), ("2024-03-10", True), ("2024-02-10", False), ("2024-02-10", True),
+        ("2024-02-05", False), ("2024-01-10", False)]
+    assert [row["date"] for row in view.rows(1, 3)] == ["2024-03-10", "2024-02-10"]
+
+    view.sort("date", descending=False)
+    assert [(row["date"], row.get("projected", False)) for row in view.rows(0, len(view))] == [
+        ("2024-01-10", False), ("2024-02-05", False), ("2024-02-10", False), ("2024-02-10", True),
+        ("2024-03-10", True), ("2024-03-20", False)]
+    view.sort("amount")
+    assert [row.get("projected", False) for row in view.rows(0, len(view))] == [False] * 4 + [True] * 2
+
+
+def test_upgrade_keeps_unmatched_copies_as_standalone_series(caplog):
+    ledger = Ledger.from_records([_record("2024-01-10", 900.0, 1, recurring=False)])
+    entries = [
+        {"amount": 900.0, "category": "Housing", "date": "10/01/2024", "description": "rent", "recurring": True},
+        {"amount": 60.0, "category": "Utilities", "date": "22/01/2024", "description": "gas", "recurring": True},
+    ]
+    with caplog.at_level(logging.WARNING, logger="finance_core.recurrence"):
+        assert upgrade_series(entries, ledger)
+    assert "matches no record; kept as a stand-alone series" in caplog.text
+
+    matched, standalone = entries
+    assert matched["id"] == 1 and ledger[0]["recurring"]
+    assert standalone["id"] is None and standalone["amount"] == 60.0 and standalone["start"] == "2024-01-22"
+    records = list(project(entries, ledger, "2024-01-01", "2024-02-28"))
+    assert [(record["date"], record["category"]) for record in records] == [
+        ("2024-01-22", "Utilities"), ("2024-02-10", "Housing"), ("2024-02-22", "Utilities")]
+    # Series are only upgraded once
+    assert not upgrade_series(entries, ledger)
+
@@ -0,0 +1,94 @@
+import random
+
+import numpy as np
+
+from finance_core.engine import FinanceEngine
+from finance_core.rollup import Rollup
+
+CATEGORIES = ["Food", "Housing", "Transport", "Fun"]
+
+
+def _engine(folder):
+    engine = FinanceEngine(str(folder))
+    engine.load()
+    return engine
+
+
+def _day(generator):
+    return str(np.datetime64("2022-01-01") + generator.randrange(3 * 365))
+
+
+def _churn(engine, seed=3):
+    # Adds, an import, then edits that move records across days, months,
+    # years and categories, and deletes; amounts are whole quarters so
+    # every sum is exact
+    generator = random.Random(seed)
+    ids = []
+    for _ in range(200):
+        record_type = generator.choice(["expense", "income"])
+        ids.append((record_type, engine.add_record(record_type, _day(generator), generator.randint(1, 4000) / 4,
+                                                   generator.choice(CATEGORIES))))
+    days = [_day(generator) for _ in range(50)]
+    engine.import_columns({"expense": {
+        "date": np.array(days, dtype="datetime64[D]"),
+        "amount": np.array([generator.randint(1, 400) / 4 for _ in days]),
+        "description": np.array(["imported"] * len(days), dtype=object),
+        "category": np.array([generator.choice(CATEGORIES) for _ in days], dtype=object)
+    }})
+    generator.shuffle(ids)
+    for record_type, record_id in ids[:60]:
+        record = dict(engine.get_record(record_type, record_id))
+        change = generator.choice(["date", "category", "amount"])
+        record[change] = {"date": _day(generator), "category": generator.choice(CATEGORIES),
+                          "amount": generator.randint(1, 4000) / 4}[change]
+        engine.edit_record(record_type, record_id, record)
+    for record_type, record_id in ids[60:120]:
+        engine.delete_record(record_type, record_id)
+
+
+def _cells(rollup, ledgers):
+    # Every month cell, with stale min/max refreshed from the ledger
+    return {
+        record_type: {
+            month: {category: rollup.stats(record_type, month, category, ledgers[record_type])
+                    for category in categories}
+            for month, categories in rollup.cells[record_type].items()
+        }
+        for record_type in ("expense", "income")
+    }
+
+
+def test_rollup_matches_a_rebuild_after_edits_and_deletes(tmp_path):
+    engine = _engine(tmp_path)
+    _churn(engine)
+    ledgers = engine.ledgers()
+    rebuilt = Rollup.build(ledgers)
+
+    assert _cells(engine.rollup, ledgers) == _cells(rebuilt, ledgers)
+    for record_type in ("expense", "income"):
+        assert engine.rollup.totals_by_period(record_type, "day") == rebuilt.totals_by_period(record_type, "day")
+        assert engine.rollup.totals_by_category(record_type, month=2) == \
+            rebuilt.totals_by_category(record_type, month=2)
+        assert engine.rollup.category_total(record_type, "Food", "2023-01-01", "2023-06-30") == \
+            rebuilt.category_total(record_type, "Food", "2023-01-01", "2023-06-30")
+    engine.close()
+
+
+def test_saved_rollup_is_reused_only_while_it_matches(tmp_path):
+    engine = _engine(tmp_path)
+    _churn(engine)
+    engine.save(background=False)
+    expected = engine.rollup.totals_by_period("expense", "month")
+    engine.close()
+
+    engine = _engine(tmp_path)
+    # Read from rollup.json: only the newest partition is in memory
+    assert len(engine.expenses) < sum(entry["count"] for entry in engine.store.manifest["expense"].values())
+    assert engine.rollup.totals_by_period("expense", "month") == expected
+    engine.close()
+
+    fingerprint = Rollup.fingerprint(engine.ledgers())
+    data = engine.rollup.to_json(fingerprint)
+    assert Rollup.from_json(data, fingerprint).cells == engine.rollup.cells
+    assert Rollup.from_json(data, dict(fingerprint, expense=[0, 0])) is None
+    assert Rollup.from_json(dict(data, version=1), fingerprint) is None
@@ -0,0 +1,73 @@
+import pytest
+
+from finance_core.config import DEFAULT_CONFIG
+from finance_core.engine import FinanceEngine
+from finance_core.search import TrigramIndex, parse_query
+
+RECORDS = [
+    ("2024-01-03", "Food", "Lunch at the cafe"),
+    ("2024-01-09", "Transport", "Car rental"),
+    ("2024-02-14", "Fun", "Oscar night"),
+    ("2024-02-20", "Food", "a_b test"),
+    ("2024-03-01", "Fun", "axb test"),
+    ("2024-03-05", "Shopping", "50% off"),
+    ("2024-03-09", "Food", "lunch"),
+]
+
+QUERIES = [
+    ("lunch", {"Lunch at the cafe", "lunch"}),
+    ("FOOD", {"Lunch at the cafe", "a_b test", "lunch"}),
+    ("car*", {"Car rental"}),
+    ("car", {"Car rental", "Oscar night"}),
+    # Shorter than a trigram
+    ("ca", {"Lunch at the cafe", "Car rental", "Oscar night"}),
+    ("x", {"axb test"}),
+    ("t*", {"Lunch at the cafe", "Car rental", "a_b test", "axb test"}),
+    ("a_b", {"a_b test"}),
+    ("50%", {"50% off"}),
+    ("lunch cafe", {"Lunch at the cafe"}),
+    ("fun t", {"Oscar night", "axb test"}),
+    ("zzz", set()),
+]
+
+
+def test_parse_query():
+    assert parse_query("  Car*  LUNCH * ") == [("car", True), ("lunch", False)]
+    assert parse_query(None) == []
+
+
+def test_trigram_index_checks_its_candidates():
+    index = TrigramIndex.build(["Banana bread", "bandana", "Nan"])
+    assert index.match("ana").tolist() == [0, 1]
+    assert index.match("nan").tolist() == [0, 2]
+    assert index.match("ban", prefix=True).tolist() == [0, 1]
+    assert index.match("an").tolist() == [0, 1, 2]
+    assert index.match("bread*").tolist() == []
+
+
+@pytest.fixture(params=["json", "sqlite", "sqlite without fts5"])
+def engine(request, tmp_path):
+    config = DEFAULT_CONFIG if request.param == "json" else dict(DEFAULT_CONFIG, backend="sqlite")
+    engine = FinanceEngine(str(tmp_path), config)
+    engine.load()
+    if request.param == "sqlite without fts5":
+        engine.store.full_text = False
+    for day, category, description in RECORDS:
+        engine.add_record("expense", day, 10, category, description)
+    yield engine
+    engine.close()
+
+
+@pytest.mark.parametrize("query, expected", QUERIES)
+def test_search_results(engine, query, expected):
+    view = engine.view("expense", query=query)
+    assert {row["description"] for row in view.rows(0, len(view))} == expected
+
+
+def test_search_within_dates_follows_edits(engine):
+    view = engine.view("expense", "2024-01-01", "2024-02-29", query="lunch")
+    assert [row["date"] for row in view.rows(0, len(view))] == ["2024-01-03"]
+    record = next(row for row in engine.view("expense").rows(0, len(RECORDS)) if row["description"] == "axb test")
+    engine.edit_record("expense", record["id"], dict(record, date="2024-02-01", description="late lunch"))
+    view = engine.view("expense", "2024-01-01", "2024-02-29", query="lunch")
+    assert [row["date"] for row in view.rows(0, len(view))] == ["2024-02-01", "2024-01-03"]
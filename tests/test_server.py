@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import urllib.error
+import urllib.request
+from datetime import date
+
+import pytest
+
+from finance_core.client import RemoteEngine
+from finance_core.engine import FinanceEngine
+from finance_core.server import LedgerServer
+
+
+@pytest.fixture
+def serve():
+    # Serve an engine on a free localhost port from a thread of its own;
+    # returns the server's base URL
+    running = []
+
+    def start(engine):
+        server = LedgerServer(engine, port=0)
+        started = threading.Event()
+        state = {}
+
+        async def main():
+            state["loop"], state["stop"] = asyncio.get_running_loop(), asyncio.Event()
+            await server.start()
+            started.set()
+            await state["stop"].wait()
+            server.server.close()
+            await server.server.wait_closed()
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+        thread = threading.Thread(target=asyncio.run, args=(main(),), daemon=True)
+        thread.start()
+        started.wait(10)
+        running.append((state, thread, engine))
+        return f"http://127.0.0.1:{server.port}"
+
+    yield start
+    for state, thread, engine in running:
+        state["loop"].call_soon_threadsafe(state["stop"].set)
+        thread.join(10)
+        engine.close()
+
+
+def _engine(folder):
+    engine = FinanceEngine(str(folder))
+    engine.load()
+    return engine
+
+
+def _get(url, etag=None):
+    request = urllib.request.Request(url, headers={"If-None-Match": etag} if etag else {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers["ETag"]
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["ETag"]
+
+
+def test_records_round_trip(tmp_path, serve):
+    client = RemoteEngine(serve(_engine(tmp_path)))
+    client.load()
+    record_id = client.add_record("expense", "2024-06-05", 12.5, "Food", "lunch")
+    assert client.get_record("expense", record_id)["amount"] == 12.5
+
+    client.edit_record("expense", record_id, dict(client.get_record("expense", record_id), amount=20.0))
+    view = client.view("expense", "2024-06-01", "2024-06-30")
+    assert [(row["id"], row["amount"]) for row in view.rows(0, len(view))] == [(record_id, 20.0)]
+    assert client.totals_by_category("expense") == {"Food": 20.0}
+
+    client.delete_record("expense", record_id)
+    assert client.get_record("expense", record_id) is None
+    with pytest.raises(ValueError):
+        client.add_record("expense", "not a date", 1, "Food")
+    client.close()
+
+
+def test_unchanged_answers_cost_a_304(tmp_path, serve):
+    engine = _engine(tmp_path)
+    engine.add_record("expense", "2024-06-05", 12.5, "Food", "lunch")
+    url = serve(engine)
+    status, etag = _get(url + "/totals/expense")
+    assert status == 200
+    assert _get(url + "/totals/expense", etag) == (304, etag)
+
+    client = RemoteEngine(url)
+    client.add_record("expense", "2024-06-06", 5, "Food", "coffee")
+    status, fresh = _get(url + "/totals/expense", etag)
+    assert status == 200 and fresh != etag
+    # Budgets also depend on the day, which their tag carries
+    assert date.today().isoformat() in _get(url + "/budget")[1]
+    assert date.today().isoformat() not in _get(url + "/categories")[1]
+    client.close()
+
+
+def test_cached_view_survives_another_client_reading_older_records(tmp_path, serve):
+    engine = _engine(tmp_path)
+    for year in (2023, 2024):
+        for month in range(1, 13):
+            engine.add_record("expense", f"{year}-{month:02d}-15", month, "Food", f"{year}")
+    engine.save(background=False)
+    engine.close()
+
+    url = serve(_engine(tmp_path))
+    first, second = RemoteEngine(url), RemoteEngine(url)
+    view = first.view("expense", "2024-01-01", "2024-12-31")
+    assert [row["date"] for row in view.rows(0, 2)] == ["2024-12-15", "2024-11-15"]
+    # Reading 2023 in moves every row of the server's date index
+    assert len(second.view("expense", "2023-01-01", "2023-12-31")) == 12
+    assert [row["date"] for row in view.rows(2, 4)] == ["2024-10-15", "2024-09-15"]
+    first.close()
+    second.close()
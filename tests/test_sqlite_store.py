@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+from finance_core.config import DEFAULT_CONFIG, load_config
+from finance_core.engine import FinanceEngine
+from finance_core.sqlite_store import main, migrate_json_to_sqlite
+
+SQLITE = dict(DEFAULT_CONFIG, backend="sqlite", sqlite_file="ledger.db")
+
+
+def _engine(folder, config=None):
+    engine = FinanceEngine(str(folder), config)
+    engine.load()
+    return engine
+
+
+def test_records_survive_a_reopen(tmp_path):
+    engine = _engine(tmp_path, SQLITE)
+    lunch = engine.add_record("expense", "2024-06-05", 12.5, "Food", "lunch")
+    engine.add_record("expense", "2024-05-20", 40, "Transport", "train")
+    rent = engine.add_record("expense", "2024-05-01", 900, "Housing", "rent", recurring=True)
+    pay = engine.add_record("income", "2024-05-25", 3000, "Salary", "pay")
+    engine.edit_record("expense", lunch, dict(engine.get_record("expense", lunch), amount=15.0))
+    engine.add_category("expense", "Pets")
+    engine.close()
+
+    engine = _engine(tmp_path, SQLITE)
+    assert len({lunch, rent, pay}) == 3
+    assert engine.get_record("expense", lunch)["amount"] == 15.0
+    assert engine.get_record("income", pay)["category"] == "Salary"
+    assert "Pets" in engine.categories["expense"]
+    view = engine.view("expense", "2024-05-01", "2024-06-30")
+    assert [row["description"] for row in view.rows(0, len(view))] == ["lunch", "train", "rent"]
+    view.sort("amount", descending=False)
+    assert [row["amount"] for row in view.rows(1, 3)] == [40.0, 900.0]
+    assert engine.totals_by_month("expense", "2024-05-01", "2024-06-30", include_projected=True) == \
+        {"2024-05": 940.0, "2024-06": 915.0}
+
+    engine.delete_record("expense", rent)
+    assert engine.get_record("expense", rent) is None
+    assert engine.totals_by_category("expense") == {"Food": 15.0, "Transport": 40.0}
+    engine.close()
+
+
+def _json_folder(folder):
+    engine = _engine(folder)
+    for year in (2022, 2023, 2024):
+        engine.add_record("expense", f"{year}-03-01", year, "Food", f"groceries {year}")
+    engine.add_record("income", "2024-01-25", 3000, "Salary", "pay", recurring=True)
+    engine.save(background=False)
+    # Left in the journal only
+    engine.add_record("expense", "2024-04-01", 7, "Fun", "cinema")
+    engine.close()
+
+
+def test_migration_copies_every_record(tmp_path):
+    _json_folder(tmp_path)
+    database = os.path.join(str(tmp_path), "ledger.db")
+    assert migrate_json_to_sqlite(str(tmp_path), database) == (4, 1)
+    with pytest.raises(RuntimeError):
+        migrate_json_to_sqlite(str(tmp_path), database)
+    assert migrate_json_to_sqlite(str(tmp_path), database, replace=True) == (4, 1)
+
+    engine = _engine(tmp_path, SQLITE)
+    assert engine.totals_by_month("expense") == {"2022-03": 2022.0, "2023-03": 2023.0, "2024-03": 2024.0,
+                                                 "2024-04": 7.0}
+    assert engine.categories["recurring"]["income"][0]["amount"] == 3000.0
+    assert engine.totals_by_month("income", "2024-01-01", "2024-03-31", include_projected=True) == \
+        {"2024-01": 3000.0, "2024-02": 3000.0, "2024-03": 3000.0}
+    engine.close()
+
+
+def test_command_line_switches_the_backend(tmp_path, capsys):
+    _json_folder(tmp_path)
+    main(["--data-folder", str(tmp_path), "--database", os.path.join(str(tmp_path), "ledger.db"), "--use"])
+    assert "Imported 4 expense and 1 income records" in capsys.readouterr().out
+    config = load_config(str(tmp_path))
+    assert (config["backend"], config["sqlite_file"]) == ("sqlite", "ledger.db")
+    with open(os.path.join(str(tmp_path), "config.json")) as file:
+        assert json.load(file)["backend"] == "sqlite"
+
+    engine = _engine(tmp_path)
+    assert len(engine.view("expense")) == 4
+    engine.close()
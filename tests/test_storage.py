@@ -0,0 +1,118 @@
+import json
+import os
+
+from finance_core.config import DEFAULT_CONFIG
+from finance_core.engine import FinanceEngine
+from finance_core.storage import DEFAULT_CATEGORIES
+
+
+def _engine(folder, config=None):
+    engine = FinanceEngine(str(folder), config)
+    engine.load()
+    return engine
+
+
+def _fill(folder, years=(2019, 2021, 2024)):
+    engine = _engine(folder)
+    for year in years:
+        for day in range(1, 6):
+            engine.add_record("expense", f"{year}-03-{day:02d}", year + day, "Food", f"groceries {year}")
+    engine.save(background=False)
+    engine.close()
+
+
+def test_single_files_become_month_partitions(tmp_path):
+    # Records as written before ids and partitions
+    def record(day, amount, category, description):
+        return {"date": day, "amount": amount, "category": category, "description": description, "recurring": False}
+
+    files = {
+        "expenses.json": [record(f"2023-{month:02d}-10", month, "Food", "lunch") for month in (11, 12)] +
+                         [record("2024-01-02", 5.0, "Food", "")],
+        "income.json": [record("2024-01-25", 3000.0, "Salary", "pay")],
+        "categories.json": DEFAULT_CATEGORIES
+    }
+    for name, data in files.items():
+        with open(os.path.join(str(tmp_path), name), "w") as file:
+            json.dump(data, file)
+
+    engine = _engine(tmp_path, dict(DEFAULT_CONFIG, partition="month"))
+    manifest = engine.store.manifest
+    assert manifest["partition"] == "month"
+    assert list(manifest["expense"]) == ["2023-11", "2023-12", "2024-01"]
+    assert list(manifest["income"]) == ["2024-01"]
+    assert all(os.path.exists(engine.store.partition_file("expense", key)) for key in manifest["expense"])
+    ids = [row["id"] for record_type in ("expense", "income") for row in engine.view(record_type).rows(0, 10)]
+    assert len(set(ids)) == 4
+    engine.close()
+
+    # The manifest keeps its partition size over the default
+    engine = _engine(tmp_path)
+    assert engine.store.partition == "month"
+    assert engine.totals_by_month("expense") == {"2023-11": 11.0, "2023-12": 12.0, "2024-01": 5.0}
+    engine.close()
+
+
+def test_save_rewrites_only_dirty_partitions(tmp_path):
+    _fill(tmp_path)
+    engine = _engine(tmp_path)
+    files = {key: engine.store.partition_file("expense", key) for key in ("2019", "2021", "2024")}
+    for path in files.values():
+        os.utime(path, (0, 0))
+    engine.add_record("expense", "2021-07-01", 1, "Food", "snack")
+    assert engine.store.dirty == {"expense": {"2021"}, "income": set()}
+    engine.save(background=False)
+
+    assert {key: os.stat(path).st_mtime != 0 for key, path in files.items()} == \
+        {"2019": False, "2021": True, "2024": False}
+    assert engine.store.dirty == {"expense": set(), "income": set()}
+    assert engine.store.manifest["expense"]["2021"]["count"] == 6
+    engine.close()
+
+
+def test_open_view_survives_reading_an_older_partition(tmp_path):
+    _fill(tmp_path)
+    engine = _engine(tmp_path)
+    view = engine.view("expense", "2021-01-01", "2021-12-31")
+    by_amount = engine.view("expense", "2021-01-01", "2021-12-31")
+    by_amount.sort("amount", descending=False)
+    found = engine.view("expense", "2021-01-01", "2021-12-31", query="groceries")
+    assert [row["date"][:4] for row in view.rows(0, 10)] == ["2021"] * 5
+
+    # Reading 2019 in rebuilds the date index and shifts every slot
+    assert len(engine.view("expense", "2019-01-01", "2019-12-31")) == 5
+
+    assert [row["date"] for row in view.rows(0, 10)] == [f"2021-03-0{day}" for day in (5, 4, 3, 2, 1)]
+    assert [row["amount"] for row in by_amount.rows(0, 10)] == [2022.0, 2023.0, 2024.0, 2025.0, 2026.0]
+    assert len(found) == 5 and {row["date"][:4] for row in found.rows(0, 10)} == {"2021"}
+    engine.close()
+
+
+def test_projected_view_follows_its_base(tmp_path):
+    _fill(tmp_path)
+    engine = _engine(tmp_path)
+    engine.add_record("expense", "2021-01-10", 50, "Housing", "rent", recurring=True)
+    view = engine.view("expense", "2021-01-01", "2021-04-30", include_projected=True)
+    engine.view("expense", "2019-01-01", "2019-12-31")
+    rows = view.rows(0, len(view))
+    assert [row["date"] for row in rows] == sorted((row["date"] for row in rows), reverse=True)
+    assert all(row["date"].startswith("2021") for row in rows)
+    assert sum(1 for row in rows if row.get("projected")) == 3
+    engine.close()
+
+
+def test_emptied_partition_loses_its_file(tmp_path):
+    _fill(tmp_path)
+    engine = _engine(tmp_path)
+    emptied = engine.store.partition_file("expense", "2021")
+    assert os.path.exists(emptied)
+    for row in engine.view("expense", "2021-01-01", "2021-12-31").rows(0, 10):
+        engine.delete_record("expense", row["id"])
+    engine.save(background=False)
+    assert not os.path.exists(emptied)
+    assert sorted(engine.store.manifest["expense"]) == ["2019", "2024"]
+    engine.close()
+
+    engine = _engine(tmp_path)
+    assert engine.totals_by_month("expense") == {"2019-03": 10110.0, "2024-03": 10135.0}
+    engine.close()